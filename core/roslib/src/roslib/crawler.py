@@ -0,0 +1,549 @@
+#! /usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+In-process crawler for the ROS package path. This replicates the
+search rules of rospack (and rospkg) so that package lookups can be
+answered from memory instead of by forking a rospack process.
+
+Directory listings are done with os.scandir() and fanned out across
+a thread pool, which matters on network filesystems where every
+listing is a round trip.
+
+Warning: do not use this library.  It is unstable and most of the routines
+here have been superceded by other libraries (e.g. rospkg).  These
+routines will likely be *deleted* in future releases.
+"""
+
+import marshal
+import os
+import sys
+import threading
+import time
+
+from xml.etree.ElementTree import ElementTree
+
+try:
+    from os import scandir
+except ImportError:
+    scandir = None # Python < 3.5
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None # Python 2 without the futures backport
+
+MANIFEST_FILE = 'manifest.xml'
+PACKAGE_FILE = 'package.xml'
+STACK_FILE = 'stack.xml'
+
+CATKIN_IGNORE = 'CATKIN_IGNORE'
+NOSUBDIRS = 'rospack_nosubdirs'
+
+# number of threads used to list directories
+DEFAULT_WORKERS = 8
+
+def _listdir(d):
+    """
+    @return: names of subdirectories (including symlinks to
+      directories) and of other entries in d, in directory order, and
+      the set of subdirectories that are symlinks.
+    @rtype: ([str], [str], set(str))
+    """
+    dirs = []
+    files = []
+    links = set()
+    if scandir is None:
+        try:
+            names = os.listdir(d)
+        except OSError:
+            return dirs, files, links
+        for name in names:
+            p = os.path.join(d, name)
+            if os.path.isdir(p):
+                dirs.append(name)
+                if os.path.islink(p):
+                    links.add(name)
+            else:
+                files.append(name)
+        return dirs, files, links
+    try:
+        entries = scandir(d)
+    except OSError:
+        return dirs, files, links
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            dirs.append(entry.name)
+            if entry.is_symlink():
+                links.add(entry.name)
+        else:
+            files.append(entry.name)
+    return dirs, files, links
+
+class Snapshot(object):
+    """
+    Record of a walked directory tree, used to make later walks of
+    the same tree incremental. For each directory, a snapshot stores
+    its mtime (and that of any watched files), the value returned by
+    the visitor and the subdirectories that were walked. Directories
+    whose mtimes are unchanged are not listed or visited again.
+    """
+    __slots__ = ['nodes', 'dirty']
+
+    def __init__(self, nodes=None):
+        """
+        @param nodes: {directory: (stamp, watched, value, children)}
+        @type  nodes: dict
+        """
+        self.nodes = nodes or {}
+        # True if nodes have changed since the snapshot was loaded
+        self.dirty = False
+
+# mtimes that are this close to the start of a walk are not trusted,
+# as the directory may change again within the filesystem's
+# timestamp resolution
+RACY_INTERVAL = 2.
+
+def _stamp(d, watched):
+    """
+    @param watched: names of files in d whose mtimes are also recorded
+    @type  watched: (str)
+    @return: mtimes of d and of watched files, or None if they cannot be read
+    @rtype: (float)
+    """
+    try:
+        return (os.stat(d).st_mtime,) + tuple(os.stat(os.path.join(d, n)).st_mtime for n in watched)
+    except OSError:
+        return None
+
+class _Walk(object):
+    """
+    State of a single walk(). Directories are listed by worker
+    threads, which record the results in nodes and schedule the
+    subdirectories that visit() did not prune. Directories that are
+    unchanged since the snapshot are handled inline as they only
+    cost a stat().
+    """
+
+    def __init__(self, visit, executor, snapshot=None, watch=(), followlinks=True):
+        self.visit = visit
+        self.followlinks = followlinks
+        self.executor = executor
+        self.nodes = {}
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.pending = 0
+        self.error = None
+        # (st_dev, st_ino) of directories, only computed for
+        # ancestors of symlinks
+        self.keys = {}
+        self.snapshot = snapshot
+        self.watch = watch
+        self.records = {}
+        self.rescanned = 0
+        self.racy = time.time() - RACY_INTERVAL
+
+    def _key(self, d):
+        key = self.keys.get(d, None)
+        if key is None:
+            try:
+                s = os.stat(d)
+            except OSError:
+                return None
+            key = self.keys[d] = (s.st_dev, s.st_ino)
+        return key
+
+    def _is_loop(self, p, chain):
+        """
+        @return: True if following the symlink p leads back to one of
+          the directories in chain
+        """
+        key = self._key(p)
+        if key is None:
+            return True
+        return any(self._key(a) == key for a in chain)
+
+    def _lookup(self, d):
+        """
+        @return: snapshot record for d if d is unchanged, else None
+        """
+        if self.snapshot is None:
+            return None
+        record = self.snapshot.nodes.get(d, None)
+        if record is None or record[0] is None or record[0] != _stamp(d, record[1]):
+            return None
+        return record
+
+    def scan(self, d, chain):
+        """
+        List and visit directory d.
+        @param chain: paths of the ancestors of d
+        @type  chain: (str)
+        @return: subdirectories of d to walk, with their ancestors
+        @rtype: [(str, (str))]
+        """
+        record = self._lookup(d)
+        if record is None:
+            self.rescanned += 1
+            if self.snapshot is not None:
+                dir_stamp = _stamp(d, ())
+            dirs, files, links = _listdir(d)
+            if self.snapshot is not None:
+                watched = tuple(n for n in self.watch if n in files)
+                stamp = _stamp(d, watched)
+                if stamp is None or dir_stamp is None or stamp[0] != dir_stamp[0] or max(stamp) >= self.racy:
+                    stamp = None # always rescan
+            value = self.visit(d, dirs, files)
+            children = []
+            for sub in dirs:
+                p = os.path.join(d, sub)
+                if sub in links and (not self.followlinks or self._is_loop(p, chain + (d,))):
+                    continue
+                children.append(p)
+            if self.snapshot is not None:
+                record = (stamp, watched, value, children)
+        else:
+            value, children = record[2], record[3]
+        if record is not None:
+            self.records[d] = record
+        self.nodes[d] = value, children
+        chain = chain + (d,)
+        return [(c, chain) for c in children]
+
+    def submit(self, d, chain):
+        with self.lock:
+            self.pending += 1
+        self.executor.submit(self._run, d, chain)
+
+    def _run(self, d, chain):
+        try:
+            stack = [(d, chain)]
+            while stack and self.error is None:
+                for c, c_chain in self.scan(*stack.pop()):
+                    if self.snapshot is not None and c in self.snapshot.nodes:
+                        stack.append((c, c_chain))
+                    else:
+                        self.submit(c, c_chain)
+        except Exception:
+            self.error = sys.exc_info()[1]
+        finally:
+            with self.lock:
+                self.pending -= 1
+                if not self.pending:
+                    self.done.set()
+
+    def run(self, root):
+        if self.executor is None:
+            stack = [(root, ())]
+            while stack:
+                stack.extend(reversed(self.scan(*stack.pop())))
+        else:
+            self.submit(root, ())
+            self.done.wait()
+            if self.error is not None:
+                raise self.error
+        if self.snapshot is not None:
+            if self.rescanned or len(self.records) != len(self.snapshot.nodes):
+                self.snapshot.nodes = self.records
+                self.snapshot.dirty = True
+
+    def results(self, root):
+        """
+        @return: non-None visit() values in os.walk() order
+        @rtype: [(str, object)]
+        """
+        results = []
+        stack = [root]
+        while stack:
+            d = stack.pop()
+            value, children = self.nodes[d]
+            if value is not None:
+                results.append((d, value))
+            stack.extend(reversed(children))
+        return results
+
+def walk(path, visit, workers=None, snapshot=None, watch=(), followlinks=True):
+    """
+    Walk the directory tree rooted at path, following symlinks to
+    directories (unless followlinks is False) but not symlinks that
+    loop back to a directory that is already being walked (compared
+    by st_dev and st_ino).
+
+    visit(d, dirs, files) is called once for each directory. As with
+    os.walk(topdown=True), it can prune the walk by modifying dirs in
+    place. visit() is called from worker threads in no particular
+    order, so it must not modify shared state; instead, its non-None
+    return values are collected and returned in the order that a
+    serial top-down walk would have produced them.
+
+    If a snapshot is provided, directories whose mtime (and the mtime
+    of the files named in watch) are unchanged since the snapshot was
+    taken are neither listed nor visited: their recorded values are
+    reused. The snapshot is updated to reflect the new walk. The same
+    visitor and watch list must be used for every walk of a snapshot.
+
+    @param path: root of the walk
+    @type  path: str
+    @param visit: fn(d, dirs, files) -> value
+    @type  visit: fn
+    @param workers: number of threads used to list directories, or
+      1 to walk serially. Defaults to DEFAULT_WORKERS.
+    @type  workers: int
+    @param snapshot: (optional) snapshot of a previous walk of path
+    @type  snapshot: L{Snapshot}
+    @param watch: names of files that visit() reads the contents of
+    @type  watch: (str)
+    @param followlinks: walk into symlinks to directories
+    @type  followlinks: bool
+    @return: [(directory, value)] for non-None values returned by visit
+    @rtype: [(str, object)]
+    """
+    if workers is None:
+        workers = DEFAULT_WORKERS
+    root = path
+    if not os.path.isdir(root):
+        if snapshot is not None and snapshot.nodes:
+            snapshot.nodes = {}
+            snapshot.dirty = True
+        return []
+    if workers > 1 and ThreadPoolExecutor is not None:
+        executor = ThreadPoolExecutor(workers)
+        try:
+            w = _Walk(visit, executor, snapshot, watch, followlinks)
+            w.run(root)
+        finally:
+            executor.shutdown(wait=True)
+    else:
+        w = _Walk(visit, None, snapshot, watch, followlinks)
+        w.run(root)
+    return w.results(root)
+
+# bump whenever the format of snapshot records changes
+SNAPSHOT_VERSION = 2
+
+def load_snapshots(filename):
+    """
+    Load snapshots saved by L{save_snapshots()}.
+    @param filename: snapshot file
+    @type  filename: str
+    @return: {root path: L{Snapshot}}. Empty if the file does not exist, is
+      corrupt or was written by a different version of Python or roslib.
+    @rtype: dict
+    """
+    try:
+        with open(filename, 'rb') as f:
+            version, python_version, data = marshal.load(f)
+        if version != SNAPSHOT_VERSION or python_version != tuple(sys.version_info[:2]):
+            return {}
+        return dict((k, Snapshot(v)) for k, v in data.items())
+    except Exception:
+        return {}
+
+def save_snapshots(filename, snapshots):
+    """
+    Save snapshots if any of them have changed. Snapshots of
+    directories that no longer exist are dropped. Errors are ignored,
+    as snapshots are only an optimization.
+    @param filename: snapshot file
+    @type  filename: str
+    @param snapshots: {root path: L{Snapshot}}
+    @type  snapshots: dict
+    @return: True if snapshots were written
+    @rtype: bool
+    """
+    if not any(s.dirty for s in snapshots.values()):
+        return False
+    data = dict((k, s.nodes) for k, s in snapshots.items() if s.nodes and os.path.isdir(k))
+    tmp = '%s.%s'%(filename, os.getpid())
+    try:
+        d = os.path.dirname(filename)
+        if d and not os.path.isdir(d):
+            os.makedirs(d)
+        with open(tmp, 'wb') as f:
+            marshal.dump((SNAPSHOT_VERSION, tuple(sys.version_info[:2]), data), f)
+        os.rename(tmp, filename)
+    except (IOError, OSError, ValueError):
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+    for s in snapshots.values():
+        s.dirty = False
+    return True
+
+def _parse_package_xml(package_xml):
+    """
+    Read the name of a catkin package.
+    @param package_xml: path to package.xml file
+    @type  package_xml: str
+    @return: (name, is_metapackage). name is None if the file is invalid.
+    @rtype: (str, bool)
+    """
+    try:
+        root = ElementTree(None, package_xml)
+    except Exception:
+        return None, False
+    name = (root.findtext('name') or '').strip(' \n\r\t')
+    return name or None, root.find('./export/metapackage') is not None
+
+def _visit_rospack(d, dirs, files):
+    """
+    walk() visitor that implements the package search rules of
+    rospack: directories containing a package.xml, manifest.xml,
+    CATKIN_IGNORE or rospack_nosubdirs file are leaves and hidden
+    directories are not searched.
+    @return: (package name or None, True if d contains a stack.xml)
+    @rtype: (str, bool)
+    """
+    name = None
+    if CATKIN_IGNORE in files:
+        del dirs[:]
+        return None
+    if PACKAGE_FILE in files:
+        del dirs[:]
+        name, is_metapackage = _parse_package_xml(os.path.join(d, PACKAGE_FILE))
+        if is_metapackage:
+            name = None
+    elif MANIFEST_FILE in files:
+        del dirs[:]
+        name = os.path.basename(d)
+    elif NOSUBDIRS in files:
+        del dirs[:]
+    else:
+        # remove hidden dirs (esp. .svn/.git)
+        dirs[:] = [di for di in dirs if di[0] != '.']
+    return name, STACK_FILE in files
+
+def list_packages_by_path(path, locations, workers=None, snapshot=None, stacks=None, watch=(PACKAGE_FILE,)):
+    """
+    Crawl path for packages using the same rules as rospack. The
+    first package found with a given name takes precedence.
+
+    @param path: path to crawl
+    @type  path: str
+    @param locations: package locations to update. Packages that are
+      already present are ignored.
+    @type  locations: {str: str}
+    @param workers: number of crawler threads
+    @type  workers: int
+    @param snapshot: (optional) snapshot of a previous crawl of path,
+      which is updated in place
+    @type  snapshot: L{Snapshot}
+    @param stacks: (optional) {directory: True if it contains a
+      stack.xml} to update with the crawled directories, for
+      L{stack_table()}
+    @type  stacks: dict
+    @param watch: names of files whose mtimes mark a directory as
+      changed in the snapshot. package.xml must be included, as it
+      is read by the crawl.
+    @type  watch: (str)
+    @return: locations
+    @rtype: {str: str}
+    """
+    path = os.path.abspath(path)
+    for d, (name, is_stack) in walk(path, _visit_rospack, workers=workers, snapshot=snapshot, watch=watch):
+        if stacks is not None:
+            stacks[d] = is_stack
+        if name is not None and name not in locations:
+            locations[name] = d
+    return locations
+
+def stack_table(dirs, stacks=None):
+    """
+    Map directories to the stack that they are in: the nearest
+    directory, starting with the directory itself, that contains a
+    stack.xml. As with roslib.stacks.stack_of(), the stack is named
+    by its directory.
+
+    @param dirs: normalized, absolute directory paths
+    @type  dirs: [str]
+    @param stacks: (optional) {directory: True if it contains a
+      stack.xml} as recorded by a crawl. Directories that are not
+      listed are checked on disk and added.
+    @type  stacks: dict
+    @return: {directory: stack name or None if not in a stack}
+    @rtype: {str: str}
+    """
+    if stacks is None:
+        stacks = {}
+    table = {}
+    for d in dirs:
+        stack = None
+        p = d
+        while p and os.path.dirname(p) != p:
+            is_stack = stacks.get(p, None)
+            if is_stack is None:
+                is_stack = stacks[p] = os.path.exists(os.path.join(p, STACK_FILE))
+            if is_stack:
+                stack = os.path.basename(p)
+                break
+            p = os.path.dirname(p)
+        table[d] = stack
+    return table
+
+def crawl_packages(ros_paths, workers=None, snapshots=None, stacks=None, watch=(PACKAGE_FILE,)):
+    """
+    Locate all packages on the ROS package path.
+
+    @param ros_paths: paths to search, in order of precedence
+      (e.g. as returned by rospkg.get_ros_paths())
+    @type  ros_paths: [str]
+    @param workers: number of crawler threads
+    @type  workers: int
+    @param snapshots: (optional) {path: L{Snapshot}} of previous
+      crawls. Only directories that changed since are re-crawled.
+      Snapshots are added and updated in place.
+    @type  snapshots: dict
+    @param stacks: (optional) {directory: True if it contains a
+      stack.xml} to update with the crawled directories, for
+      L{stack_table()}
+    @type  stacks: dict
+    @param watch: see L{list_packages_by_path()}
+    @type  watch: (str)
+    @return: map of package name to package directory
+    @rtype: {str: str}
+    """
+    locations = {}
+    for path in ros_paths:
+        snapshot = None
+        if snapshots is not None:
+            path = os.path.abspath(path)
+            snapshot = snapshots.get(path, None)
+            if snapshot is None:
+                snapshot = snapshots[path] = Snapshot()
+        list_packages_by_path(path, locations, workers=workers, snapshot=snapshot, stacks=stacks, watch=watch)
+    return locations
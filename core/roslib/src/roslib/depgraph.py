@@ -0,0 +1,485 @@
+#! /usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+In-process dependency graph of packages and stacks, which answers
+the dependency queries of roslib.rospack without forking rospack or
+rosstack. Direct dependencies are read from the manifests on first
+use and transitive closures are memoized, in both directions.
+
+Warning: do not use this library.  It is unstable and most of the routines
+here have been superceded by other libraries (e.g. rospkg).  These
+routines will likely be *deleted* in future releases.
+"""
+
+import os
+import threading
+import time
+
+from xml.etree.ElementTree import ElementTree
+
+import roslib.exceptions
+import roslib.manifest
+import roslib.stack_manifest
+
+MANIFEST_FILE = 'manifest.xml'
+PACKAGE_FILE = 'package.xml'
+STACK_FILE = 'stack.xml'
+
+# run-time dependencies of a catkin package, which are what rospack
+# reports, in the order that rospack reads them
+PACKAGE_XML_DEPEND_TAGS = {
+    '1': ['run_depend'],
+    '2': ['build_export_depend', 'buildtool_export_depend', 'exec_depend', 'depend'],
+}
+
+class DependencyGraph(object):
+    """
+    Dependency graph over a set of named nodes (packages or stacks).
+    Orderings match rospack:
+     - L{depends_1()} lists direct dependencies in manifest order.
+     - L{depends()} lists dependencies in depth-first post-order, so
+       that a dependency comes after its own dependencies.
+     - L{depends_on_1()} and L{depends_on()} are sorted by name.
+    Set operations over many nodes are provided by L{closure_index()}.
+
+    The graph does not watch the filesystem: create a new graph to
+    pick up changes to manifests. This class is thread-safe.
+    """
+
+    def __init__(self, locations, read_depends, kind='package', preload=None):
+        """
+        @param locations: map of node name to directory
+        @type  locations: {str: str}
+        @param read_depends: function that takes in a directory and
+          returns (direct dependencies, ignore_missing). If
+          ignore_missing is True, dependencies that are not in
+          locations are left out instead of being an error.
+        @type  read_depends: fn(str) -> ([str], bool)
+        @param kind: 'package' or 'stack', for error messages
+        @type  kind: str
+        @param preload: (optional) function that takes in all
+          directories before their dependencies are read one by one,
+          to load the manifests in bulk
+        @type  preload: fn([str])
+        """
+        self.locations = locations
+        self.read_depends = read_depends
+        self.kind = kind
+        self.preload = preload
+        self.stamp = time.time()
+        self._lock = threading.RLock()
+        # {name: [name]}, memoized queries
+        self._depends_1 = {}
+        self._depends = {}
+        # built on first use by reverse queries
+        self._order = None
+        self._reverse = None
+        self._index = None
+
+    def _error(self, msg):
+        tool = 'rospack' if self.kind == 'package' else 'rosstack'
+        return roslib.exceptions.ROSLibException("%s: %s"%(tool, msg))
+
+    def _check(self, name):
+        if name not in self.locations:
+            raise self._error("%s '%s' not found"%(self.kind, name))
+
+    def _load(self, name):
+        """
+        @return: direct dependencies of name
+        @rtype: [str]
+        @raise ROSLibException: if the manifest cannot be read or a
+          dependency cannot be found
+        """
+        deps = self._depends_1.get(name, None)
+        if deps is not None:
+            return deps
+        try:
+            depends, ignore_missing = self.read_depends(self.locations[name])
+        except Exception as e:
+            raise self._error("error parsing manifest of %s '%s': %s"%(self.kind, name, e))
+        deps = []
+        for d in depends:
+            if d in deps:
+                continue
+            if d not in self.locations:
+                if ignore_missing:
+                    continue
+                raise self._error("%s '%s' depends on non-existent %s '%s'"%(self.kind, name, self.kind, d))
+            deps.append(d)
+        self._depends_1[name] = deps
+        return deps
+
+    def depends_1(self, name):
+        """
+        @return: direct dependencies of name
+        @rtype: [str]
+        @raise ROSLibException: if name or one of its dependencies
+          cannot be found
+        """
+        with self._lock:
+            self._check(name)
+            return list(self._load(name))
+
+    def _closure(self, name, active):
+        """
+        @param active: names whose closure is being computed, to
+          detect cycles
+        @type  active: set
+        @return: memoized transitive dependencies of name, in post-order
+        @rtype: [str]
+        """
+        closure = self._depends.get(name, None)
+        if closure is not None:
+            return closure
+        if name in active:
+            raise self._error("circular dependency involving %s '%s'"%(self.kind, name))
+        active.add(name)
+        closure = []
+        seen = set()
+        for d in self._load(name):
+            # the closure of d, then d itself, less anything already
+            # listed: this is the order of a post-order walk from name
+            for dd in self._closure(d, active) + [d]:
+                if dd not in seen:
+                    seen.add(dd)
+                    closure.append(dd)
+        active.remove(name)
+        self._depends[name] = closure
+        return closure
+
+    def depends(self, name):
+        """
+        @return: transitive dependencies of name, in the order of rospack
+        @rtype: [str]
+        @raise ROSLibException: if name or one of its dependencies
+          cannot be found, or if the dependencies are circular
+        """
+        with self._lock:
+            self._check(name)
+            return list(self._closure(name, set()))
+
+    def _try_load(self, name):
+        try:
+            return self._load(name)
+        except roslib.exceptions.ROSLibException:
+            return None
+
+    def _resolve(self):
+        """
+        Read the manifests of all nodes. As with rospack, nodes whose
+        dependencies cannot be resolved (invalid manifests, missing or
+        circular dependencies) are left out of reverse queries.
+        @return: nodes whose dependencies can be resolved, in
+          topological order (dependencies first)
+        @rtype: [str]
+        """
+        if self._order is not None:
+            return self._order
+        if self.preload is not None:
+            self.preload([self.locations[name] for name in sorted(self.locations)])
+        # iterative depth-first walk, as dependency chains can be
+        # deeper than the recursion limit
+        active, done, bad = 0, 1, 2
+        state = {}
+        order = []
+        for root in sorted(self.locations):
+            if root in state:
+                continue
+            deps = self._try_load(root)
+            if deps is None:
+                state[root] = bad
+                continue
+            state[root] = active
+            stack = [(root, iter(deps))]
+            while stack:
+                name, it = stack[-1]
+                if state[name] == active:
+                    pushed = False
+                    for d in it:
+                        s = state.get(d, None)
+                        if s is None:
+                            deps = self._try_load(d)
+                            if deps is None:
+                                state[d] = state[name] = bad
+                            else:
+                                state[d] = active
+                                stack.append((d, iter(deps)))
+                                pushed = True
+                            break
+                        elif s != done:
+                            # circular dependency or unresolvable dependency
+                            state[name] = bad
+                            break
+                    if pushed:
+                        continue
+                stack.pop()
+                if state[name] == active:
+                    state[name] = done
+                    order.append(name)
+                elif stack:
+                    state[stack[-1][0]] = bad
+        self._order = order
+        return order
+
+    def closure_index(self):
+        """
+        @return: index of the transitive closures of the graph
+        @rtype: L{ClosureIndex}
+        """
+        with self._lock:
+            if self._index is None:
+                order = self._resolve()
+                self._index = ClosureIndex(sorted(self.locations), order, self._load, self._error, self.kind)
+            return self._index
+
+    def _load_reverse(self):
+        """
+        @return: {name: [names that depend directly on name]}
+        @rtype: {str: [str]}
+        """
+        if self._reverse is not None:
+            return self._reverse
+        reverse = dict((name, []) for name in self.locations)
+        for name in sorted(self._resolve()):
+            for d in self._load(name):
+                reverse[d].append(name)
+        self._reverse = reverse
+        return reverse
+
+    def depends_on_1(self, name):
+        """
+        @return: names that depend directly on name, sorted
+        @rtype: [str]
+        @raise ROSLibException: if name cannot be found
+        """
+        with self._lock:
+            self._check(name)
+            return list(self._load_reverse()[name])
+
+    def depends_on(self, name):
+        """
+        @return: names that depend on name, directly or indirectly, sorted
+        @rtype: [str]
+        @raise ROSLibException: if name cannot be found
+        """
+        index = self.closure_index()
+        return index.names(index.depends_on([name]))
+
+class ClosureIndex(object):
+    """
+    Forward and reverse transitive closures of a L{DependencyGraph},
+    stored as integer bitsets. Nodes are numbered densely in name
+    order, so that bit i of a set stands for the i-th name. Sets are
+    plain ints and can be combined with |, & and ~ before they are
+    turned into names with L{names()}, e.g. the packages that depend
+    on any of a list of changed packages, but are not themselves
+    changed::
+
+      index.depends_on(changed) & ~index.mask(changed)
+
+    Instances are immutable.
+    """
+    __slots__ = ['_names', '_ids', '_depends', '_depends_on', '_error', '_kind']
+
+    def __init__(self, names, order, depends_1, error, kind='package'):
+        """
+        @param names: all node names, sorted
+        @type  names: [str]
+        @param order: nodes whose dependencies can be resolved, in
+          topological order (dependencies first)
+        @type  order: [str]
+        @param depends_1: function that returns the direct dependencies of a node
+        @type  depends_1: fn(str) -> [str]
+        @param error: function that returns an exception for a message
+        @type  error: fn(str) -> Exception
+        @param kind: 'package' or 'stack', for error messages
+        @type  kind: str
+        """
+        self._names = names
+        self._ids = ids = dict((name, i) for i, name in enumerate(names))
+        self._error = error
+        self._kind = kind
+        # forward closures are computed dependencies first, reverse
+        # closures dependents first, so each is a single pass
+        depends = [0] * len(names)
+        depends_on = [0] * len(names)
+        for name in order:
+            bits = 0
+            for d in depends_1(name):
+                i = ids[d]
+                bits |= depends[i] | (1 << i)
+            depends[ids[name]] = bits
+        for name in reversed(order):
+            i = ids[name]
+            bits = depends_on[i] | (1 << i)
+            for d in depends_1(name):
+                depends_on[ids[d]] |= bits
+        self._depends = depends
+        self._depends_on = depends_on
+
+    def __len__(self):
+        return len(self._names)
+
+    def _id(self, name):
+        try:
+            return self._ids[name]
+        except KeyError:
+            raise self._error("%s '%s' not found"%(self._kind, name))
+
+    def mask(self, names):
+        """
+        @param names: node names
+        @type  names: [str]
+        @return: set of names
+        @rtype: int
+        @raise ROSLibException: if a name cannot be found
+        """
+        bits = 0
+        for name in names:
+            bits |= 1 << self._id(name)
+        return bits
+
+    def depends(self, names):
+        """
+        @param names: node names
+        @type  names: [str]
+        @return: set of nodes that any of names depend on, directly or
+          indirectly
+        @rtype: int
+        @raise ROSLibException: if a name cannot be found
+        """
+        bits = 0
+        for name in names:
+            bits |= self._depends[self._id(name)]
+        return bits
+
+    def depends_on(self, names):
+        """
+        @param names: node names
+        @type  names: [str]
+        @return: set of nodes that depend on any of names, directly or
+          indirectly
+        @rtype: int
+        @raise ROSLibException: if a name cannot be found
+        """
+        bits = 0
+        for name in names:
+            bits |= self._depends_on[self._id(name)]
+        return bits
+
+    def names(self, bits):
+        """
+        @param bits: set of nodes
+        @type  bits: int
+        @return: names in the set, sorted
+        @rtype: [str]
+        """
+        names = self._names
+        result = []
+        while bits:
+            low = bits & -bits
+            result.append(names[low.bit_length() - 1])
+            bits ^= low
+        return result
+
+    def count(self, bits):
+        """
+        @param bits: set of nodes
+        @type  bits: int
+        @return: number of nodes in the set
+        @rtype: int
+        """
+        return bin(bits).count('1')
+
+def read_package_depends(package_dir):
+    """
+    Read the direct dependencies of a package. As with rospack, the
+    package.xml of a catkin package takes precedence over a
+    manifest.xml, and dependencies of a catkin package that are not
+    packages (e.g. system dependencies) are ignored.
+    @param package_dir: package directory
+    @type  package_dir: str
+    @return: (dependencies, ignore_missing)
+    @rtype: ([str], bool)
+    """
+    package_xml = os.path.join(package_dir, PACKAGE_FILE)
+    if os.path.isfile(package_xml):
+        root = ElementTree(None, package_xml).getroot()
+        tags = PACKAGE_XML_DEPEND_TAGS.get(root.get('format', '1'), PACKAGE_XML_DEPEND_TAGS['2'])
+        depends = []
+        for tag in tags:
+            depends.extend((e.text or '').strip() for e in root.findall(tag))
+        return depends, True
+    m = roslib.manifest.parse_file(os.path.join(package_dir, MANIFEST_FILE), lazy=True)
+    return [d.package for d in m.depends], False
+
+def preload_package_manifests(package_dirs, workers=1):
+    """
+    Parse the manifest.xml files of package directories into the
+    manifest cache, so that L{read_package_depends()} finds them
+    there. Errors are left for L{read_package_depends()} to report.
+    @param package_dirs: package directories
+    @type  package_dirs: [str]
+    @param workers: number of worker processes, see
+      L{roslib.manifestcache.ManifestCache.parse_files()}. Manifests
+      are parsed in this process by default, as the graph may be used
+      by a process that runs threads.
+    @type  workers: int
+    """
+    files = [os.path.join(d, MANIFEST_FILE) for d in package_dirs
+             if not os.path.isfile(os.path.join(d, PACKAGE_FILE))]
+    roslib.manifest.parse_files(files, workers=workers)
+
+def preload_stack_manifests(stack_dirs, workers=1):
+    """
+    Parse the stack.xml files of stack directories into the manifest
+    cache, see L{preload_package_manifests()}.
+    @param stack_dirs: stack directories
+    @type  stack_dirs: [str]
+    @param workers: number of worker processes
+    @type  workers: int
+    """
+    roslib.stack_manifest.parse_files([os.path.join(d, STACK_FILE) for d in stack_dirs], workers=workers)
+
+def read_stack_depends(stack_dir):
+    """
+    Read the direct dependencies of a stack.
+    @param stack_dir: stack directory
+    @type  stack_dir: str
+    @return: (dependencies, ignore_missing)
+    @rtype: ([str], bool)
+    """
+    m = roslib.stack_manifest.parse_file(os.path.join(stack_dir, STACK_FILE))
+    return [d.stack for d in m.depends], False
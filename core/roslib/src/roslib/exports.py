@@ -0,0 +1,190 @@
+#! /usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Workspace-wide index of the <export> tags of package manifests, for
+plugin discovery without reading every manifest per query.
+
+Warning: do not use this library.  It is unstable and most of the routines
+here have been superceded by other libraries (e.g. rospkg).  These
+routines will likely be *deleted* in future releases.
+"""
+
+import os
+import threading
+import time
+
+import roslib.manifest
+import roslib.manifestlib
+import roslib.packages
+
+MANIFEST_FILE = 'manifest.xml'
+PACKAGE_FILE = 'package.xml'
+
+def read_package_exports(package_dir):
+    """
+    Read the exports of a package. As with rospack, the package.xml
+    of a catkin package takes precedence over a manifest.xml. A
+    manifest.xml is loaded with L{roslib.manifest.parse_file()}, so
+    that it is shared with the manifest cache.
+    @param package_dir: package directory
+    @type  package_dir: str
+    @return: [(tag, {attribute: value})] in manifest order
+    @rtype: [(str, {str: str})]
+    @raise ManifestException: if the manifest is invalid
+    """
+    p = os.path.join(package_dir, PACKAGE_FILE)
+    if os.path.isfile(p):
+        with open(p, 'r') as f:
+            exports = roslib.manifestlib.parse_exports(f.read(), p)
+    else:
+        p = os.path.join(package_dir, MANIFEST_FILE)
+        if not os.path.isfile(p):
+            return []
+        exports = roslib.manifest.parse_file(p, lazy=True).exports
+    return [(e.tag, dict(e.attrs)) for e in exports]
+
+def substitute_prefix(value, package_dir):
+    """
+    Replace ${prefix} in an export value with the package directory,
+    as rospack does.
+    @rtype: str
+    """
+    return value.replace('${prefix}', package_dir)
+
+class ExportIndex(object):
+    """
+    Index of the exports of all packages, keyed by tag and attribute.
+    Packages whose manifests cannot be read are left out. Instances
+    are immutable.
+    """
+    __slots__ = ['locations', 'stamp', '_index']
+
+    def __init__(self, locations, read_exports=read_package_exports):
+        """
+        @param locations: map of package name to package directory
+        @type  locations: {str: str}
+        @param read_exports: function that takes in a package
+          directory and returns its exports, see L{read_package_exports()}
+        @type  read_exports: fn(str) -> [(str, {str: str})]
+        """
+        self.locations = locations
+        self.stamp = time.time()
+        index = {}
+        for package in sorted(locations):
+            try:
+                exports = read_exports(locations[package])
+            except Exception:
+                continue
+            for tag, attrs in exports:
+                for attr, value in attrs.items():
+                    index.setdefault((tag, attr), []).append((package, value))
+        self._index = index
+
+    def get(self, tag, attr, substitute=True):
+        """
+        @param tag: export tag, e.g. 'python' or the name of the
+          package that plugins are exported for
+        @type  tag: str
+        @param attr: attribute, e.g. 'path' or 'plugin'
+        @type  attr: str
+        @param substitute: replace ${prefix} in values with the
+          package directory
+        @type  substitute: bool
+        @return: [(package, value)] for all packages that export tag
+          with attr, sorted by package
+        @rtype: [(str, str)]
+        """
+        exports = self._index.get((tag, attr), ())
+        if substitute:
+            return [(p, substitute_prefix(v, self.locations[p])) for p, v in exports]
+        return list(exports)
+
+    def plugins(self, package, attr, dependents):
+        """
+        Answer 'rospack plugins': the values of attr that package
+        itself and the packages which depend directly on it export for
+        it.
+        @param package: package name
+        @type  package: str
+        @param attr: attribute, e.g. 'plugin'
+        @type  attr: str
+        @param dependents: packages that depend directly on package
+        @type  dependents: [str]
+        @return: [(package, value)], sorted by package
+        @rtype: [(str, str)]
+        """
+        candidates = set(dependents)
+        candidates.add(package)
+        return [(p, v) for p, v in self.get(package, attr) if p in candidates]
+
+_index_lock = threading.Lock()
+_index = None
+
+def get_export_index(ros_root=None, ros_package_path=None):
+    """
+    Get the export index of the packages in the environment. The
+    index is rebuilt when the package index is, or when it is older
+    than ROS_CACHE_TIMEOUT.
+    @param ros_root: if specified, override ROS_ROOT
+    @type  ros_root: str
+    @param ros_package_path: if specified, override ROS_PACKAGE_PATH
+    @type  ros_package_path: str
+    @rtype: L{ExportIndex}
+    """
+    global _index
+    ros_root, ros_package_path = roslib.packages._resolve_env(ros_root, ros_package_path)
+    locations = roslib.packages._pkg_dir_cache.get_locations(ros_root, ros_package_path)
+    with _index_lock:
+        index = _index
+        if index is None or index.locations is not locations or time.time() - index.stamp > roslib.packages._cache_timeout():
+            index = _index = ExportIndex(locations)
+        return index
+
+def get_exports(tag, attr, ros_root=None, ros_package_path=None):
+    """
+    Get the exports of all packages for a tag and attribute, e.g. for
+    plugin discovery.
+    @param tag: export tag
+    @type  tag: str
+    @param attr: attribute
+    @type  attr: str
+    @param ros_root: if specified, override ROS_ROOT
+    @type  ros_root: str
+    @param ros_package_path: if specified, override ROS_PACKAGE_PATH
+    @type  ros_package_path: str
+    @return: [(package, value)], sorted by package. ${prefix} in
+      values is replaced with the package directory.
+    @rtype: [(str, str)]
+    """
+    return get_export_index(ros_root, ros_package_path).get(tag, attr)
@@ -51,15 +51,18 @@ def get_depends(package, rospack):
     vals = rospack.get_depends(package, implicit=True)
     return [v for v in vals if not rospack.get_manifest(v).is_catkin]
 
-def load_manifest(package_name, bootstrap_version="0.7"):
+def load_manifest(package_name, bootstrap_version="0.7", session=None):
     """
     Update the Python sys.path with package's dependencies
 
     :param package_name: name of the package that load_manifest() is being called from, ``str``
+    :param session: `roslib.session.Session` whose package data to use
+      instead of the module cache
     """
     if package_name in _bootstrapped:
         return
-    sys.path = _generate_python_path(package_name, _rospack) + sys.path
+    rospack = session.rospack if session is not None else _rospack
+    sys.path = _generate_python_path(package_name, rospack) + sys.path
     
 def _append_package_paths(manifest_, paths, pkg_dir):
     """
@@ -48,6 +48,7 @@ import roslib.packages
 
 MANIFEST_FILE = 'manifest.xml'
 
+import roslib.manifestcache
 import roslib.manifestlib
 # re-export symbols for backwards compatibility
 from roslib.manifestlib import ManifestException, Depend, Export, ROSDep, VersionControl
@@ -62,13 +63,14 @@ class Manifest(roslib.manifestlib._Manifest):
         Initialize new empty manifest.
         """
         super(Manifest, self).__init__('package')
-        
-    def get_export(self, tag, attr):
-        """
-        @return: exports that match the specified tag and attribute, e.g. 'python', 'path'
-        @rtype: [L{Export}]
-        """
-        return [e.get(attr) for e in self.exports if e.tag == tag if e.get(attr) is not None]
+
+class LazyManifest(Manifest, roslib.manifestlib._LazyManifest):
+    """
+    L{Manifest} that decodes its description and unknown_tags on
+    first access. Use for loading many manifests of which mostly
+    depends and exports are read.
+    """
+    __slots__ = []
 
 def _manifest_file_by_dir(package_dir, required=True, env=None):
     """
@@ -128,15 +130,39 @@ def load_manifest(package):
     """
     return parse_file(manifest_file(package))
     
-def parse_file(file):
+def parse_file(file, lazy=False):
     """
-    Parse manifest.xml file
+    Parse manifest.xml file. Parsed manifests are cached (see
+    L{roslib.manifestcache}), so the returned instance may be shared
+    and must not be modified.
     @param file: manifest.xml file path
     @type  file: str
+    @param lazy: if True, the manifest may be a L{LazyManifest}
+    @type  lazy: bool
     @return: Manifest instance
     @rtype: L{Manifest}
     """
-    return roslib.manifestlib.parse_file(Manifest(), file)
+    return roslib.manifestcache.parse_file(LazyManifest if lazy else Manifest, file)
+
+def parse_files(paths, workers=1, errors=None):
+    """
+    Parse many manifest.xml files, optionally in parallel worker processes
+    if there are many that are not cached yet. Errors are collected
+    instead of raised.
+    @param paths: manifest.xml file paths
+    @type  paths: [str]
+    @param workers: number of worker processes. 1 (the default)
+      parses in this process, None uses the number of CPUs. Only use
+      worker processes in a process that does not run threads.
+    @type  workers: int
+    @param errors: (optional) dictionary that is updated with the
+      exception raised for each file that cannot be parsed
+    @type  errors: {str: Exception}
+    @return: Manifest instance for each path, in order, or None if the
+      file cannot be parsed
+    @rtype: [L{Manifest}]
+    """
+    return roslib.manifestcache.parse_files(Manifest, paths, workers, errors)
 
 def parse(string, filename='string'):
     """
@@ -0,0 +1,337 @@
+#! /usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Cache of parsed manifest files (manifest.xml, stack.xml).
+
+Parsed manifests are kept in memory, so that repeated loads of a
+manifest return the same instance, and in a marshal file in ROS_HOME,
+so that later processes do not have to parse the XML again. Entries
+are validated against the mtime and size of the manifest file.
+Manifests modified within RACY_INTERVAL of being read are not cached,
+see L{roslib.marshalcache}.
+
+Manifests with unrecognized tags are only cached in memory, as their
+unknown_tags are kept as DOM elements. Records for the cache file are
+built when it is saved, so that lazily decoded manifests (see
+L{roslib.manifestlib._LazyManifest}) are not decoded while they are
+in use.
+
+Warning: do not use this library.  It is unstable and most of the routines
+here have been superceded by other libraries (e.g. rospkg).  These
+routines will likely be *deleted* in future releases.
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = None # Python 2 without the futures backport
+
+import roslib.manifestlib
+import roslib.marshalcache
+
+# parsed manifests, stored in ROS_HOME
+CACHE_FILE = 'roslib_manifest_cache'
+# bump whenever the format of cache records changes
+CACHE_VERSION = 1
+# parse_files() only starts worker processes for at least this many
+# manifests that are not cached
+PARALLEL_THRESHOLD = 64
+
+_FIELDS = ['description', 'brief', 'author', 'license', 'license_url',
+           'url', 'logo', 'version', 'status', 'notes']
+
+def _to_record(m):
+    """
+    @param m: parsed manifest
+    @type  m: L{roslib.manifestlib._Manifest}
+    @return: manifest fields as a marshal-able record, or None if m
+      cannot be stored
+    @rtype: tuple
+    """
+    if m.unknown_tags:
+        return None
+    if m._type == 'stack':
+        depends = [d.stack for d in m.depends]
+    else:
+        depends = [d.package for d in m.depends]
+    vc = m.versioncontrol
+    return (m._type, [getattr(m, f) for f in _FIELDS], depends,
+            [r.name for r in m.rosdeps],
+            [(p.os, p.version, p.notes) for p in m.platforms],
+            [(e.tag, dict(e.attrs), e.str) for e in m.exports],
+            (vc.type, vc.url) if vc is not None else None)
+
+def _from_record(m, record):
+    """
+    Populate m from a record written by L{_to_record()}.
+    @param m: manifest to populate
+    @type  m: L{roslib.manifestlib._Manifest}
+    @return: m
+    @rtype: L{roslib.manifestlib._Manifest}
+    """
+    _, values, depends, rosdeps, platforms, exports, vc = record
+    for f, v in zip(_FIELDS, values):
+        setattr(m, f, v)
+    if m._type == 'stack':
+        m.depends = [roslib.manifestlib.StackDepend(d) for d in depends]
+    elif m._type == 'package':
+        m.depends = [roslib.manifestlib.Depend(d) for d in depends]
+    m.rosdeps = [roslib.manifestlib.ROSDep(r) for r in rosdeps]
+    m.platforms = [roslib.manifestlib.Platform(*p) for p in platforms]
+    m.exports = [roslib.manifestlib.Export(tag, roslib.manifestlib._intern_attrs(attrs), str_) for tag, attrs, str_ in exports]
+    m.versioncontrol = roslib.manifestlib.VersionControl(*vc) if vc is not None else None
+    m.unknown_tags = []
+    return m
+
+def _parse_record(args):
+    """
+    Parse a manifest in a worker process of L{ManifestCache.parse_files()}.
+    @param args: manifest type and file path
+    @type  args: (str, str)
+    @return: (record, error). record is None if the manifest cannot be
+      stored as a record and has to be parsed by the caller.
+    @rtype: (tuple, Exception)
+    """
+    type_, file = args
+    try:
+        return _to_record(roslib.manifestlib.parse_file(roslib.manifestlib._Manifest(type_), file)), None
+    except Exception as e:
+        return None, e
+
+class ManifestCache(object):
+    """
+    Cache of parsed manifests. This class is thread-safe.
+    """
+
+    def __init__(self, filename=None):
+        """
+        @param filename: cache file. Defaults to L{CACHE_FILE} in
+          ROS_HOME, as it is when the cache is first used.
+        @type  filename: str
+        """
+        self._file = roslib.marshalcache.MarshalCacheFile(CACHE_FILE, CACHE_VERSION, filename)
+        self._lock = threading.Lock()
+        # {path: (stamp, manifest, record)} added since the cache file
+        # was saved. record is None until the cache file is saved.
+        self._added = {}
+        # {path: ((mtime, size), manifest)}
+        self._manifests = {}
+        self._registered = False
+
+    def _lookup(self, factory, path, stamp):
+        """
+        @return: cached manifest, or None. Must be called with the lock held.
+        @rtype: L{roslib.manifestlib._Manifest}
+        """
+        entry = self._manifests.get(path, None)
+        # a lazy manifest and its eager base class are interchangeable
+        if entry is not None and entry[0] == stamp and \
+                (isinstance(entry[1], factory) or issubclass(factory, type(entry[1]))):
+            return entry[1]
+        record = self._file.get(path, *stamp)
+        if record is not None:
+            m = factory()
+            if record[0] == m._type:
+                _from_record(m, record)
+                self._manifests[path] = (stamp, m)
+                return m
+        return None
+
+    def _store(self, path, stamp, m, record=None):
+        """
+        Add a parsed manifest, unless its file is racy. Must be called
+        with the lock held.
+        @param record: cache record of m, if already built
+        @type  record: tuple
+        """
+        if roslib.marshalcache.is_racy(stamp[0]):
+            return
+        self._added[path] = (stamp, m, record)
+        if not self._registered:
+            self._registered = True
+            atexit.register(self.save)
+        self._manifests[path] = (stamp, m)
+
+    def parse_file(self, factory, file):
+        """
+        Load manifest file, from the cache if it has not changed.
+        @param factory: manifest class, e.g. L{roslib.manifest.Manifest}
+        @type  factory: fn() -> L{roslib.manifestlib._Manifest}
+        @param file: manifest file path
+        @type  file: str
+        @return: manifest instance. The same instance is returned until
+          the file changes, so it must not be modified.
+        @rtype: L{roslib.manifestlib._Manifest}
+        @raise ManifestException: if the manifest is invalid
+        @raise ValueError: if file does not exist
+        """
+        try:
+            s = os.stat(file)
+        except (OSError, TypeError):
+            # let manifestlib report the error
+            return roslib.manifestlib.parse_file(factory(), file)
+        path = os.path.abspath(file)
+        stamp = (s.st_mtime, s.st_size)
+        with self._lock:
+            m = self._lookup(factory, path, stamp)
+            if m is None:
+                m = roslib.manifestlib.parse_file(factory(), file)
+                self._store(path, stamp, m)
+            return m
+
+    def parse_files(self, factory, files, workers=1, errors=None):
+        """
+        Load many manifest files. If workers is not 1, manifests that
+        are not cached are parsed by a pool of worker processes if
+        there are at least L{PARALLEL_THRESHOLD} of them. The pool is
+        opt-in, as forking a process that runs threads is unsafe.
+        @param factory: manifest class, e.g. L{roslib.manifest.Manifest}
+        @type  factory: fn() -> L{roslib.manifestlib._Manifest}
+        @param files: manifest file paths
+        @type  files: [str]
+        @param workers: number of worker processes. 1 (the default)
+          parses in this process, None uses the number of CPUs.
+        @type  workers: int
+        @param errors: (optional) dictionary that is updated with the
+          exception raised for each file that cannot be loaded
+        @type  errors: {str: Exception}
+        @return: manifest instance for each file, in order, or None if
+          the file cannot be loaded
+        @rtype: [L{roslib.manifestlib._Manifest}]
+        """
+        results = [None] * len(files)
+        todo = []
+        with self._lock:
+            for i, file in enumerate(files):
+                try:
+                    s = os.stat(file)
+                except (OSError, TypeError):
+                    todo.append((i, file, None, None))
+                    continue
+                path = os.path.abspath(file)
+                stamp = (s.st_mtime, s.st_size)
+                results[i] = self._lookup(factory, path, stamp)
+                if results[i] is None:
+                    todo.append((i, file, path, stamp))
+
+        parsed = None
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if len(todo) >= PARALLEL_THRESHOLD and workers > 1 and ProcessPoolExecutor is not None:
+            type_ = factory()._type
+            args = [(type_, file) for _, file, _, _ in todo]
+            try:
+                executor = ProcessPoolExecutor(workers)
+                try:
+                    chunksize = max(1, len(args) // (workers * 4))
+                    parsed = list(executor.map(_parse_record, args, chunksize=chunksize))
+                finally:
+                    executor.shutdown(wait=True)
+            except Exception:
+                parsed = None # no worker processes, parse serially
+
+        with self._lock:
+            for j, (i, file, path, stamp) in enumerate(todo):
+                record, error = parsed[j] if parsed is not None else (None, None)
+                try:
+                    if error is not None:
+                        raise error
+                    if record is not None:
+                        m = _from_record(factory(), record)
+                    else:
+                        m = roslib.manifestlib.parse_file(factory(), file)
+                except Exception as e:
+                    if errors is not None:
+                        errors[file] = e
+                    continue
+                if path is not None:
+                    self._store(path, stamp, m, record)
+                results[i] = m
+        return results
+
+    def clear(self):
+        """
+        Clear the in-memory cache. The cache file is not affected.
+        """
+        with self._lock:
+            self._manifests.clear()
+            self._file.clear()
+            self._added.clear()
+
+    def save(self):
+        """
+        Add the manifests parsed by this process to the cache file,
+        see L{roslib.marshalcache.MarshalCacheFile.save()}. Errors are
+        ignored, as the cache is only an optimization.
+        @return: True if the cache file was written
+        @rtype: bool
+        """
+        with self._lock:
+            added = {}
+            for path, (stamp, m, record) in self._added.items():
+                if record is None:
+                    record = _to_record(m)
+                if record is not None:
+                    added[path] = (stamp[0], stamp[1], record)
+            self._added.clear()
+            if not added:
+                return False
+            return self._file.save(added)
+
+_manifest_cache = ManifestCache()
+
+def parse_file(factory, file):
+    """
+    Load manifest file using the process-wide L{ManifestCache}.
+    @param factory: manifest class, e.g. L{roslib.manifest.Manifest}
+    @type  factory: fn() -> L{roslib.manifestlib._Manifest}
+    @param file: manifest file path
+    @type  file: str
+    @rtype: L{roslib.manifestlib._Manifest}
+    @raise ManifestException: if the manifest is invalid
+    """
+    return _manifest_cache.parse_file(factory, file)
+
+def parse_files(factory, files, workers=1, errors=None):
+    """
+    Load many manifest files using the process-wide L{ManifestCache},
+    see L{ManifestCache.parse_files()}.
+    @rtype: [L{roslib.manifestlib._Manifest}]
+    """
+    return _manifest_cache.parse_files(factory, files, workers, errors)
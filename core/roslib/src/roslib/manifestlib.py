@@ -43,6 +43,7 @@ import sys
 import os
 import xml.dom
 import xml.dom.minidom as dom
+from xml.parsers import expat
 
 import roslib.exceptions
 
@@ -57,6 +58,17 @@ VALID = REQUIRED + OPTIONAL
 
 class ManifestException(roslib.exceptions.ROSLibException): pass
 
+if sys.hexversion > 0x03000000: #Python3
+    def _intern(s):
+        """
+        Intern names that recur across manifests (tags, attribute
+        keys, package names), so that resident manifests share them.
+        """
+        return sys.intern(s) if type(s) is str else s
+else:
+    def _intern(s):
+        return intern(s) if type(s) is str else s
+
 def get_nodes_by_name(n, name):
     return [t for t in n.childNodes if t.nodeType == t.ELEMENT_NODE and t.tagName == name]
     
@@ -162,8 +174,15 @@ def check_rosdeps(name):
 def _attrs(node):
     attrs = {}
     for k in node.attributes.keys(): 
-        attrs[k] = node.attributes.get(k).value
+        attrs[_intern(k)] = _intern(node.attributes.get(k).value)
     return attrs
+
+def _intern_attrs(attrs):
+    """
+    @return: copy of attrs with interned keys and values
+    @rtype: dict
+    """
+    return dict((_intern(k), _intern(v)) for k, v in attrs.items())
     
 def check_exports(name):
     def check(n, filename):
@@ -207,6 +226,7 @@ class Export(object):
     """
     Manifest 'export' tag
     """
+    __slots__ = ['tag', 'attrs', 'str']
     
     def __init__(self, tag, attrs, str):
         """
@@ -218,7 +238,7 @@ class Export(object):
         @param str: string value contained by tag, if any
         @type  str: str
         """
-        self.tag = tag
+        self.tag = _intern(tag)
         self.attrs = attrs
         self.str = str
 
@@ -259,8 +279,8 @@ class Platform(object):
             raise ValueError("bad 'os' attribute")
         if not version:
             raise ValueError("bad 'version' attribute")
-        self.os = os
-        self.version = version
+        self.os = _intern(os)
+        self.version = _intern(version)
         self.notes = notes
         
     def __str__(self):
@@ -298,7 +318,7 @@ class Depend(object):
         """
         if not package:
             raise ValueError("bad 'package' attribute")
-        self.package = package
+        self.package = _intern(package)
     def __str__(self):
         return self.package
     def __repr__(self):
@@ -327,7 +347,7 @@ class StackDepend(object):
         """
         if not stack:
             raise ValueError("bad 'stack' attribute")
-        self.stack = stack
+        self.stack = _intern(stack)
         self.annotation = None
         
     def __str__(self):
@@ -362,7 +382,7 @@ class ROSDep(object):
         """
         if not name:
             raise ValueError("bad 'name' attribute")
-        self.name = name
+        self.name = _intern(name)
     def xml(self):
         """
         @return: rosdep instance represented as manifest XML
@@ -475,6 +495,51 @@ class _Manifest(object):
                          rosdeps, platforms, exports, versioncontrol, version])
         return "<%s>\n"%self._type + "\n".join(fields) + "\n</%s>"%self._type
 
+class _LazyManifest(_Manifest):
+    """
+    Manifest that decodes its XHTML description and unknown_tags on
+    first access, when populated by L{parse()}. These are serialized
+    from or built as DOM nodes, which is most of the cost of parsing
+    a manifest, while most callers only read depends and exports.
+    Validation errors are still raised by L{parse()}. The other
+    fields are plain strings and small objects that take no more
+    memory decoded than the recorded elements would.
+    """
+    # sources of the fields that have not been decoded yet, or None
+    __slots__ = ['_description_source', '_unknown_tags_source']
+
+    def __init__(self, _type='package'):
+        self._description_source = self._unknown_tags_source = None
+        super(_LazyManifest, self).__init__(_type)
+
+    def _defer(self, name, source):
+        """
+        Set the source that field name is decoded from on first access.
+        """
+        setattr(self, '_%s_source'%name, source)
+
+def _lazy_field(name, decode):
+    """
+    @param decode: function that takes in the source of the field
+      and returns its value
+    @type  decode: fn(object) -> object
+    @return: property for a lazily decoded field of L{_LazyManifest},
+      stored in the slot of L{_Manifest}
+    @rtype: property
+    """
+    slot = _Manifest.__dict__[name]
+    source_slot = _LazyManifest.__dict__['_%s_source'%name]
+    def get(self):
+        source = source_slot.__get__(self, type(self))
+        if source is not None:
+            slot.__set__(self, decode(source))
+            source_slot.__set__(self, None)
+        return slot.__get__(self, type(self))
+    def set(self, value):
+        source_slot.__set__(self, None)
+        slot.__set__(self, value)
+    return property(get, set)
+
 def _get_text(nodes):
     """
     DOM utility routine for getting contents of text nodes
@@ -502,9 +567,370 @@ def parse_file(m, file):
     except ManifestException as e:
         raise ManifestException("Invalid manifest file [%s]: %s"%(os.path.abspath(file), e))
 
+def parse_exports(string, filename='string'):
+    """
+    Parse only the <export> tags of a manifest. Use for manifests
+    whose other tags are not valid in a manifest.xml, e.g. a catkin
+    package.xml.
+    @param string: manifest contents
+    @type  string: str
+    @return: exports, in document order
+    @rtype: [L{Export}]
+    @raise ManifestException: if string is not valid XML
+    """
+    try:
+        root, elements = _ManifestParser().parse(string)
+    except _Namespaces:
+        try:
+            d = dom.parseString(string)
+        except Exception as e:
+            raise ManifestException("invalid XML: %s"%e)
+        return check('export')(d.documentElement, filename)
+    except Exception as e:
+        raise ManifestException("invalid XML: %s"%e)
+    return [Export(t.tag, _intern_attrs(t.attrs), t.get_text()) for e in elements if e.tag == 'export' for t in e.elements]
+
+class _Element(object):
+    """
+    Element recorded by L{_ManifestParser}
+    """
+    __slots__ = ['tag', 'attrs', 'text', 'elements', 'events']
+
+    def __init__(self, tag, attrs):
+        self.tag = tag
+        self.attrs = attrs
+        # contents of the element's own text nodes
+        self.text = []
+        # child elements, only recorded for 'export'
+        self.elements = None
+        # contents as parse events, only recorded for XHTML and
+        # unrecognized tags, see to_dom()
+        self.events = None
+
+    def get_text(self):
+        return ''.join(self.text)
+
+    def getAttribute(self, name):
+        return self.attrs.get(name, '')
+
+    def to_dom(self, attrs=True):
+        """
+        Build the DOM element that minidom would have parsed.
+        @param attrs: if False, leave out the attributes of the element
+          itself
+        @type  attrs: bool
+        @rtype: xml.dom.minidom.Element
+        """
+        doc = dom.Document()
+        node = root = doc.createElement(self.tag)
+        if attrs:
+            for k, v in self.attrs.items():
+                node.setAttribute(k, v)
+        for event in self.events:
+            kind = event[0]
+            if kind == 't':
+                # like minidom, merge adjacent text
+                last = node.lastChild
+                if last is not None and last.nodeType == last.TEXT_NODE:
+                    last.data += event[1]
+                else:
+                    node.appendChild(doc.createTextNode(event[1]))
+            elif kind == 's':
+                child = doc.createElement(event[1])
+                for k, v in event[2].items():
+                    child.setAttribute(k, v)
+                node.appendChild(child)
+                node = child
+            elif kind == 'e':
+                node = node.parentNode
+            elif kind == 'd':
+                if event[1]:
+                    node.appendChild(doc.createCDATASection(''.join(event[1])))
+            elif kind == 'c':
+                node.appendChild(doc.createComment(event[1]))
+            elif kind == 'p':
+                node.appendChild(doc.createProcessingInstruction(event[1], event[2]))
+        return root
+
+class _Namespaces(Exception):
+    """
+    Raised by L{_ManifestParser} when the document uses XML
+    namespaces, which are left to minidom.
+    """
+    pass
+
+class _ManifestParser(object):
+    """
+    Single-pass expat parser for manifest files. The children of the
+    root element are recorded as L{_Element}s in document order. Text
+    is only kept where a field reads it, and the contents of elements
+    that the manifest keeps as XML are recorded as a list of events.
+    """
+
+    def __init__(self):
+        # same expat configuration as xml.dom.minidom, so that invalid
+        # documents fail with the same errors
+        p = self.parser = expat.ParserCreate(namespace_separator=' ')
+        p.namespace_prefixes = True
+        p.buffer_text = True
+        p.StartElementHandler = self.start_element
+        p.EndElementHandler = self.end_element
+        p.CharacterDataHandler = self.characters
+        p.StartCdataSectionHandler = self.start_cdata
+        p.EndCdataSectionHandler = self.end_cdata
+        p.CommentHandler = self.comment
+        p.ProcessingInstructionHandler = self.processing_instruction
+        p.StartNamespaceDeclHandler = self.start_namespace
+        self.root = None
+        self.elements = []
+        # open elements: the recorded _Element, or None
+        self.stack = []
+        # events of the element that is being recorded
+        self.events = None
+        self.cdata = False
+
+    def parse(self, string):
+        """
+        @return: root tag name and its child elements
+        @rtype: (str, [L{_Element}])
+        """
+        try:
+            self.parser.Parse(string, True)
+        finally:
+            # the handlers reference self: break the cycle, so that
+            # the expat parser is freed without waiting for gc
+            self.parser = None
+        return self.root, self.elements
+
+    def start_element(self, tag, attrs):
+        # expat reports namespaced names as 'uri name prefix'
+        if ' ' in tag or [k for k in attrs if ' ' in k]:
+            raise _Namespaces()
+        stack = self.stack
+        depth = len(stack)
+        e = None
+        if depth == 1:
+            e = _Element(tag, attrs)
+            self.elements.append(e)
+            if tag == 'export':
+                e.elements = []
+            elif tag in ALLOWXHTML or tag not in VALID:
+                e.events = self.events = []
+        elif depth == 0:
+            self.root = tag
+        else:
+            parent = stack[-1]
+            if parent is not None and parent.elements is not None:
+                e = _Element(tag, attrs)
+                parent.elements.append(e)
+            if self.events is not None:
+                self.events.append(('s', tag, attrs))
+        stack.append(e)
+
+    def end_element(self, tag):
+        self.stack.pop()
+        if self.events is not None:
+            if len(self.stack) == 1:
+                self.events = None
+            else:
+                self.events.append(('e',))
+
+    def characters(self, data):
+        if self.cdata:
+            if self.events is not None:
+                self.events[-1][1].append(data)
+            return
+        e = self.stack[-1] if self.stack else None
+        if e is not None:
+            e.text.append(data)
+        if self.events is not None:
+            self.events.append(('t', data))
+
+    def start_cdata(self):
+        self.cdata = True
+        if self.events is not None:
+            self.events.append(('d', []))
+
+    def end_cdata(self):
+        self.cdata = False
+
+    def comment(self, data):
+        if self.events is not None:
+            self.events.append(('c', data))
+
+    def processing_instruction(self, target, data):
+        if self.events is not None:
+            self.events.append(('p', target, data))
+
+    def start_namespace(self, prefix, uri):
+        raise _Namespaces()
+
+def _check_count(name, elements, merge_multiple=False, required=False):
+    """
+    Validate the number of elements of a text field, see
+    L{check_optional()} and L{check_required()}.
+    @raise ManifestException: if validation fails
+    """
+    if elements and len(elements) > 1 and not merge_multiple:
+        if required:
+            raise ManifestException("Invalid manifest file: must have only one '%s' element"%name)
+        raise ManifestException("Invalid manifest file: must have a single '%s' element"%name)
+
+def _xhtml_source(e):
+    """
+    @return: compact source for the XHTML value of element e: its
+      text if it only contains text, else e itself
+    @rtype: str or L{_Element}
+    """
+    for event in e.events:
+        if event[0] != 't':
+            return e
+    return ''.join([event[1] for event in e.events])
+
+def _xhtml_value(sources):
+    """
+    @param sources: see L{_xhtml_source()}
+    @type  sources: [str or L{_Element}]
+    @return: value of an XHTML text field, as minidom would serialize it
+    @rtype: str
+    """
+    if not sources:
+        return None
+    values = []
+    for source in sources:
+        if isinstance(source, _Element):
+            values.append(''.join([x.toxml() for x in source.to_dom(False).childNodes]))
+        elif source:
+            values.append(dom.Document().createTextNode(source).toxml())
+        else:
+            values.append('')
+    return ', '.join(values)
+
+def _get_value(elements, required=False):
+    """
+    @param elements: recorded elements of a text field
+    @type  elements: [L{_Element}]
+    @return: value of the text field, see L{check_optional()} and
+      L{check_required()}
+    @rtype: str
+    """
+    if not elements:
+        return '' if required else None
+    return ', '.join([e.get_text().strip() for e in elements])
+
+def _unknown_tags(elements):
+    """
+    @return: DOM elements for the unrecognized tags of a manifest
+    @rtype: [xml.dom.minidom.Element]
+    """
+    return [e.to_dom() for e in elements]
+
+_LazyManifest.description = _lazy_field('description', _xhtml_value)
+_LazyManifest.unknown_tags = _lazy_field('unknown_tags', _unknown_tags)
+
 def parse(m, string, filename='string'):
     """
-    Parse manifest.xml string contents
+    Parse manifest.xml string contents. If m is a L{_LazyManifest},
+    text fields and unknown tags are decoded on first access.
+    @param string: manifest.xml contents
+    @type  string: str
+    @param m: field to populate
+    @type  m: L{_Manifest}
+    @return: return m, populated with parsed fields
+    @rtype: L{_Manifest}
+    """
+    try:
+        root, elements = _ManifestParser().parse(string)
+    except _Namespaces:
+        return _parse_dom(m, string, filename)
+    except Exception as e:
+        raise ManifestException("invalid XML: %s"%e)
+
+    if root != m._type:
+        raise ManifestException("manifest must have a single '%s' element"%m._type)
+    tags = {}
+    for e in elements:
+        if e.tag in tags:
+            tags[e.tag].append(e)
+        else:
+            tags[e.tag] = [e]
+    get = tags.get
+    lazy = isinstance(m, _LazyManifest)
+
+    # fields are validated in the same order as _parse_dom(), so that
+    # the same error is raised for a manifest with several problems
+    description = get('description')
+    _check_count('description', description)
+    sources = [_xhtml_source(e) for e in description] if description else None
+    if lazy and sources:
+        m._defer('description', sources)
+    else:
+        m.description = _xhtml_value(sources)
+    m.brief = (description[0].getAttribute('brief') or '') if description else ''
+    #TODO: figure out how to multiplex
+    if m._type == 'package':
+        depends = [e.attrs for e in get('depend', ()) if 'thirdparty' not in e.attrs]
+        try:
+            packages = [d['package'] for d in depends]
+        except KeyError:
+            raise ManifestException("Invalid manifest file: depends is missing 'package' attribute")
+        m.depends = [Depend(p) for p in packages]
+    elif m._type == 'stack':
+        m.depends = [StackDepend(e.attrs['stack']) for e in get('depend', ())]
+    elif m._type == 'app':
+        # not implemented yet
+        pass
+    m.rosdeps = [ROSDep(e.attrs['name']) for e in get('rosdep', ())]
+    try:
+        vals = [(e.attrs['os'], e.attrs['version'], e.getAttribute('notes')) for e in get('platform', ())]
+    except KeyError as e:
+        raise ManifestException("<platform> tag is missing required '%s' attribute"%str(e))
+    m.platforms = [Platform(*v) for v in vals]
+    m.exports = [Export(t.tag, _intern_attrs(t.attrs), t.get_text()) for e in get('export', ()) for t in e.elements]
+    versioncontrol = get('versioncontrol')
+    if versioncontrol:
+        # note: 'url' isn't actually required, but as we only support type=svn it implicitly is for now
+        m.versioncontrol = VersionControl(versioncontrol[0].attrs['type'], versioncontrol[0].attrs['url'])
+    else:
+        m.versioncontrol = None
+    license = get('license')
+    _check_count('license', license, required=True)
+    m.license = _intern(_get_value(license, required=True))
+    m.license_url = (license[0].getAttribute('url') or '') if license else ''
+
+    review = get('review')
+    if review:
+        m.status = _intern(review[0].getAttribute('status') or '')
+        m.notes = _intern(review[0].getAttribute('notes') or '')
+    else:
+        m.status = 'unreviewed'
+        m.notes = ''
+
+    m.author = _intern(_get_value(get('author'), required=True))
+    for name in ['url', 'version', 'logo']:
+        values = get(name)
+        _check_count(name, values)
+        setattr(m, name, _get_value(values))
+
+    # do some validation on what we just parsed
+    if m._type == 'stack':
+        if m.exports:
+            raise ManifestException("stack manifests are not allowed to have exports")
+        if m.rosdeps:
+            raise ManifestException("stack manifests are not allowed to have rosdeps") 
+
+    # store unrecognized tags
+    unknown = [e for e in elements if e.tag not in VALID]
+    if lazy and unknown:
+        m._defer('unknown_tags', unknown)
+    else:
+        m.unknown_tags = _unknown_tags(unknown)
+    return m
+
+def _parse_dom(m, string, filename='string'):
+    """
+    Parse manifest.xml string contents with minidom. L{parse()}
+    falls back to this for documents that declare XML namespaces.
     @param string: manifest.xml contents
     @type  string: str
     @param m: field to populate
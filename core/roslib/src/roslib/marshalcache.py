@@ -0,0 +1,204 @@
+#! /usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Marshal files in ROS_HOME that cache records derived from source
+files, shared by L{roslib.manifestcache} and L{roslib.msgcache}.
+
+Each record is stored with the mtime and size of its source file and
+is only used while both match. Files whose mtime is within
+RACY_INTERVAL of the time they are read are not cached, as a later
+edit within the filesystem's timestamp resolution that keeps the size
+the same would go unnoticed. When the file is saved, records whose
+source files have changed or no longer exist are dropped, so that it
+does not grow with every workspace that it has seen.
+
+Warning: do not use this library.  It is unstable and most of the routines
+here have been superceded by other libraries (e.g. rospkg).  These
+routines will likely be *deleted* in future releases.
+"""
+
+import marshal
+import os
+import sys
+import time
+
+import rospkg
+
+from roslib.crawler import RACY_INTERVAL
+
+def is_racy(mtime, now=None):
+    """
+    @param mtime: mtime of a file
+    @type  mtime: float
+    @param now: time the file was read. Defaults to the current time.
+    @type  now: float
+    @return: True if the file may change again without changing its mtime
+    @rtype: bool
+    """
+    if now is None:
+        now = time.time()
+    return mtime > now - RACY_INTERVAL
+
+def _identity(key):
+    return key
+
+class MarshalCacheFile(object):
+    """
+    Cache file of {key: (mtime, size, record)}. Records are loaded on
+    first use. This class is not thread-safe: callers serialize access
+    with their own lock.
+    """
+
+    def __init__(self, name, version, filename=None, path_of=None):
+        """
+        @param name: file name in ROS_HOME, used if filename is None
+        @type  name: str
+        @param version: format version of the records. Files written
+          with a different version, or by a different version of
+          Python, are ignored.
+        @type  version: int
+        @param filename: cache file. Defaults to name in ROS_HOME, as
+          it is when the cache is first used after L{clear()}.
+        @type  filename: str
+        @param path_of: function that returns the source file path of
+          a key. Defaults to the key itself.
+        @type  path_of: fn(key) -> str
+        """
+        self.name = name
+        self.version = version
+        self.filename = filename
+        self._default = filename is None
+        self.path_of = path_of or _identity
+        self._records = None
+
+    def _get_filename(self):
+        if self.filename is None:
+            self.filename = os.path.join(rospkg.get_ros_home(), self.name)
+        return self.filename
+
+    def _read(self):
+        """
+        @return: records in the file. Empty if the file does not exist,
+          is corrupt or was written by a different version of Python or
+          roslib.
+        @rtype: dict
+        """
+        try:
+            # marshal.load() reads file objects in small pieces
+            with open(self._get_filename(), 'rb') as f:
+                version, python_version, records = marshal.loads(f.read())
+            if version != self.version or python_version != tuple(sys.version_info[:2]):
+                return {}
+            return records
+        except Exception:
+            return {}
+
+    def get(self, key, mtime, size):
+        """
+        @return: record of key, or None if there is none for a source
+          file with this mtime and size
+        """
+        if self._records is None:
+            self._records = self._read()
+        entry = self._records.get(key, None)
+        if entry is not None and entry[0] == mtime and entry[1] == size:
+            return entry[2]
+        return None
+
+    def put(self, key, mtime, size, record):
+        """
+        Add a record in memory, so that get() returns it. Records are
+        written to the file by L{save()}.
+        """
+        if self._records is None:
+            self._records = self._read()
+        self._records[key] = (mtime, size, record)
+
+    def clear(self):
+        """
+        Forget the loaded records. The file is read again on next use,
+        from the current ROS_HOME if no filename was specified.
+        """
+        self._records = None
+        if self._default:
+            self.filename = None
+
+    def save(self, added):
+        """
+        Merge records into the file. Records written by other
+        processes in the meantime are kept, unless their source files
+        have changed or no longer exist. Records of racy source files
+        are left out. The file is only written if it changes. Errors
+        are ignored, as the cache is only an optimization.
+        @param added: {key: (mtime, size, record)}
+        @type  added: dict
+        @return: True if the file was written
+        @rtype: bool
+        """
+        now = time.time()
+        records = self._read()
+        changed = False
+        for key, entry in added.items():
+            if not is_racy(entry[0], now) and records.get(key, None) != entry:
+                records[key] = entry
+                changed = True
+        for key, entry in list(records.items()):
+            try:
+                s = os.stat(self.path_of(key))
+                valid = s.st_mtime == entry[0] and s.st_size == entry[1]
+            except OSError:
+                valid = False
+            if not valid:
+                del records[key]
+                changed = True
+        if self._records is not None:
+            self._records.update(records)
+        if not changed:
+            return False
+        filename = self._get_filename()
+        tmp = '%s.%s'%(filename, os.getpid())
+        try:
+            d = os.path.dirname(filename)
+            if d and not os.path.isdir(d):
+                os.makedirs(d)
+            with open(tmp, 'wb') as f:
+                marshal.dump((self.version, tuple(sys.version_info[:2]), records), f)
+            os.rename(tmp, filename)
+        except (IOError, OSError, ValueError):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+        return True
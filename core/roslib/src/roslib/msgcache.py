@@ -0,0 +1,213 @@
+#! /usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Cache of loaded message and service specifications (.msg, .srv files).
+
+Records of loaded specs are kept in memory and in a marshal file in
+ROS_HOME, so that later processes do not have to read and parse
+unchanged .msg/.srv files again. Entries are validated against the
+mtime and size of the file, and files modified within RACY_INTERVAL of
+being read are not cached (see L{roslib.marshalcache}). Each load
+returns a new
+L{roslib.msgs.MsgSpec}/L{roslib.srvs.SrvSpec}, built from the record,
+that is equal to the spec a fresh parse would return. Files that
+cannot be loaded are not cached.
+
+Warning: do not use this library.  It is unstable and most of the routines
+here have been superceded by other libraries (e.g. genmsg).  These
+routines will likely be *deleted* in future releases.
+"""
+
+import atexit
+import os
+import threading
+
+import roslib.marshalcache
+import roslib.msgs
+
+# loaded specs, stored in ROS_HOME
+CACHE_FILE = 'roslib_msg_cache'
+# bump whenever the format of cache records changes
+CACHE_VERSION = 1
+
+def _msg_to_record(spec):
+    """
+    @param spec: loaded message spec
+    @type  spec: L{roslib.msgs.MsgSpec}
+    @return: spec as a marshal-able record
+    @rtype: tuple
+    """
+    return (list(spec.types), list(spec.names),
+            [(c.type, c.name, c.val, c.val_text) for c in spec.constants],
+            spec.text, spec.full_name, spec.short_name, spec.package)
+
+def _msg_from_record(record):
+    """
+    @param record: record written by L{_msg_to_record()}
+    @type  record: tuple
+    @rtype: L{roslib.msgs.MsgSpec}
+    """
+    types, names, constants, text, full_name, short_name, package = record
+    constants = [roslib.msgs.Constant(*c) for c in constants]
+    return roslib.msgs.MsgSpec(list(types), list(names), constants, text, full_name, short_name, package)
+
+def _srv_to_record(spec):
+    """
+    @param spec: loaded service spec
+    @type  spec: L{roslib.srvs.SrvSpec}
+    @return: spec as a marshal-able record
+    @rtype: tuple
+    """
+    return (_msg_to_record(spec.request), _msg_to_record(spec.response),
+            spec.text, spec.full_name, spec.short_name, spec.package)
+
+def _srv_from_record(record):
+    """
+    @param record: record written by L{_srv_to_record()}
+    @type  record: tuple
+    @rtype: L{roslib.srvs.SrvSpec}
+    """
+    import roslib.srvs # roslib.srvs imports roslib.msgs, which imports this module
+    request, response, text, full_name, short_name, package = record
+    return roslib.srvs.SrvSpec(_msg_from_record(request), _msg_from_record(response),
+                               text, full_name, short_name, package)
+
+# {kind: (to_record, from_record)}
+_CODECS = {
+    'msg': (_msg_to_record, _msg_from_record),
+    'srv': (_srv_to_record, _srv_from_record),
+    }
+
+def _key_path(key):
+    """
+    @param key: cache key, (kind, path, package_context)
+    @type  key: tuple
+    @return: path of the file that key was loaded from
+    @rtype: str
+    """
+    return key[1]
+
+class MsgSpecCache(object):
+    """
+    Cache of loaded message and service specs. This class is thread-safe.
+    """
+
+    def __init__(self, filename=None):
+        """
+        @param filename: cache file. Defaults to L{CACHE_FILE} in
+          ROS_HOME, as it is when the cache is first used.
+        @type  filename: str
+        """
+        # records keyed by (kind, path, package_context)
+        self._file = roslib.marshalcache.MarshalCacheFile(CACHE_FILE, CACHE_VERSION, filename, path_of=_key_path)
+        self._lock = threading.Lock()
+        # records added since the cache file was saved
+        self._added = {}
+        self._registered = False
+
+    def load_file(self, kind, file_path, package_context, full_name, short_name, load):
+        """
+        Load .msg or .srv file, from the cache if it has not changed.
+        @param kind: 'msg' or 'srv'
+        @type  kind: str
+        @param file_path: path of file to load from
+        @type  file_path: str
+        @param package_context: package name of the spec, or '' to use
+          the local (relative) naming convention
+        @type  package_context: str
+        @param full_name: full type name of the spec. It must be
+          determined by file_path and package_context.
+        @type  full_name: str
+        @param short_name: type name of the spec without package
+        @type  short_name: str
+        @param load: function that loads the spec when it is not cached
+        @type  load: fn(file_path, package_context, full_name, short_name) -> spec
+        @return: a new spec instance
+        @rtype: L{roslib.msgs.MsgSpec} or L{roslib.srvs.SrvSpec}
+        @raise MsgSpecException: if load() raises it
+        """
+        to_record, from_record = _CODECS[kind]
+        try:
+            s = os.stat(file_path)
+        except OSError:
+            # let load() report the error
+            return load(file_path, package_context, full_name, short_name)
+        key = (kind, os.path.abspath(file_path), package_context)
+        with self._lock:
+            record = self._file.get(key, s.st_mtime, s.st_size)
+        if record is not None:
+            return from_record(record)
+        spec = load(file_path, package_context, full_name, short_name)
+        if roslib.marshalcache.is_racy(s.st_mtime):
+            return spec
+        entry = (s.st_mtime, s.st_size, to_record(spec))
+        with self._lock:
+            self._file.put(key, *entry)
+            self._added[key] = entry
+            if not self._registered:
+                self._registered = True
+                atexit.register(self.save)
+        return spec
+
+    def clear(self):
+        """
+        Clear the in-memory cache. The cache file is not affected.
+        """
+        with self._lock:
+            self._file.clear()
+            self._added.clear()
+
+    def save(self):
+        """
+        Add the specs loaded by this process to the cache file, see
+        L{roslib.marshalcache.MarshalCacheFile.save()}. Errors are
+        ignored, as the cache is only an optimization.
+        @return: True if the cache file was written
+        @rtype: bool
+        """
+        with self._lock:
+            added = self._added
+            self._added = {}
+            if not added:
+                return False
+            return self._file.save(added)
+
+_msg_spec_cache = MsgSpecCache()
+
+def load_file(kind, file_path, package_context, full_name, short_name, load):
+    """
+    Load .msg or .srv file using the process-wide L{MsgSpecCache}, see
+    L{MsgSpecCache.load_file()}.
+    @rtype: L{roslib.msgs.MsgSpec} or L{roslib.srvs.SrvSpec}
+    """
+    return _msg_spec_cache.load_file(kind, file_path, package_context, full_name, short_name, load)
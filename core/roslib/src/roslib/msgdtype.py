@@ -0,0 +1,158 @@
+#! /usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Compile fixed-size message specs (L{roslib.msgs.MsgSpec}) to NumPy
+structured dtypes, to decode many serialized messages at once.
+
+A message is fixed-size if it contains no strings, variable-length
+arrays or embedded messages that do. Its dtype has a field per
+message field, in order: embedded messages and time/duration
+(secs, nsecs) become nested structured fields and fixed-length arrays
+become subarrays. A buffer of N back-to-back serialized messages can
+then be viewed as an array of N records without copying.
+
+NumPy is only needed to compile and decode; it is imported on first
+use.
+
+Warning: do not use this library.  It is unstable and most of the routines
+here have been superceded by other libraries (e.g. genpy).  These
+routines will likely be *deleted* in future releases.
+"""
+
+import roslib.msgs
+
+## dtype of each fixed-width builtin type
+_DTYPES = {
+    'int8': '<i1', 'uint8': '<u1', 'int16': '<i2', 'uint16': '<u2',
+    'int32': '<i4', 'uint32': '<u4', 'int64': '<i8', 'uint64': '<u8',
+    'float32': '<f4', 'float64': '<f8', 'bool': '?',
+    # deprecated:
+    'char': '<u1', 'byte': '<i1',
+    'time': [('secs', '<u4'), ('nsecs', '<u4')],
+    'duration': [('secs', '<i4'), ('nsecs', '<i4')],
+    }
+
+def _check_fixed_size(spec, registry):
+    """
+    @raise MsgSpecException: if spec is not fixed-size
+    @raise KeyError: if an embedded type is not registered
+    """
+    if spec.get_layout(registry).fixed_size:
+        return
+    name = spec.full_name or 'message'
+    for field_name, type_ in zip(spec.names, spec.types):
+        fmt, _, _ = roslib.msgs._field_layout(type_, spec.package, registry)
+        if fmt is None:
+            raise roslib.msgs.MsgSpecException(
+                "%s is not fixed-size: field [%s] has variable-size type [%s]"%(name, field_name, type_))
+
+def _dtype_fields(spec, registry):
+    """
+    @return: dtype description of a fixed-size spec
+    @rtype: [tuple]
+    """
+    fields = []
+    for name, type_ in zip(spec.names, spec.types):
+        base_type, is_array, array_len = roslib.msgs.parse_type(type_)
+        if base_type in _DTYPES:
+            dtype = _DTYPES[base_type]
+        else:
+            dtype = _dtype_fields(registry.get_registered(base_type, spec.package), registry)
+        if is_array:
+            fields.append((name, dtype, (array_len,)))
+        else:
+            fields.append((name, dtype))
+    return fields
+
+def compile_dtype(spec, registry=None):
+    """
+    Compile a fixed-size message spec to the equivalent little-endian
+    structured dtype.
+    @param spec: message spec
+    @type  spec: L{roslib.msgs.MsgSpec}
+    @param registry: (optional) registry to look up embedded types
+      in. Defaults to the module registry of L{roslib.msgs}.
+    @type  registry: L{roslib.msgs.MsgRegistry}
+    @return: dtype whose itemsize is the serialized size of spec
+    @rtype: numpy.dtype
+    @raise MsgSpecException: if spec is not fixed-size
+    @raise KeyError: if an embedded type is not registered
+    @raise ImportError: if NumPy is not installed
+    """
+    if registry is None:
+        registry = roslib.msgs._registry
+    _check_fixed_size(spec, registry)
+    import numpy
+    return numpy.dtype(_dtype_fields(spec, registry))
+
+def decode(spec, data, count=-1, offset=0, registry=None):
+    """
+    View a buffer of back-to-back serialized messages as a structured
+    array. The array shares memory with data, which is not copied.
+    @param spec: message spec, or a dtype from L{compile_dtype()}
+    @type  spec: L{roslib.msgs.MsgSpec} or numpy.dtype
+    @param data: serialized messages
+    @type  data: buffer (e.g. bytes, bytearray, mmap)
+    @param count: (optional) number of messages, or -1 for as many as
+      data holds after offset. Required for messages without fields
+      (e.g. std_msgs/Empty), which serialize to zero bytes.
+    @type  count: int
+    @param offset: (optional) byte offset of the first message in data
+    @type  offset: int
+    @param registry: (optional) registry to look up embedded types in
+    @type  registry: L{roslib.msgs.MsgRegistry}
+    @return: array of count records
+    @rtype: numpy.ndarray
+    @raise MsgSpecException: if spec is not fixed-size
+    @raise ValueError: if count is -1 and data does not hold a whole
+      number of messages, or is too short for count messages, or if
+      count is -1 for a message without fields
+    """
+    import numpy
+    if isinstance(spec, roslib.msgs.MsgSpec):
+        dtype = compile_dtype(spec, registry)
+    else:
+        dtype = numpy.dtype(spec)
+    if dtype.itemsize == 0:
+        # any number of empty messages fit in a buffer
+        if count == -1:
+            raise ValueError("count is required for messages without fields")
+        if offset > numpy.frombuffer(data, numpy.uint8).size:
+            raise ValueError("offset %d is past the end of the buffer"%offset)
+        return numpy.zeros(count, dtype)
+    if count == -1:
+        size = numpy.frombuffer(data, numpy.uint8).size # no copy
+        if (size - offset) % dtype.itemsize:
+            raise ValueError("buffer of %d bytes after offset %d does not hold a whole number of %d-byte messages"%(
+                size - offset, offset, dtype.itemsize))
+    return numpy.frombuffer(data, dtype, count, offset)
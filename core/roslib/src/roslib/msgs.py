@@ -47,12 +47,20 @@ except ImportError:
     from io import StringIO # Python 3.x
 
 import os
-import sys
+import re
 import string
+import struct
+import sys
+import threading
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None # Python 2 without the futures backport
 
 import rospkg
 
 import roslib.manifest
+import roslib.msgcache
 import roslib.packages
 import roslib.names
 import roslib.resources
@@ -73,6 +81,8 @@ SEP = '/' #e.g. std_msgs/String
 ## character that designates a constant assignment rather than a field
 CONSTCHAR   = '='
 COMMENTCHAR = '#'
+## number of threads load_package_dependencies() loads packages with
+LOAD_WORKERS = 8
 
 class MsgSpecException(Exception): pass
 
@@ -148,34 +158,19 @@ def parse_type(type_):
 ################################################################################
 # name validation 
 
+# a legal resource name (see roslib.names.is_legal_resource_name())
+# followed by any number of array dimensions
+_MSG_TYPE_P = r'[A-Za-z]\w*(?:/\w+)*/?(?:\[\d*\])*'
+_MSG_TYPE_LEGAL_P = re.compile(_MSG_TYPE_P + r'\Z')
+
 def is_valid_msg_type(x):
     """
     @return: True if the name is a syntatically legal message type name
     @rtype: bool
     """
-    if not x or len(x) != len(x.strip()):
-        return False
-    base = base_msg_type(x)
-    if not roslib.names.is_legal_resource_name(base):
+    if not x:
         return False
-    #parse array indicies
-    x = x[len(base):]
-    state = 0
-    i = 0
-    for c in x:
-        if state == 0:
-            if c != '[':
-                return False
-            state = 1 #open
-        elif state == 1:
-            if c == ']':
-                state = 0 #closed
-            else:
-                try:
-                    int(c)
-                except:
-                    return False
-    return state == 0
+    return _MSG_TYPE_LEGAL_P.match(x) is not None
 
 def is_valid_constant_type(x):
     """
@@ -309,6 +304,8 @@ class MsgSpec(object):
         self.short_name = short_name
         self.package = package
         self._parsed_fields = [Field(name, type) for (name, type) in zip(self.names, self.types)]
+        # (registry, registry generation, L{MsgLayout})
+        self._layout = None
         
     def fields(self):
         """
@@ -349,7 +346,137 @@ class MsgSpec(object):
 
     def __str__(self):
         return _strify_spec(self)
-    
+
+    def get_layout(self, registry=None):
+        """
+        Compute the serialized layout of the message, see
+        L{MsgLayout}. The layout is cached on the spec for the registry
+        it was computed with, until types are registered in that
+        registry or it is reinitialized.
+        @param registry: (optional) registry to look up embedded
+          types in. Defaults to the module registry.
+        @type  registry: L{MsgRegistry}
+        @rtype: L{MsgLayout}
+        @raise KeyError: if an embedded type is not registered
+        """
+        if registry is None:
+            registry = _registry
+        cached = self._layout
+        if cached is not None and cached[0] is registry and cached[1] == registry.generation:
+            return cached[2]
+        # embedded types may be registered while the layout is computed
+        generation = registry.generation
+        layout = MsgLayout(self, registry)
+        self._layout = (registry, generation, layout)
+        return layout
+
+# serialized layout ##################################################
+
+## struct format of each fixed-width builtin type. ROS serializes
+## little-endian without padding.
+_STRUCT_FORMATS = {
+    'int8': 'b', 'uint8': 'B', 'int16': 'h', 'uint16': 'H',
+    'int32': 'i', 'uint32': 'I', 'int64': 'q', 'uint64': 'Q',
+    'float32': 'f', 'float64': 'd', 'bool': 'B',
+    # deprecated:
+    'char': 'B', 'byte': 'b',
+    # time and duration are serialized as secs, nsecs
+    'time': 'II', 'duration': 'ii',
+    }
+
+def _field_layout(type_, package, registry):
+    """
+    @return: struct format (without byte order) if type_ is
+      fixed-size, or None, and min/max serialized size. max is None if
+      unbounded.
+    @rtype: (str, int, int)
+    """
+    base_type, is_array, array_len = parse_type(type_)
+    if base_type in _STRUCT_FORMATS:
+        fmt = _STRUCT_FORMATS[base_type]
+        min_size = max_size = struct.calcsize('<' + fmt)
+    elif base_type == 'string':
+        fmt, min_size, max_size = None, 4, None # uint32 length, then bytes
+    else:
+        try:
+            sub = registry.get_registered(base_type, package)
+        except KeyError:
+            if not is_header_type(base_type):
+                raise
+            # Header is only registered once the registry is initialized
+            registry.init()
+            sub = registry.get_registered(base_type, package)
+        sub = sub.get_layout(registry)
+        fmt = sub.format[1:] if sub.fixed_size else None
+        min_size, max_size = sub.min_size, sub.max_size
+    if not is_array:
+        return fmt, min_size, max_size
+    elif array_len is None:
+        return None, 4, None # uint32 length, then items
+    if fmt is not None:
+        fmt = '%d%s'%(array_len, fmt) if len(fmt) == 1 else fmt * array_len
+    if max_size is not None:
+        max_size *= array_len
+    return fmt, min_size * array_len, max_size
+
+class MsgLayout(object):
+    """
+    Serialized layout of a L{MsgSpec}, for serializers to preallocate
+    buffers and to pack and unpack runs of fixed-size fields with a
+    single struct call. Embedded messages that are fixed-size are
+    part of runs, with their values flattened in field order; time
+    and duration contribute secs and nsecs.
+
+    Contains:
+    fixed_size: True if every serialized instance has the same size
+    format: struct format of the whole message if fixed_size, else None
+    runs: [(start, end, format)] for each run of contiguous
+      fixed-size fields, spec.types[start:end], with its struct format
+    prefix_size: size of the fixed-size fields before the first
+      variable-size field
+    prefix_format: struct format of those fields
+    min_size: smallest serialized size
+    max_size: largest serialized size, or None if unbounded
+    """
+    __slots__ = ['fixed_size', 'format', 'runs', 'prefix_size', 'prefix_format', 'min_size', 'max_size']
+
+    def __init__(self, spec, registry=None):
+        """
+        @param spec: message to compute the layout of
+        @type  spec: L{MsgSpec}
+        @param registry: (optional) registry to look up embedded
+          types in. Defaults to the module registry.
+        @type  registry: L{MsgRegistry}
+        @raise KeyError: if an embedded type is not registered
+        """
+        if registry is None:
+            registry = _registry
+        runs = []
+        fmts = []
+        min_size = max_size = 0
+        for i, type_ in enumerate(spec.types):
+            fmt, lo, hi = _field_layout(type_, spec.package, registry)
+            min_size += lo
+            max_size = max_size + hi if max_size is not None and hi is not None else None
+            fmts.append(fmt)
+            if fmt is None:
+                continue
+            if runs and runs[-1][1] == i:
+                start, _, run_fmt = runs[-1]
+                runs[-1] = (start, i + 1, run_fmt + fmt)
+            else:
+                runs.append((i, i + 1, '<' + fmt))
+        self.runs = runs
+        self.fixed_size = None not in fmts
+        self.format = '<' + ''.join(fmts) if self.fixed_size else None
+        self.prefix_format = runs[0][2] if runs and runs[0][0] == 0 else '<'
+        self.prefix_size = struct.calcsize(self.prefix_format)
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def __repr__(self):
+        return "MsgLayout[fixed_size=%s, runs=%s, min_size=%s, max_size=%s]"%(self.fixed_size, self.runs, self.min_size, self.max_size)
+
 # msg spec loading utilities ##########################################
 
 def reinit():
@@ -357,40 +484,11 @@ def reinit():
     Reinitialize roslib.msgs. This API is for message generators
     (e.g. genpy) that need to re-initialize the registration table.
     """
-    global _initialized , _loaded_packages
-    # unset the initialized state and unregister everything 
-    _initialized = False
-    del _loaded_packages[:]
-    REGISTERED_TYPES.clear()
-    _init()
-    
-_initialized = False
+    _registry.reinit()
+
 def _init():
     #lazy-init
-    global _initialized
-    if _initialized:
-        return
-
-    fname = '%s%s'%(HEADER, EXT)
-    std_msgs_dir = roslib.packages.get_pkg_dir('std_msgs')
-    if std_msgs_dir is None:
-        raise MsgSpecException("Unable to locate roslib: %s files cannot be loaded"%EXT)
-    
-    header = os.path.join(std_msgs_dir, 'msg', fname)
-    if not os.path.isfile(header):
-        sys.stderr.write("ERROR: cannot locate %s. Expected to find it at '%s'\n"%(fname, header))
-        return False
-
-    # register Header under both contexted and de-contexted name
-    _, spec = load_from_file(header, '')
-    register(HEADER, spec)
-    register('std_msgs/'+HEADER, spec)    
-    # backwards compat, REP 100
-    register('roslib/'+HEADER, spec)    
-    for k, spec in EXTENDED_BUILTINS.items():
-        register(k, spec)
-        
-    _initialized = True
+    _registry.init()
 
 # .msg file routines ##############################################################       
 
@@ -403,17 +501,18 @@ def _msg_filter(f):
     return os.path.isfile(f) and f.endswith(EXT)
 
 # also used by doxymaker
-def list_msg_types(package, include_depends):
+def list_msg_types(package, include_depends, session=None):
     """
     List all messages in the specified package
     @param package str: name of package to search
     @param include_depends bool: if True, will also list messages in package dependencies
+    @param session L{roslib.session.Session}: (optional) session to locate packages with
     @return [str]: message type names
     """
-    types = roslib.resources.list_package_resources(package, include_depends, 'msg', _msg_filter)
+    types = roslib.resources.list_package_resources(package, include_depends, 'msg', _msg_filter, session=session)
     return [x[:-len(EXT)] for x in types]
 
-def msg_file(package, type_):
+def msg_file(package, type_, session=None):
     """
     Determine the file system path for the specified .msg
     resource. .msg resource does not have to exist.
@@ -422,10 +521,32 @@ def msg_file(package, type_):
     @type  package: str
     @param type_: type name of message, e.g. 'Point2DFloat32'
     @type  type_: str
+    @param session: (optional) session to locate the package with
+    @type  session: L{roslib.session.Session}
     @return: file path of .msg file in specified package
     @rtype: str
     """
-    return roslib.packages.resource_file(package, 'msg', type_+EXT)
+    return roslib.packages.resource_file(package, 'msg', type_+EXT, session=session)
+
+def _load_pkg_msg_specs(package, session=None):
+    """
+    Load the messages of a package without reporting errors.
+    @return: message type names and specs, names of messages that
+      could not be loaded and their error messages
+    @rtype: [(str, L{MsgSpec})], [str], [str]
+    """
+    types = list_msg_types(package, False, session)
+    specs = [] #no fancy list comprehension as we want to show errors
+    failures = []
+    errors = []
+    for t in types:
+        try: 
+            typespec = load_from_file(msg_file(package, t, session), package)
+            specs.append(typespec)
+        except Exception as e:
+            failures.append(t)
+            errors.append("ERROR: unable to load %s, %s"%(t, e))
+    return specs, failures, errors
 
 def get_pkg_msg_specs(package):
     """
@@ -438,54 +559,26 @@ def get_pkg_msg_specs(package):
     @rtype: [(str, L{MsgSpec}), [str]]
     """
     _init()
-    types = list_msg_types(package, False)
-    specs = [] #no fancy list comprehension as we want to show errors
-    failures = []
-    for t in types:
-        try: 
-            typespec = load_from_file(msg_file(package, t), package)
-            specs.append(typespec)
-        except Exception as e:
-            failures.append(t)
-            print("ERROR: unable to load %s, %s"%(t, e))
+    specs, failures, errors = _load_pkg_msg_specs(package)
+    for error in errors:
+        print(error)
     return specs, failures
 
-def load_package_dependencies(package, load_recursive=False):
+def load_package_dependencies(package, load_recursive=False, workers=None):
     """
-    Register all messages that the specified package depends on.
+    Register all messages that the specified package depends on. The
+    messages of the dependencies are loaded by a pool of threads and
+    registered in dependency order.
     
     @param load_recursive: (optional) if True, load all dependencies,
         not just direct dependencies. By default, this is false to
         prevent packages from incorrectly inheriting dependencies.
     @type  load_recursive: bool
+    @param workers: (optional) number of threads to load packages
+        with, or 1 to load them serially. Defaults to L{LOAD_WORKERS}.
+    @type  workers: int
     """
-    global _loaded_packages
-    _init()    
-    if VERBOSE:
-        print("Load dependencies for package", package)
-        
-    if not load_recursive:
-        manifest_file = roslib.manifest.manifest_file(package, True)
-        m = roslib.manifest.parse_file(manifest_file)
-        depends = [d.package for d in m.depends] # #391
-    else:
-        depends = rospkg.RosPack().get_depends(package, implicit=True)
-
-    msgs = []
-    failures = []
-    for d in depends:
-        if VERBOSE:
-            print("Load dependency", d)
-        #check if already loaded
-        # - we are dependent on manifest.getAll returning first-order dependencies first
-        if d in _loaded_packages or d == package:
-            continue
-        _loaded_packages.append(d)
-        specs, failed = get_pkg_msg_specs(d)
-        msgs.extend(specs)
-        failures.extend(failed)
-    for key, spec in msgs:
-        register(key, spec)
+    _registry.load_package_dependencies(package, load_recursive, workers)
 
 def load_package(package):
     """
@@ -497,26 +590,331 @@ def load_package(package):
     @param package: package name
     @type  package: str
     """
-    global _loaded_packages
-    _init()    
-    if VERBOSE:
-        print("Load package", package)
-        
-    #check if already loaded
-    # - we are dependent on manifest.getAll returning first-order dependencies first
-    if package in _loaded_packages:
+    _registry.load_package(package)
+
+class MsgRegistry(object):
+    """
+    Table of registered message specs, and of the packages whose
+    messages have been loaded into it. The module-level registration
+    functions (L{register()}, L{get_registered()}, L{load_package()},
+    ...) use a default instance, whose table is L{REGISTERED_TYPES}.
+
+    Separate instances can be used to work on several workspaces or
+    package contexts at the same time. This class is thread-safe:
+    packages being loaded by one thread are not loaded again by
+    another, which waits for them instead.
+    """
+
+    def __init__(self, session=None, lazy=False):
+        """
+        @param session: (optional) session to locate packages with.
+          Defaults to the current environment.
+        @type  session: L{roslib.session.Session}
+        @param lazy: (optional) if True, L{get_registered()} loads
+          types that are not registered by default
+        @type  lazy: bool
+        """
+        self.session = session
+        self.lazy = lazy
+        ## {msg type name: L{MsgSpec}}
+        self.types = {}
+        ## names of packages whose messages have been loaded
+        self.loaded_packages = set()
+        self._initialized = False
+        ## incremented whenever the types change, see L{MsgSpec.get_layout()}
+        self.generation = 0
+        self._lock = threading.RLock()
+        # {package: threading.Event}, set once the package is loaded
+        self._loading = {}
+
+    def reinit(self):
+        """
+        Unregister everything and register the builtin types again.
+        """
+        with self._lock:
+            # unset the initialized state and unregister everything 
+            self._initialized = False
+            self.loaded_packages.clear()
+            self.types.clear()
+            self.generation += 1
+            self.init()
+
+    def init(self):
+        """
+        Register the Header and extended builtin types, if they are
+        not yet registered.
+        """
+        with self._lock:
+            if self._initialized:
+                return
+
+            fname = '%s%s'%(HEADER, EXT)
+            std_msgs_dir = roslib.packages.get_pkg_dir('std_msgs', session=self.session)
+            if std_msgs_dir is None:
+                raise MsgSpecException("Unable to locate roslib: %s files cannot be loaded"%EXT)
+
+            header = os.path.join(std_msgs_dir, 'msg', fname)
+            if not os.path.isfile(header):
+                sys.stderr.write("ERROR: cannot locate %s. Expected to find it at '%s'\n"%(fname, header))
+                return False
+
+            # register Header under both contexted and de-contexted name
+            _, spec = load_from_file(header, '')
+            self.register(HEADER, spec)
+            self.register('std_msgs/'+HEADER, spec)    
+            # backwards compat, REP 100
+            self.register('roslib/'+HEADER, spec)    
+            for k, spec in EXTENDED_BUILTINS.items():
+                self.register(k, spec)
+
+            self._initialized = True
+
+    def is_registered(self, msg_type_name):
+        """
+        @param msg_type_name: name of message type
+        @type  msg_type_name: str
+        @return: True if msg spec for specified msg type name is
+        registered. NOTE: builtin types are not registered.
+        @rtype: bool
+        """
+        return msg_type_name in self.types
+
+    def get_registered(self, msg_type_name, default_package=None, lazy=None):
+        """
+        @param msg_type_name: name of message type
+        @type  msg_type_name: str
+        @param lazy: (optional) if True, a type that is not registered
+          is loaded from its .msg file, along with the types it
+          embeds, instead of requiring its package to be loaded.
+          Defaults to the lazy setting of the registry.
+        @type  lazy: bool
+        @return: msg spec for msg type name
+        @rtype: L{MsgSpec}
+        @raise KeyError: if msg type is not registered (or, if lazy,
+          cannot be located)
+        @raise MsgSpecException: if lazy and the .msg file is invalid
+        """
+        types = self.types
+        if msg_type_name in types:
+            return types[msg_type_name]
+        if lazy is None:
+            lazy = self.lazy
+        if lazy:
+            spec = self._load_type(msg_type_name, default_package)
+            if spec is not None:
+                return spec
+        if default_package:
+            # if msg_type_name has no package specifier, try with default package resolution
+            p, n = roslib.names.package_resource_name(msg_type_name)
+            if not p:
+                return types[roslib.names.resource_name(default_package, msg_type_name)]
+        raise KeyError(msg_type_name)
+
+    def register(self, msg_type_name, msg_spec):
+        """
+        Load MsgSpec into the type dictionary
+
+        @param msg_type_name: name of message type
+        @type  msg_type_name: str
+        @param msg_spec: spec to load
+        @type  msg_spec: L{MsgSpec}
+        """
         if VERBOSE:
-            print("Package %s is already loaded"%package)
-        return
+            print("Register msg %s"%msg_type_name)
+        with self._lock:
+            self.types[msg_type_name] = msg_spec
+            self.generation += 1
 
-    _loaded_packages.append(package)
-    specs, failed = get_pkg_msg_specs(package)
-    if VERBOSE:
-        print("Package contains the following messages: %s"%specs)
-    for key, spec in specs:
-        #register spec under both local and fully-qualified key
-        register(key, spec)
-        register(package + roslib.names.PRN_SEPARATOR + key, spec)        
+    def _load_type(self, msg_type_name, default_package):
+        """
+        Load and register a single message type and, recursively, the
+        types it embeds. Embedded types that cannot be loaded are
+        skipped, and fail when they are looked up.
+        @return: msg spec, or None if the type cannot be located
+        @rtype: L{MsgSpec}
+        @raise MsgSpecException: if the .msg file is invalid
+        """
+        self.init()
+        try:
+            package, base_type = roslib.names.package_resource_name(msg_type_name)
+        except ValueError:
+            return None
+        package = package or default_package
+        if not package:
+            return None
+        key = roslib.names.resource_name(package, base_type)
+        spec = self.types.get(key, None)
+        if spec is not None:
+            return spec
+        try:
+            file_path = msg_file(package, base_type, self.session)
+        except roslib.packages.InvalidROSPkgException:
+            return None
+        if not os.path.isfile(file_path):
+            return None
+        _, spec = load_from_file(file_path, package)
+        with self._lock:
+            # another thread may have loaded it in the meantime
+            spec = self.types.setdefault(key, spec)
+        for t in spec.types:
+            t = base_msg_type(t)
+            if not is_builtin(t) and not t in self.types:
+                try:
+                    self._load_type(t, package)
+                except MsgSpecException:
+                    pass
+        return spec
+
+    def _claim(self, packages, waits):
+        """
+        Mark packages that are not loaded yet as being loaded by the
+        calling thread. Must be called with the lock held.
+        @param waits: list that events of packages being loaded by
+          other threads are appended to
+        @type  waits: [threading.Event]
+        @return: packages to load, in order
+        @rtype: [str]
+        """
+        todo = []
+        for p in packages:
+            if p in self.loaded_packages:
+                event = self._loading.get(p, None)
+                if event is not None:
+                    waits.append(event)
+                continue
+            todo.append(p)
+            self.loaded_packages.add(p)
+            self._loading[p] = threading.Event()
+        return todo
+
+    def _release(self, packages, failed):
+        """
+        Signal threads waiting for packages. failed packages are
+        marked as not loaded.
+        """
+        with self._lock:
+            for p in packages:
+                if p in failed:
+                    self.loaded_packages.discard(p)
+                self._loading.pop(p).set()
+
+    def load_package_dependencies(self, package, load_recursive=False, workers=None):
+        """
+        Register all messages that the specified package depends on,
+        see L{roslib.msgs.load_package_dependencies()}.
+        """
+        self.init()
+        if VERBOSE:
+            print("Load dependencies for package", package)
+
+        if not load_recursive:
+            if self.session is not None:
+                m = self.session.get_manifest(package)
+            else:
+                manifest_file = roslib.manifest.manifest_file(package, True)
+                m = roslib.manifest.parse_file(manifest_file, lazy=True)
+            depends = [d.package for d in m.depends] # #391
+        elif self.session is not None:
+            depends = self.session.rospack.get_depends(package, implicit=True)
+        else:
+            depends = rospkg.RosPack().get_depends(package, implicit=True)
+
+        #check if already loaded
+        # - we are dependent on manifest.getAll returning first-order dependencies first
+        queued = []
+        seen = set([package])
+        for d in depends:
+            if VERBOSE:
+                print("Load dependency", d)
+            if d not in seen:
+                seen.add(d)
+                queued.append(d)
+        waits = []
+        with self._lock:
+            todo = self._claim(queued, waits)
+
+        if workers is None:
+            workers = LOAD_WORKERS
+        load = lambda d: _load_pkg_msg_specs(d, self.session)
+        executor = None
+        if len(todo) > 1 and workers > 1 and ThreadPoolExecutor is not None:
+            executor = ThreadPoolExecutor(min(workers, len(todo)))
+        # packages that were not reached because loading an earlier one failed
+        failed = set(todo)
+        try:
+            if executor is not None:
+                results = executor.map(load, todo)
+            else:
+                results = (load(d) for d in todo)
+            msgs = []
+            failures = []
+            for d in todo:
+                failed.discard(d)
+                specs, failed_types, errors = next(results)
+                for error in errors:
+                    print(error)
+                msgs.extend(specs)
+                failures.extend(failed_types)
+            with self._lock:
+                for key, spec in msgs:
+                    self.register(key, spec)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+            self._release(todo, failed)
+        for event in waits:
+            event.wait()
+
+    def load_package(self, package):
+        """
+        Load package into the registered namespace, see
+        L{roslib.msgs.load_package()}.
+        """
+        self.init()
+        if VERBOSE:
+            print("Load package", package)
+
+        #check if already loaded
+        waits = []
+        with self._lock:
+            todo = self._claim([package], waits)
+        if not todo:
+            if VERBOSE:
+                print("Package %s is already loaded"%package)
+            for event in waits:
+                event.wait()
+            return
+
+        try:
+            specs, failed, errors = _load_pkg_msg_specs(package, self.session)
+            for error in errors:
+                print(error)
+            if VERBOSE:
+                print("Package contains the following messages: %s"%specs)
+            with self._lock:
+                for key, spec in specs:
+                    #register spec under both local and fully-qualified key
+                    self.register(key, spec)
+                    self.register(package + roslib.names.PRN_SEPARATOR + key, spec)        
+        finally:
+            self._release(todo, ())
+
+def _int_bounds(type_, bits):
+    import math
+    if type_[0] == 'u' or type_ == 'char':
+        return 0, int(math.pow(2, bits)-1)
+    upper = int(math.pow(2, bits-1)-1)
+    return -upper - 1, upper #two's complement min
+
+## (lower, upper) bounds of integer constants. NOTE: the bounds are
+## computed with floating point math, as they always have been, which
+## makes them one too large for the 64-bit types
+_INT_BOUNDS = dict((t, _int_bounds(t, b)) for t, b in [
+    ('int8', 8), ('uint8', 8), ('int16', 16), ('uint16', 16),
+    ('int32', 32), ('uint32', 32), ('int64', 64), ('uint64', 64),
+    ('byte', 8), ('char', 8)])
+## bool constants that are converted without eval()
+_BOOL_VALUES = {'True': True, 'False': False, '1': True, '0': False}
 
 def _convert_val(type_, val):
     """
@@ -530,29 +928,21 @@ def _convert_val(type_, val):
     @raise ValueError: if unable to convert to python representation
     @raise MsgSpecException: if value exceeds specified integer width
     """
-    if type_ in ['float32','float64']:
-        return float(val)
-    elif type_ in ['string']:
-        return val.strip() #string constants are always stripped 
-    elif type_ in ['int8', 'uint8', 'int16','uint16','int32','uint32','int64','uint64', 'char', 'byte']:
-        # bounds checking
-        bits = [('int8', 8), ('uint8', 8), ('int16', 16),('uint16', 16),\
-                ('int32', 32),('uint32', 32), ('int64', 64),('uint64', 64),\
-                ('byte', 8), ('char', 8)]
-        b = [b for t, b in bits if t == type_][0]
-        import math
-        if type_[0] == 'u' or type_ == 'char':
-            lower = 0
-            upper = int(math.pow(2, b)-1)
-        else:
-            upper = int(math.pow(2, b-1)-1)   
-            lower = -upper - 1 #two's complement min
+    bounds = _INT_BOUNDS.get(type_)
+    if bounds is not None:
+        lower, upper = bounds
         val = int(val) #python will autocast to long if necessary
         if val > upper or val < lower:
             raise MsgSpecException("cannot coerce [%s] to %s (out of bounds)"%(val, type_))
         return val
+    elif type_ in ('float32', 'float64'):
+        return float(val)
+    elif type_ == 'string':
+        return val.strip() #string constants are always stripped 
     elif type_ == 'bool':
         # TODO: need to nail down constant spec for bool
+        if val in _BOOL_VALUES:
+            return _BOOL_VALUES[val]
         return True if eval(val) else False
     raise MsgSpecException("invalid constant type: [%s]"%type_)
         
@@ -574,6 +964,65 @@ def load_by_type(msgtype, package_context=''):
         raise MsgSpecException("Cannot locate message type [%s], package [%s] does not exist"%(msgtype, pkg)) 
     return load_from_file(m_f, pkg)
 
+# Lines of the common forms (fields, constants, blank lines and
+# comments) are tokenized with a single match of _LINE_P. Lines it
+# does not match (syntax errors, unusual whitespace) are passed to
+# _load_line(), so that results and error messages do not depend on
+# which path a line takes.
+_LINE_P = re.compile(r"""
+  string\ +(?P<string_name>[A-Za-z]\w*)\ *=(?P<string_val>.*)\Z
+| [ \t\r]*
+  (?:(?P<type>%s)\ +(?P<name>[A-Za-z]\w*)
+   | (?P<const_type>\w+)\ +(?P<const_name>[A-Za-z]\w*)\ *=\ *(?P<val>[^\s=\#]+)
+  )?
+  [ \t\r]*(?:\#.*)?\Z
+"""%_MSG_TYPE_P, re.X)
+
+def _load_line(orig_line, package_context, types, names, constants):
+    """
+    Parse a single line of a .msg declaration, appending any field or
+    constant it declares to types, names and constants.
+    @raise MsgSpecException: if line has a syntax error
+    """
+    l = orig_line.split(COMMENTCHAR)[0].strip() #strip comments
+    if not l:
+        return #ignore empty lines
+    splits = [s for s in [x.strip() for x in l.split(" ")] if s] #split type/name, filter out empties
+    type_ = splits[0]
+    if not is_valid_msg_type(type_):
+        raise MsgSpecException("%s is not a legal message type"%type_)
+    if CONSTCHAR in l:
+        if not is_valid_constant_type(type_):
+            raise MsgSpecException("%s is not a legal constant type"%type_)
+        if type_ == 'string':
+            # strings contain anything to the right of the equals sign, there are no comments allowed
+            idx = orig_line.find(CONSTCHAR)
+            name = orig_line[orig_line.find(' ')+1:idx]
+            val = orig_line[idx+1:]
+        else:
+            splits = [x.strip() for x in ' '.join(splits[1:]).split(CONSTCHAR)] #resplit on '='
+            if len(splits) != 2:
+                raise MsgSpecException("Invalid declaration: %s"%l)
+            name = splits[0]
+            val = splits[1]
+        try:
+            val_converted  = _convert_val(type_, val)
+        except Exception as e:
+            raise MsgSpecException("Invalid declaration: %s"%e)
+        constants.append(Constant(type_, name, val_converted, val.strip()))
+    else:
+        if len(splits) != 2:
+            raise MsgSpecException("Invalid declaration: %s"%l)
+        name = splits[1]
+        if not is_valid_msg_field_name(name):
+            raise MsgSpecException("%s is not a legal message field name"%name)
+        if package_context and not SEP in type_:
+            if not base_msg_type(type_) in RESERVED_TYPES:
+                #print "rewrite", type_, "to", "%s/%s"%(package_context, type_)
+                type_ = "%s/%s"%(package_context, type_)
+        types.append(type_)
+        names.append(name)
+
 def load_from_string(text, package_context='', full_name='', short_name=''):
     """
     Load message specification from a string.
@@ -590,50 +1039,37 @@ def load_from_string(text, package_context='', full_name='', short_name=''):
     names = []
     constants = []
     for orig_line in text.split('\n'):
-        l = orig_line.split(COMMENTCHAR)[0].strip() #strip comments
-        if not l:
-            continue #ignore empty lines
-        splits = [s for s in [x.strip() for x in l.split(" ")] if s] #split type/name, filter out empties
-        type_ = splits[0]
-        if not is_valid_msg_type(type_):
-            raise MsgSpecException("%s is not a legal message type"%type_)
-        if CONSTCHAR in l:
-            if not is_valid_constant_type(type_):
-                raise MsgSpecException("%s is not a legal constant type"%type_)
-            if type_ == 'string':
-                # strings contain anything to the right of the equals sign, there are no comments allowed
-                idx = orig_line.find(CONSTCHAR)
-                name = orig_line[orig_line.find(' ')+1:idx]
-                val = orig_line[idx+1:]
-            else:
-                splits = [x.strip() for x in ' '.join(splits[1:]).split(CONSTCHAR)] #resplit on '='
-                if len(splits) != 2:
-                    raise MsgSpecException("Invalid declaration: %s"%l)
-                name = splits[0]
-                val = splits[1]
-            try:
-                val_converted  = _convert_val(type_, val)
-            except Exception as e:
-                raise MsgSpecException("Invalid declaration: %s"%e)
-            constants.append(Constant(type_, name, val_converted, val.strip()))
-        else:
-            if len(splits) != 2:
-                raise MsgSpecException("Invalid declaration: %s"%l)
-            name = splits[1]
-            if not is_valid_msg_field_name(name):
-                raise MsgSpecException("%s is not a legal message field name"%name)
+        m = _LINE_P.match(orig_line)
+        if m is None:
+            _load_line(orig_line, package_context, types, names, constants)
+            continue
+        string_name, string_val, type_, name, const_type, const_name, val = m.groups()
+        if name is not None:
             if package_context and not SEP in type_:
                 if not base_msg_type(type_) in RESERVED_TYPES:
-                    #print "rewrite", type_, "to", "%s/%s"%(package_context, type_)
                     type_ = "%s/%s"%(package_context, type_)
             types.append(type_)
             names.append(name)
+        elif string_name is not None:
+            val = string_val.strip()
+            constants.append(Constant('string', string_name, val, val))
+        elif const_name is not None:
+            if not const_type in _CONSTANT_TYPES:
+                _load_line(orig_line, package_context, types, names, constants)
+                continue
+            try:
+                val_converted  = _convert_val(const_type, val)
+            except Exception as e:
+                raise MsgSpecException("Invalid declaration: %s"%e)
+            constants.append(Constant(const_type, const_name, val_converted, val))
+        # else: blank line or comment
     return MsgSpec(types, names, constants, text, full_name, short_name, package_context)
 
 def load_from_file(file_path, package_context=''):
     """
     Convert the .msg representation in the file to a MsgSpec instance.
-    This does *not* register the object.
+    This does *not* register the object. Specs of unchanged files are
+    loaded from the cache in ROS_HOME (see L{roslib.msgcache}).
     @param file_path: path of file to load from
     @type  file_path: str:
     @param package_context: package name to prepend to type name or
@@ -660,13 +1096,19 @@ def load_from_file(file_path, package_context=''):
     if not roslib.names.is_legal_resource_name(type_):
         raise MsgSpecException("%s: [%s] is not a legal type name"%(file_path, type_))
     
+    try:
+        return (type_, roslib.msgcache.load_file('msg', file_path, package_context, type_, base_type_, _load_file))
+    except MsgSpecException as e:
+        raise MsgSpecException('%s: %s'%(file_name, e))
+
+def _load_file(file_path, package_context, full_name, short_name):
+    """
+    Read and parse a .msg file, see L{load_from_file()}.
+    @rtype: L{MsgSpec}
+    """
     f = open(file_path, 'r')
     try:
-        try:
-            text = f.read()
-            return (type_, load_from_string(text, package_context, type_, base_type_))
-        except MsgSpecException as e:
-            raise MsgSpecException('%s: %s'%(file_name, e))
+        return load_from_string(f.read(), package_context, full_name, short_name)
     finally:
         f.close()
 
@@ -704,6 +1146,8 @@ PRIMITIVE_TYPES = ['int8','uint8','int16','uint16','int32','uint32','int64','uin
                    # deprecated:
                    'char','byte']
 BUILTIN_TYPES = PRIMITIVE_TYPES + [TIME, DURATION]
+## non-string constant types, for load_from_string()
+_CONSTANT_TYPES = frozenset(PRIMITIVE_TYPES) - frozenset(['string'])
 
 def is_builtin(msg_type_name):
     """
@@ -719,8 +1163,9 @@ EXTENDED_BUILTINS = { TIME : load_from_string(TIME_MSG), DURATION: load_from_str
 
 RESERVED_TYPES  = BUILTIN_TYPES + [HEADER]
 
-REGISTERED_TYPES = { } 
-_loaded_packages = [] #keep track of packages so that we only load once (note: bug #59)
+_registry = MsgRegistry()
+REGISTERED_TYPES = _registry.types
+_loaded_packages = _registry.loaded_packages #keep track of packages so that we only load once (note: bug #59)
 
 def is_registered(msg_type_name):
     """
@@ -730,23 +1175,21 @@ def is_registered(msg_type_name):
     registered. NOTE: builtin types are not registered.
     @rtype: bool
     """
-    return msg_type_name in REGISTERED_TYPES
+    return _registry.is_registered(msg_type_name)
 
-def get_registered(msg_type_name, default_package=None):
+def get_registered(msg_type_name, default_package=None, lazy=None):
     """
     @param msg_type_name: name of message type
     @type  msg_type_name: str
+    @param lazy: (optional) if True, a type that is not registered
+      is loaded from its .msg file, along with the types it embeds,
+      instead of requiring its package to be loaded with
+      L{load_package()}. See L{MsgRegistry.get_registered()}.
+    @type  lazy: bool
     @return: msg spec for msg type name
     @rtype: L{MsgSpec}
     """
-    if msg_type_name in REGISTERED_TYPES:
-        return REGISTERED_TYPES[msg_type_name]
-    elif default_package:
-        # if msg_type_name has no package specifier, try with default package resolution
-        p, n = roslib.names.package_resource_name(msg_type_name)
-        if not p:
-            return REGISTERED_TYPES[roslib.names.resource_name(default_package, msg_type_name)]
-    raise KeyError(msg_type_name)
+    return _registry.get_registered(msg_type_name, default_package, lazy)
 
 def register(msg_type_name, msg_spec):
     """
@@ -757,7 +1200,4 @@ def register(msg_type_name, msg_spec):
     @param msg_spec: spec to load
     @type  msg_spec: L{MsgSpec}
     """
-    if VERBOSE:
-        print("Register msg %s"%msg_type_name)
-    REGISTERED_TYPES[msg_type_name] = msg_spec
-
+    _registry.register(msg_type_name, msg_spec)
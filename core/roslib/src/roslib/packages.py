@@ -39,17 +39,22 @@ here have been superceded by other libraries (e.g. rospkg).  These
 routines will likely be *deleted* in future releases.
 """
 
+import collections
 import os
 import sys
 import stat
 import string
-
-from subprocess import Popen, PIPE
+import threading
+import time
 
 from catkin.find_in_workspaces import find_in_workspaces as catkin_find
 import rospkg
 
+import roslib.crawler
+import roslib.exceptions
 import roslib.manifest
+import roslib.pkgcache
+import roslib.pkgserver
 
 SRC_DIR = 'src'
 
@@ -87,7 +92,7 @@ def get_dir_pkg(d):
     Get the package that the directory is contained within. This is
     determined by finding the nearest parent manifest.xml file. This
     isn't 100% reliable, but symlinks can fool any heuristic that
-    relies on ROS_ROOT.
+    relies on ROS_ROOT. See L{get_dir_pkgs()} to classify many paths.
     @param d: directory path
     @type  d: str
     @return: (package_directory, package) of the specified directory, or None,None if not in a package
@@ -105,14 +110,309 @@ def get_dir_pkg(d):
         return d, pkg
     return None, None
 
-_pkg_dir_cache = {}
+ROS_CACHE_TIMEOUT = 'ROS_CACHE_TIMEOUT'
+
+# snapshot of the crawled package path, stored in ROS_HOME
+CRAWL_SNAPSHOT_FILE = 'roslib_crawl_snapshot'
+# binary package location cache (see roslib.pkgcache), stored in ROS_HOME
+PKG_CACHE_FILE = 'roslib_pkg_cache'
+
+# number of environments that _pkg_dir_cache keeps package indexes for
+PKG_DIR_CACHE_SIZE = 8
 
-def get_pkg_dir(package, required=True, ros_root=None, ros_package_path=None):
+def _cache_timeout(env=None):
     """
-    Locate directory package is stored in. This routine uses an
-    internal cache.
+    @return: number of seconds before a package index miss triggers a
+      re-crawl. Matches rospack's ROS_CACHE_TIMEOUT (default 60s).
+    @rtype: float
+    """
+    if env is None:
+        env = os.environ
+    try:
+        return float(env.get(ROS_CACHE_TIMEOUT, 60.))
+    except ValueError:
+        return 60.
+
+def _is_pkg_dir(d):
+    """
+    @return: True if d contains a package manifest
+    @rtype: bool
+    """
+    return os.path.isfile(os.path.join(d, MANIFEST_FILE)) or os.path.isfile(os.path.join(d, PACKAGE_FILE))
 
-    NOTE: cache does *not* rebuild if packages are relocated after
+class _PkgIndex(object):
+    """
+    Package locations for a single environment
+    """
+    __slots__ = ['locations', 'stamp', 'crawled', 'trie', 'stacks']
+
+    def __init__(self, locations, crawled, stamp=None, stacks=None):
+        """
+        @param locations: map of package name to package directory
+        @type  locations: {str: str}
+        @param crawled: True if locations come from a crawl, False if
+          they were read from rospack_cache
+        @type  crawled: bool
+        @param stamp: time of the crawl, defaults to now
+        @type  stamp: float
+        @param stacks: map of package directory to stack name (see
+          roslib.crawler.stack_table()), filled in on demand
+        @type  stacks: {str: str}
+        """
+        self.locations = locations
+        self.crawled = crawled
+        self.stamp = time.time() if stamp is None else stamp
+        # built on first use
+        self.trie = None
+        self.stacks = {} if stacks is None else stacks
+
+class _PkgTrie(object):
+    """
+    Prefix trie of package directories, keyed by path component. Maps
+    paths to the package that contains them without touching the
+    filesystem.
+    """
+    __slots__ = ['root']
+
+    def __init__(self, locations):
+        """
+        @param locations: map of package name to package directory
+        @type  locations: {str: str}
+        """
+        # {component: node}, the package of a node is stored under None
+        self.root = {}
+        for package, d in locations.items():
+            node = self.root
+            for c in _split_path(d):
+                node = node.setdefault(c, {})
+            node[None] = (d, package)
+
+    def lookup(self, path):
+        """
+        @param path: file or directory path
+        @type  path: str
+        @return: (package_directory, package) of the nearest package
+          directory that contains path, or None,None
+        @rtype: (str, str)
+        """
+        node = self.root
+        match = node.get(None, (None, None))
+        for c in _split_path(path):
+            node = node.get(c, None)
+            if node is None:
+                break
+            match = node.get(None, match)
+        return match
+
+def _split_path(path):
+    """
+    @return: components of the normalized, absolute path
+    @rtype: [str]
+    """
+    return [c for c in os.path.normcase(os.path.abspath(path)).split(os.sep) if c]
+
+class _PkgDirCache(object):
+    """
+    Cache of package locations, replaces 'rospack find'. The cache
+    holds a package index for each environment, keyed by its resolved
+    ROS_ROOT and ROS_PACKAGE_PATH. Indexes are fetched from
+    roslib.pkgserver if it is running, read from the binary cache
+    file written by the last crawl or from rospack's rospack_cache if
+    either matches the environment, or else built by crawling the
+    package path. The least recently used index is evicted once more
+    than max_size environments are in use.
+
+    Entries are validated by a stat() of the package manifest when
+    they are returned. If a package has been relocated, or cannot be
+    found and the index is older than ROS_CACHE_TIMEOUT, the index is
+    rebuilt. Crawls are incremental: a snapshot of the crawled
+    directories is kept in ROS_HOME and only directories whose mtime
+    has changed since are re-crawled.
+
+    This class is thread-safe.
+    """
+
+    def __init__(self, max_size=PKG_DIR_CACHE_SIZE):
+        self.max_size = max_size
+        self._indexes = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def _serve(self, key):
+        """
+        @return: index from roslib.pkgserver, or None if it is not running
+        @rtype: L{_PkgIndex}
+        """
+        try:
+            locations = roslib.pkgserver.get_locations(*key)
+        except roslib.exceptions.ROSLibException:
+            locations = None
+        if locations is None:
+            return None
+        return self._put(key, _PkgIndex(locations, True))
+
+    def _crawl(self, key):
+        # roslib.pkgserver keeps its index up to date, so ask it
+        # instead of crawling
+        index = self._serve(key)
+        if index is not None:
+            return index
+        ros_root, ros_package_path = key
+        ros_paths = rospkg.environment._compute_package_paths(ros_root, ros_package_path)
+        snapshot_file = os.path.join(rospkg.get_ros_home(), CRAWL_SNAPSHOT_FILE)
+        snapshots = roslib.crawler.load_snapshots(snapshot_file)
+        stack_dirs = {}
+        locations = roslib.crawler.crawl_packages(ros_paths, snapshots=snapshots, stacks=stack_dirs)
+        roslib.crawler.save_snapshots(snapshot_file, snapshots)
+        try:
+            roslib.pkgcache.write_cache(os.path.join(rospkg.get_ros_home(), PKG_CACHE_FILE), ros_root, ros_package_path, locations)
+        except (IOError, OSError):
+            pass # cache is only an optimization
+        stacks = roslib.crawler.stack_table(locations.values(), stack_dirs)
+        return self._put(key, _PkgIndex(locations, True, stacks=stacks))
+
+    def _put(self, key, index):
+        self._indexes.pop(key, None)
+        self._indexes[key] = index
+        while len(self._indexes) > self.max_size:
+            self._indexes.popitem(last=False)
+        return index
+
+    def _get(self, key):
+        index = self._indexes.pop(key, None)
+        if index is not None:
+            # mark as most recently used
+            self._indexes[key] = index
+            return index
+        index = self._serve(key)
+        if index is not None:
+            return index
+        cache = roslib.pkgcache.read_cache(os.path.join(rospkg.get_ros_home(), PKG_CACHE_FILE), *key)
+        if cache is not None:
+            return self._put(key, _PkgIndex(cache, True, cache.stamp))
+        # fall back to rospack's text cache
+        cache = {}
+        if _read_rospack_cache(cache, *key):
+            return self._put(key, _PkgIndex(dict((k, v[0]) for k, v in cache.items()), False))
+        return self._crawl(key)
+
+    def get_locations(self, ros_root, ros_package_path):
+        """
+        @return: map of package name to package directory for the
+          specified environment. Entries have not been validated.
+        @rtype: {str: str}
+        """
+        with self._lock:
+            return self._get((ros_root, ros_package_path)).locations
+
+    def get_trie(self, ros_root, ros_package_path):
+        """
+        @return: package directory trie for the specified environment.
+          Entries have not been validated.
+        @rtype: L{_PkgTrie}
+        """
+        with self._lock:
+            index = self._get((ros_root, ros_package_path))
+            if index.trie is None:
+                index.trie = _PkgTrie(index.locations)
+            return index.trie
+
+    def get_stacks(self, pkg_dirs, ros_root, ros_package_path):
+        """
+        @param pkg_dirs: normalized package directories
+        @type  pkg_dirs: [str]
+        @return: name of the stack that each package directory is in,
+          or None if it is not part of a stack
+        @rtype: [str]
+        """
+        with self._lock:
+            stacks = self._get((ros_root, ros_package_path)).stacks
+            missing = [d for d in pkg_dirs if d not in stacks]
+            if missing:
+                # index was not crawled by this process, or package
+                # directories are not on the package path
+                stacks.update(roslib.crawler.stack_table(missing))
+            return [stacks[d] for d in pkg_dirs]
+
+    def get(self, package, ros_root, ros_package_path):
+        """
+        @param package: package name
+        @type  package: str
+        @param ros_root: resolved ROS_ROOT
+        @type  ros_root: str
+        @param ros_package_path: resolved ROS_PACKAGE_PATH
+        @type  ros_package_path: str
+        @return: package directory or None if package cannot be found
+        @rtype: str
+        """
+        key = (ros_root, ros_package_path)
+        with self._lock:
+            index = self._get(key)
+            d = index.locations.get(package, None)
+            if d is not None and _is_pkg_dir(d):
+                return d
+            # package has been relocated, or rospack_cache is stale,
+            # or package may have been created since the last crawl
+            if d is not None or not index.crawled or time.time() - index.stamp > _cache_timeout():
+                d = self._crawl(key).locations.get(package, None)
+                if d is not None and _is_pkg_dir(d):
+                    return d
+            return None
+
+_pkg_dir_cache = _PkgDirCache()
+
+def _resolve_env(ros_root, ros_package_path):
+    """
+    @return: ROS_ROOT and ROS_PACKAGE_PATH settings to key
+      _pkg_dir_cache with, from the overrides or os.environ
+    @rtype: (str, str)
+    """
+    if ros_root:
+        ros_root = rospkg.environment._resolve_path(ros_root)
+    elif ROS_ROOT in os.environ:
+        ros_root = os.environ[ROS_ROOT]
+
+    if ros_package_path is not None:
+        ros_package_path = rospkg.environment._resolve_paths(ros_package_path)
+    elif ROS_PACKAGE_PATH in os.environ:
+        ros_package_path = os.environ[ROS_PACKAGE_PATH]
+    return ros_root, ros_package_path
+
+def get_dir_pkgs(paths, ros_root=None, ros_package_path=None, session=None):
+    """
+    Get the packages that a list of paths are contained within. Unlike
+    L{get_dir_pkg()}, only packages on the package path are
+    considered and the filesystem is not accessed, other than to build
+    the package index on first use: paths are matched against the
+    package directories by prefix, without resolving symlinks.
+
+    @param paths: file or directory paths
+    @type  paths: [str]
+    @param ros_root: if specified, override ROS_ROOT
+    @type  ros_root: str
+    @param ros_package_path: if specified, override ROS_PACKAGE_PATH
+    @type  ros_package_path: str
+    @param session: if specified, use the environment of session.
+      Overrides ros_root and ros_package_path.
+    @type  session: L{roslib.session.Session}
+    @return: (package_directory, package) for each path, or None,None
+      if the path is not in a package
+    @rtype: [(str, str)]
+    """
+    if session is not None:
+        ros_root, ros_package_path = session.ros_root, session.ros_package_path
+    else:
+        ros_root, ros_package_path = _resolve_env(ros_root, ros_package_path)
+    lookup = _pkg_dir_cache.get_trie(ros_root, ros_package_path).lookup
+    return [lookup(p) for p in paths]
+
+def get_pkg_dir(package, required=True, ros_root=None, ros_package_path=None, session=None):
+    """
+    Locate directory package is stored in. This routine uses an
+    internal cache, which rebuilds if packages are relocated after
     this process is initiated.
     
     @param package: package name
@@ -124,69 +424,24 @@ def get_pkg_dir(package, required=True, ros_root=None, ros_package_path=None):
     @type  ros_root: str
     @param ros_package_path: if specified, override ROS_PACKAGE_PATH
     @type  ros_package_path: str
+    @param session: if specified, look up package with session
+      instead (see L{roslib.session.Session.get_pkg_dir()}). Overrides
+      ros_root and ros_package_path.
+    @type  session: L{roslib.session.Session}
     @return: directory containing package or None if package cannot be found and required is False.
     @rtype: str
     @raise InvalidROSPkgException: if required is True and package cannot be located
     """    
-
-    #UNIXONLY
-    #TODO: replace with non-rospack-based solution (e.g. os.walk())
     try:
-        penv = os.environ.copy()
-        if ros_root:
-            ros_root = rospkg.environment._resolve_path(ros_root)
-            penv[ROS_ROOT] = ros_root
-        elif ROS_ROOT in os.environ:
-            # record setting for _pkg_dir_cache
-            ros_root = os.environ[ROS_ROOT]
-
-        # determine rospack exe name
-        rospack = 'rospack'
-
-        if ros_package_path is not None:
-            ros_package_path = rospkg.environment._resolve_paths(ros_package_path)
-            penv[ROS_PACKAGE_PATH] = ros_package_path
-        elif ROS_PACKAGE_PATH in os.environ:
-            # record setting for _pkg_dir_cache
-            ros_package_path = os.environ[ROS_PACKAGE_PATH]
-
-        # update cache if we haven't. NOTE: we only get one cache
-        if not _pkg_dir_cache:
-            _read_rospack_cache(_pkg_dir_cache, ros_root, ros_package_path)
-            
-        # now that we've resolved the args, check the cache
-        if package in _pkg_dir_cache:
-            dir_, rr, rpp = _pkg_dir_cache[package]
-            if rr == ros_root and rpp == ros_package_path:
-                if os.path.isfile(os.path.join(dir_, MANIFEST_FILE)):
-                    return dir_
-                else:
-                    # invalidate cache
-                    _invalidate_cache(_pkg_dir_cache)
-            
-        rpout, rperr = Popen([rospack, 'find', package], \
-                                 stdout=PIPE, stderr=PIPE, env=penv).communicate()
-
-        pkg_dir = (rpout or '').strip()
-        #python3.1 popen returns as bytes
-        if (isinstance(pkg_dir, bytes)):
-            pkg_dir = pkg_dir.decode()
+        if session is not None:
+            ros_root, ros_package_path = session.ros_root, session.ros_package_path
+            pkg_dir = session.get_pkg_dir(package)
+        else:
+            ros_root, ros_package_path = _resolve_env(ros_root, ros_package_path)
+            pkg_dir = _pkg_dir_cache.get(package, ros_root, ros_package_path)
         if not pkg_dir:
-            raise InvalidROSPkgException("Cannot locate installation of package %s: %s. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, rperr.strip(), ros_root, ros_package_path))
-
-        pkg_dir = os.path.normpath(pkg_dir)
-        if not os.path.exists(pkg_dir):
-            raise InvalidROSPkgException("Cannot locate installation of package %s: [%s] is not a valid path. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, pkg_dir, ros_root, ros_package_path))
-        elif not os.path.isdir(pkg_dir):
-            raise InvalidROSPkgException("Package %s is invalid: file [%s] is in the way"%(package, pkg_dir))
-        # don't update cache: this should only be updated from
-        # rospack_cache as it will corrupt package list otherwise.
-        #_pkg_dir_cache[package] = (pkg_dir, ros_root, ros_package_path)
-        return pkg_dir
-    except OSError as e:
-        if required:
-            raise InvalidROSPkgException("Environment configuration is invalid: cannot locate rospack (%s)"%e)
-        return None
+            raise InvalidROSPkgException("Cannot locate installation of package %s: [rospack] Error: package '%s' not found. ROS_ROOT[%s] ROS_PACKAGE_PATH[%s]"%(package, package, ros_root, ros_package_path))
+        return os.path.normpath(pkg_dir)
     except Exception as e:
         if required:
             raise
@@ -232,7 +487,7 @@ Please check permissions and try again.
             raise
         return None
     
-def get_pkg_subdir(package, subdir, required=True, env=None):
+def get_pkg_subdir(package, subdir, required=True, env=None, session=None):
     """
     @param required: if True, will attempt to create the subdirectory
         if it does not exist. An exception will be raised  if this fails.
@@ -243,55 +498,41 @@ def get_pkg_subdir(package, subdir, required=True, env=None):
     @type  env: dict
     @param required: if True, directory must exist    
     @type  required: bool
+    @param session: if specified, locate package with session. Overrides env.
+    @type  session: L{roslib.session.Session}
     @return: Package subdirectory if package exist, otherwise None.
     @rtype: str
     @raise InvalidROSPkgException: if required is True and directory does not exist
     """
     if env is None:
         env = os.environ
-    pkg_dir = get_pkg_dir(package, required, ros_root=env[ROS_ROOT]) 
+    if session is not None:
+        pkg_dir = get_pkg_dir(package, required, session=session)
+    else:
+        pkg_dir = get_pkg_dir(package, required, ros_root=env[ROS_ROOT]) 
     return _get_pkg_subdir_by_dir(pkg_dir, subdir, required, env)
 
 #
 # Map ROS resources to files
 #
 
-def resource_file(package, subdir, resource_name):
+def resource_file(package, subdir, resource_name, session=None):
     """
     @param subdir: name of subdir -- these should be one of the
         string constants, e.g. MSG_DIR
     @type  subdir: str
+    @param session: session to locate package with
+    @type  session: L{roslib.session.Session}
     @return: path to resource in the specified subdirectory of the
         package, or None if the package does not exists
     @rtype: str
     @raise roslib.packages.InvalidROSPkgException: If package does not exist 
     """
-    d = get_pkg_subdir(package, subdir, False)
+    d = get_pkg_subdir(package, subdir, False, session=session)
     if d is None:
         raise InvalidROSPkgException(package)
     return os.path.join(d, resource_name)
 
-def _update_rospack_cache(env=None):
-    """
-    Internal routine to update global package directory cache
-    
-    @return: True if cache is valid
-    @rtype: bool
-    """
-    if env is None:
-        env = os.environ
-    cache = _pkg_dir_cache
-    if cache:
-        return True
-    ros_root = env[ROS_ROOT]
-    ros_package_path = env.get(ROS_PACKAGE_PATH, '')
-    return _read_rospack_cache(cache, ros_root, ros_package_path)
-
-def _invalidate_cache(cache):
-    # I've only made this a separate routine because roslib.packages should really be using
-    # the roslib.stacks cache implementation instead with the separate cache marker
-    cache.clear()
-
 def _read_rospack_cache(cache, ros_root, ros_package_path):
     """
     Read in rospack_cache data into cache. On-disk cache specifies a
@@ -330,7 +571,25 @@ def _read_rospack_cache(cache, ros_root, ros_package_path):
     except:
         pass
     
-def list_pkgs_by_path(path, packages=None, cache=None, env=None):
+# version control directories that list_pkgs_by_path() does not search
+_VCS_DIRS = frozenset(['.svn', '.git'])
+
+def _list_pkgs_visitor(d, dirs, files):
+    """
+    roslib.crawler.walk() visitor for list_pkgs_by_path()
+    @return: package name if d is a package
+    @rtype: str
+    """
+    if MANIFEST_FILE in files:
+        del dirs[:]
+        return os.path.basename(d)
+    elif 'rospack_nosubdirs' in files:
+        del dirs[:]
+        return None
+    # skip version control metadata. Other hidden dirs are still searched
+    dirs[:] = [di for di in dirs if di not in _VCS_DIRS]
+
+def list_pkgs_by_path(path, packages=None, cache=None, env=None, workers=None):
     """
     List ROS packages within the specified path.
 
@@ -345,6 +604,8 @@ def list_pkgs_by_path(path, packages=None, cache=None, env=None):
     @type  packages: [str]
     @param cache: (optional) package path cache to update. Maps package name to directory path.
     @type  cache: {str: str}
+    @param workers: (optional) number of threads used to crawl path
+    @type  workers: int
     @return: complete list of package names in ROS environment. Same as packages parameter.
     @rtype: [str]
     """
@@ -357,45 +618,30 @@ def list_pkgs_by_path(path, packages=None, cache=None, env=None):
     ros_package_path = env.get(ROS_PACKAGE_PATH, '')
 
     path = os.path.abspath(path)
-    for d, dirs, files in os.walk(path, topdown=True):
-        if MANIFEST_FILE in files:
-            package = os.path.basename(d)
-            if package not in packages:
-                packages.append(package)
-                if cache is not None:
-                    cache[package] = d, ros_root, ros_package_path
-            del dirs[:]
-            continue #leaf
-        elif 'rospack_nosubdirs' in files:
-            del dirs[:]
-            continue #leaf
-        #small optimization
-        elif '.svn' in dirs:
-            dirs.remove('.svn')
-        elif '.git' in dirs:
-            dirs.remove('.git')
-
-        for sub_d in dirs:
-            # followlinks=True only available in Python 2.6, so we
-            # have to implement manually
-            sub_p = os.path.join(d, sub_d)
-            if os.path.islink(sub_p):
-                packages.extend(list_pkgs_by_path(sub_p, cache=cache))
-            
+    found = set(packages)
+    for d, package in roslib.crawler.walk(path, _list_pkgs_visitor, workers=workers):
+        if package not in found:
+            found.add(package)
+            packages.append(package)
+            if cache is not None:
+                cache[package] = d, ros_root, ros_package_path
     return packages
 
-def find_node(pkg, node_type, rospack=None):
+def find_node(pkg, node_type, rospack=None, session=None):
     """
     Warning: unstable API due to catkin.
 
     Locate the executable that implements the node
     
     :param node_type: type of node, ``str``
+    :param session: `roslib.session.Session` to use, overrides rospack
     :returns: path to node or None if node is not in the package ``str``
     :raises: :exc:rospkg.ResourceNotFound` If package does not exist 
     """
 
-    if rospack is None:
+    if session is not None:
+        rospack = session.rospack
+    elif rospack is None:
         rospack = rospkg.RosPack()
     return find_resource(pkg, node_type, filter_fn=_executable_filter, rospack=rospack)
 
@@ -406,11 +652,100 @@ def _executable_filter(test_path):
         flags = stat.S_IRUSR
     return (s.st_mode & flags) == flags
 
+def _list_files_visitor(d, dirs, files):
+    """
+    roslib.crawler.walk() visitor for L{_ResourceIndex}
+    @return: names of files in d
+    @rtype: [str]
+    """
+    # remove .svn/.git/etc
+    dirs[:] = [x for x in dirs if not x.startswith('.')]
+    if sys.platform in ['win32', 'cygwin']:
+        # case insensitive
+        return [f.lower() for f in files]
+    return files
+
+class _ResourceIndex(object):
+    """
+    Index of the files in a directory tree, for find_resource().
+    The index is built on first use and is validated by the mtimes of
+    the directories in the tree: only directories that have changed
+    are listed again. Only the listing is cached: filters such as
+    the executable check are applied to the live files, as a chmod
+    does not change the mtime of the directory.
+    """
+    __slots__ = ['root', 'snapshot', 'files', 'order']
+
+    def __init__(self, root):
+        """
+        @param root: root directory of the tree
+        @type  root: str
+        """
+        self.root = root
+        self.snapshot = roslib.crawler.Snapshot()
+        # {file name: [directory]}
+        self.files = None
+        # {directory: position in os.walk() order}
+        self.order = None
+
+    def update(self):
+        results = roslib.crawler.walk(self.root, _list_files_visitor, workers=1, snapshot=self.snapshot, followlinks=False)
+        if self.files is None or self.snapshot.dirty:
+            files = {}
+            order = {}
+            for i, (d, names) in enumerate(results):
+                order[d] = i
+                for name in names:
+                    files.setdefault(name, []).append(d)
+            self.files = files
+            self.order = order
+            self.snapshot.dirty = False
+
+    def find(self, name, filter_fn=None):
+        """
+        @param name: file name
+        @type  name: str
+        @param filter_fn: function that takes in a path argument and
+            returns True if the it matches the desired resource
+        @type  filter_fn: fn(str)
+        @return: paths of files named name in the tree, in os.walk() order
+        @rtype: [str]
+        """
+        matches = [os.path.join(d, name) for d in self.files.get(name, ())]
+        if filter_fn is None:
+            return matches
+        return [m for m in matches if filter_fn(m)]
+
+# number of directory trees that _resource_indexes keeps
+RESOURCE_INDEX_CACHE_SIZE = 256
+
+_resource_indexes = collections.OrderedDict()
+_resource_indexes_lock = threading.Lock()
+
+def _get_resource_index(d):
+    """
+    @param d: directory
+    @type  d: str
+    @return: up-to-date index of the files in d
+    @rtype: L{_ResourceIndex}
+    """
+    d = os.path.abspath(d)
+    with _resource_indexes_lock:
+        index = _resource_indexes.pop(d, None)
+        if index is None:
+            index = _ResourceIndex(d)
+        # mark as most recently used
+        _resource_indexes[d] = index
+        while len(_resource_indexes) > RESOURCE_INDEX_CACHE_SIZE:
+            _resource_indexes.popitem(last=False)
+        index.update()
+        return index
+
 def _find_resource(d, resource_name, filter_fn=None):
     """
     subroutine of find_resource
     """
-    matches = []
+    index = _get_resource_index(d)
     # TODO: figure out how to generalize find_resource to take multiple resource name options
     if sys.platform in ['win32', 'cygwin']:
         # Windows logic requires more file patterns to resolve and is
@@ -427,40 +762,27 @@ def _find_resource(d, resource_name, filter_fn=None):
         #   specified extension manually
         resource_name = resource_name.lower()
         patterns = [resource_name, resource_name+'.exe', resource_name+'.bat', resource_name+'.py']
-        for p, dirs, files in os.walk(d):
-            # case insensitive
-            files = [f.lower() for f in files]
-            for name in patterns:
-                if name in files:
-                    test_path = os.path.join(p, name)
-                    if filter_fn is not None:
-                        if filter_fn(test_path):
-                            matches.append(test_path)
-                    else:
-                        matches.append(test_path)
-            # remove .svn/.git/etc
-            to_prune = [x for x in dirs if x.startswith('.')]
-            for x in to_prune:
-                dirs.remove(x)
-    else: #UNIX            
-        for p, dirs, files in os.walk(d):
-            if resource_name in files:
-                test_path = os.path.join(p, resource_name)
-                if filter_fn is not None:
-                    if filter_fn(test_path):
-                        matches.append(test_path)
-                else:
-                    matches.append(test_path)
-            # remove .svn/.git/etc
-            to_prune = [x for x in dirs if x.startswith('.')]
-            for x in to_prune:
-                dirs.remove(x)
-    return [os.path.abspath(m) for m in matches]
+        matches = []
+        for name in patterns:
+            matches.extend(index.find(name, filter_fn))
+        # os.walk() order: by directory, then by pattern
+        matches.sort(key=lambda m: index.order[os.path.dirname(m)])
+        return matches
+    else: #UNIX
+        return index.find(resource_name, filter_fn)
+
+def _unique(values):
+    """
+    @return: values with duplicates removed, keeping the first occurrence
+    @rtype: list
+    """
+    seen = set()
+    return [v for v in values if not (v in seen or seen.add(v))]
 
 # TODO: this routine really belongs in rospkg, but the catkin-isms really, really don't
 # belong in rospkg.  With more thought, they can probably be abstracted out so as
 # to no longer be catkin-specific. 
-def find_resource(pkg, resource_name, filter_fn=None, rospack=None):
+def find_resource(pkg, resource_name, filter_fn=None, rospack=None, session=None):
     """
     Warning: unstable API due to catkin.
 
@@ -474,6 +796,7 @@ def find_resource(pkg, resource_name, filter_fn=None, rospack=None):
     :param filter: function that takes in a path argument and
         returns True if the it matches the desired resource, ``fn(str)``
     :param rospack: `rospkg.RosPack` instance to use
+    :param session: `roslib.session.Session` to use, overrides rospack
     :returns: lists of matching paths for resource within a given scope, ``[str]``
     :raises: :exc:`rospkg.ResourceNotFound` If package does not exist 
     """
@@ -488,7 +811,9 @@ def find_resource(pkg, resource_name, filter_fn=None, rospack=None):
     #
     # NOTE: package *must* exist on ROS_PACKAGE_PATH no matter what
 
-    if rospack is None:
+    if session is not None:
+        rospack = session.rospack
+    elif rospack is None:
         rospack = rospkg.RosPack()
 
     # lookup package as it *must* exist
@@ -513,8 +838,4 @@ def find_resource(pkg, resource_name, filter_fn=None, rospack=None):
     matches.extend(_find_resource(pkg_path, resource_name, filter_fn=filter_fn))
 
     # Uniquify the results, in case we found the same file twice, while keeping order
-    unique_matches = []
-    for match in matches:
-        if match not in unique_matches:
-            unique_matches.append(match)
-    return unique_matches
+    return _unique(matches)
@@ -0,0 +1,252 @@
+#! /usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Compact binary format for the package location cache.
+
+The cache file is mmap()ed, and a package is looked up by binary
+search of its sorted name table, so that tools which only need a
+couple of package locations do not have to read the whole file.
+
+File layout (little-endian)::
+
+  header:  magic, version, flags, count, ROS_ROOT, ROS_PACKAGE_PATH
+  entries: count x (name offset, name length, dir offset, dir length),
+           sorted by name
+  strings: the data referenced by the header and entries
+
+Warning: do not use this library.  It is unstable and most of the routines
+here have been superceded by other libraries (e.g. rospkg).  These
+routines will likely be *deleted* in future releases.
+"""
+
+import mmap
+import os
+import struct
+import sys
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping # Python 2
+
+MAGIC = b'ROSPKGC\0'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sIIIIIII')
+_ENTRY = struct.Struct('<IIII')
+
+# header flags
+_ROS_ROOT_NONE = 1
+_ROS_PACKAGE_PATH_NONE = 2
+
+if sys.hexversion > 0x03000000: #Python3
+    def _encode(s):
+        return s.encode('utf-8', 'surrogateescape')
+    def _decode(b):
+        return b.decode('utf-8', 'surrogateescape')
+else:
+    def _encode(s):
+        if isinstance(s, unicode):
+            return s.encode('utf-8')
+        return s
+    def _decode(b):
+        return b
+
+class PackageCacheException(Exception): pass
+
+def write_cache(filename, ros_root, ros_package_path, locations):
+    """
+    Write package locations to a binary cache file. The file is
+    replaced atomically, so readers that have the previous version
+    mapped are not affected.
+
+    @param filename: cache file path
+    @type  filename: str
+    @param ros_root: ROS_ROOT the locations were computed for
+    @type  ros_root: str
+    @param ros_package_path: ROS_PACKAGE_PATH the locations were computed for
+    @type  ros_package_path: str
+    @param locations: map of package name to package directory
+    @type  locations: {str: str}
+    @raise IOError, OSError: if file cannot be written
+    """
+    flags = 0
+    if ros_root is None:
+        flags |= _ROS_ROOT_NONE
+    if ros_package_path is None:
+        flags |= _ROS_PACKAGE_PATH_NONE
+    items = sorted((_encode(k), _encode(v)) for k, v in locations.items())
+    strings = []
+    offset = [_HEADER.size + _ENTRY.size * len(items)]
+    def add(b):
+        strings.append(b)
+        start = offset[0]
+        offset[0] += len(b)
+        return start, len(b)
+    env = add(_encode(ros_root or '')) + add(_encode(ros_package_path or ''))
+    entries = [_ENTRY.pack(*(add(name) + add(d))) for name, d in items]
+    data = b''.join([_HEADER.pack(MAGIC, VERSION, flags, len(items), *env)] + entries + strings)
+
+    d = os.path.dirname(filename)
+    if d and not os.path.isdir(d):
+        os.makedirs(d)
+    tmp = '%s.%s'%(filename, os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.rename(tmp, filename)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+class PackageCache(Mapping):
+    """
+    Read-only, memory-mapped view of a binary package cache file.
+    Behaves like a dictionary mapping package name to package
+    directory.
+
+    Only the header is validated when the file is opened. Entries
+    are bounds checked as they are read, and an entry that points
+    outside of the file is treated as missing.
+    """
+
+    def __init__(self, filename):
+        """
+        @param filename: cache file path
+        @type  filename: str
+        @raise IOError, OSError: if file cannot be read
+        @raise PackageCacheException: if file is not a valid cache file
+        """
+        with open(filename, 'rb') as f:
+            self.stamp = os.fstat(f.fileno()).st_mtime
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty file
+                raise PackageCacheException("invalid cache file [%s]"%filename)
+        try:
+            magic, version, flags, self._count, rr_off, rr_len, rpp_off, rpp_len = _HEADER.unpack_from(self._mm, 0)
+        except struct.error:
+            raise PackageCacheException("invalid cache file [%s]"%filename)
+        self._size = len(self._mm)
+        rr = self._string(rr_off, rr_len)
+        rpp = self._string(rpp_off, rpp_len)
+        if magic != MAGIC or version != VERSION or \
+                _HEADER.size + _ENTRY.size * self._count > self._size or \
+                rr is None or rpp is None:
+            self._mm.close()
+            raise PackageCacheException("invalid cache file [%s]"%filename)
+        self.ros_root = None if flags & _ROS_ROOT_NONE else _decode(rr)
+        self.ros_package_path = None if flags & _ROS_PACKAGE_PATH_NONE else _decode(rpp)
+
+    def close(self):
+        self._mm.close()
+
+    def _string(self, off, length):
+        """
+        @return: string data, or None if it is not within the file
+        @rtype: bytes
+        """
+        if off + length > self._size:
+            return None
+        return self._mm[off:off+length]
+
+    def _entry(self, i):
+        """
+        @return: (name, dir) of i-th entry, as bytes. Either is None
+          if the entry is corrupt.
+        """
+        name_off, name_len, dir_off, dir_len = _ENTRY.unpack_from(self._mm, _HEADER.size + _ENTRY.size * i)
+        return self._string(name_off, name_len), self._string(dir_off, dir_len)
+
+    def _name(self, i):
+        name_off, name_len, _, _ = _ENTRY.unpack_from(self._mm, _HEADER.size + _ENTRY.size * i)
+        return self._string(name_off, name_len)
+
+    def __getitem__(self, package):
+        key = _encode(package)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            name = self._name(mid)
+            if name is None:
+                # corrupt entry: search order is unknown, so miss
+                raise KeyError(package)
+            if name < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count:
+            name, d = self._entry(lo)
+            if name == key and d is not None:
+                return _decode(d)
+        raise KeyError(package)
+
+    def __len__(self):
+        """
+        @return: number of entries in the file, including any corrupt
+          entries that are skipped by iteration
+        """
+        return self._count
+
+    def __iter__(self):
+        for name, d in (self._entry(i) for i in range(self._count)):
+            if name is not None and d is not None:
+                yield _decode(name)
+
+    def items(self):
+        return [(_decode(name), _decode(d)) for name, d in (self._entry(i) for i in range(self._count)) if name is not None and d is not None]
+
+def read_cache(filename, ros_root, ros_package_path):
+    """
+    Open binary cache file if it matches the requested environment.
+    @param filename: cache file path
+    @type  filename: str
+    @param ros_root: ROS_ROOT value
+    @type  ros_root: str
+    @param ros_package_path: ROS_PACKAGE_PATH value
+    @type  ros_package_path: str
+    @return: cache, or None if file does not exist, is invalid or
+      was written for a different environment
+    @rtype: L{PackageCache}
+    """
+    try:
+        cache = PackageCache(filename)
+    except (IOError, OSError, PackageCacheException):
+        return None
+    if cache.ros_root != ros_root or cache.ros_package_path != ros_package_path:
+        cache.close()
+        return None
+    return cache
@@ -0,0 +1,498 @@
+#! /usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Long-lived package server, which holds the package and stack indexes
+of the workspace in memory and answers rospack and rosstack queries
+over a Unix domain socket. roslib.rospack and roslib.packages query
+the server when it is running and fall back to answering in-process
+when it is not. Start it with::
+
+  python -m roslib.pkgserver
+
+The package path is re-crawled incrementally at most once every
+check interval, and the indexes are rebuilt when a crawled directory
+or a manifest has changed.
+
+The protocol is one JSON object per line. A request is
+{"tool": "rospack"|"rosstack", "args": [...], "ros_root": ...,
+"ros_package_path": ...} and the reply is {"out": output} with the
+output that the tool would print, {"error": message} or
+{"unsupported": true} if the server cannot answer the command.
+
+Warning: do not use this library.  It is unstable and most of the routines
+here have been superceded by other libraries (e.g. rospkg).  These
+routines will likely be *deleted* in future releases.
+"""
+
+from __future__ import print_function
+
+import collections
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver # Python 2
+
+import roslib.crawler
+import roslib.depgraph
+import roslib.exceptions
+import roslib.exports
+import rospkg
+
+SOCKET_FILE = 'roslib_pkgserver.sock'
+
+# seconds between checks of the package path for changes
+CHECK_INTERVAL = 1.
+
+# seconds that a client waits for the server before falling back to
+# answering in-process
+CLIENT_TIMEOUT = 5.
+
+# number of environments that a server keeps indexes for
+MAX_WORKSPACES = 8
+
+# files whose changes invalidate the indexes
+WATCH = (roslib.crawler.PACKAGE_FILE, roslib.crawler.MANIFEST_FILE, roslib.crawler.STACK_FILE)
+
+# dependency queries, by command, and the DependencyGraph method that answers them
+GRAPH_COMMANDS = {
+    'deps': 'depends',
+    'deps1': 'depends_1',
+    'depends': 'depends',
+    'depends1': 'depends_1',
+    'depends-on': 'depends_on',
+    'depends-on1': 'depends_on_1',
+}
+
+class UnsupportedCommand(Exception): pass
+
+def get_socket_path(env=None):
+    """
+    @param env: override os.environ dictionary
+    @type  env: dict
+    @return: path of the server socket in ROS_HOME
+    @rtype: str
+    """
+    return os.path.join(rospkg.get_ros_home(env), SOCKET_FILE)
+
+def _is_pkg_dir(d):
+    return os.path.isfile(os.path.join(d, roslib.crawler.MANIFEST_FILE)) or os.path.isfile(os.path.join(d, roslib.crawler.PACKAGE_FILE))
+
+class _Workspace(object):
+    """
+    Package and stack indexes for one ROS_ROOT and ROS_PACKAGE_PATH
+    """
+
+    def __init__(self, ros_root, ros_package_path, check_interval):
+        self.ros_paths = rospkg.environment._compute_package_paths(ros_root, ros_package_path)
+        self.check_interval = check_interval
+        self.lock = threading.RLock()
+        self.snapshots = {}
+        self.checked = 0.
+        self.locations = None
+        self._package_graph = None
+        self._export_index = None
+        self._rosstack = None
+        self._stack_graph = None
+
+    def refresh(self, force=False):
+        """
+        Re-crawl the package path if the check interval has passed
+        (or if force is True) and drop the indexes if it has changed.
+        """
+        with self.lock:
+            now = time.time()
+            if not force and self.locations is not None and now - self.checked < self.check_interval:
+                return
+            locations = roslib.crawler.crawl_packages(self.ros_paths, snapshots=self.snapshots, watch=WATCH)
+            if self.locations is None or any(s.dirty for s in self.snapshots.values()):
+                self.locations = locations
+                self._package_graph = None
+                self._export_index = None
+                self._rosstack = None
+                self._stack_graph = None
+            for s in self.snapshots.values():
+                s.dirty = False
+            self.checked = now
+
+    def package_graph(self):
+        with self.lock:
+            if self._package_graph is None:
+                self._package_graph = roslib.depgraph.DependencyGraph(self.locations, roslib.depgraph.read_package_depends,
+                                                                      preload=roslib.depgraph.preload_package_manifests)
+            return self._package_graph
+
+    def export_index(self):
+        with self.lock:
+            if self._export_index is None:
+                self._export_index = roslib.exports.ExportIndex(self.locations)
+            return self._export_index
+
+    def get_rosstack(self):
+        with self.lock:
+            if self._rosstack is None:
+                self._rosstack = rospkg.RosStack(self.ros_paths)
+            return self._rosstack
+
+    def stack_graph(self):
+        with self.lock:
+            if self._stack_graph is None:
+                rosstack = self.get_rosstack()
+                locations = dict((s, rosstack.get_path(s)) for s in rosstack.list())
+                self._stack_graph = roslib.depgraph.DependencyGraph(locations, roslib.depgraph.read_stack_depends, kind='stack',
+                                                                    preload=roslib.depgraph.preload_stack_manifests)
+            return self._stack_graph
+
+    def find(self, package):
+        d = self.locations.get(package, None)
+        if d is None or not _is_pkg_dir(d):
+            # changed within the check interval
+            self.refresh(force=True)
+            d = self.locations.get(package, None)
+        if d is None:
+            raise roslib.exceptions.ROSLibException("rospack: package '%s' not found"%package)
+        return d
+
+    def run_rospack(self, args):
+        """
+        @return: output of rospack for args
+        @rtype: str
+        """
+        self.refresh()
+        cmd, args = args[0], args[1:]
+        if cmd == 'find' and len(args) == 1:
+            return self.find(args[0])
+        elif cmd == 'list' and not args:
+            return '\n'.join('%s %s'%(name, d) for name, d in sorted(self.locations.items()))
+        elif cmd == 'list-names' and not args:
+            return '\n'.join(sorted(self.locations))
+        elif cmd in GRAPH_COMMANDS and cmd not in ('depends', 'depends1') and len(args) == 1:
+            return '\n'.join(getattr(self.package_graph(), GRAPH_COMMANDS[cmd])(args[0]))
+        elif cmd == 'plugins' and len(args) == 2 and args[0].startswith('--attrib='):
+            attrib, package = args[0][len('--attrib='):], args[1]
+            plugins = self.export_index().plugins(package, attrib, self.package_graph().depends_on_1(package))
+            return '\n'.join('%s %s'%p for p in plugins)
+        raise UnsupportedCommand()
+
+    def run_rosstack(self, args):
+        """
+        @return: output of rosstack for args
+        @rtype: str
+        """
+        self.refresh()
+        cmd, args = args[0], args[1:]
+        if cmd == 'find' and len(args) == 1:
+            try:
+                return self.get_rosstack().get_path(args[0])
+            except rospkg.ResourceNotFound:
+                raise roslib.exceptions.ROSLibException("rosstack: stack '%s' not found"%args[0])
+        elif cmd == 'list' and not args:
+            rosstack = self.get_rosstack()
+            return '\n'.join('%s %s'%(s, rosstack.get_path(s)) for s in sorted(rosstack.list()))
+        elif cmd == 'list-names' and not args:
+            return '\n'.join(sorted(self.get_rosstack().list()))
+        elif cmd in GRAPH_COMMANDS and cmd not in ('deps', 'deps1') and len(args) == 1:
+            return '\n'.join(getattr(self.stack_graph(), GRAPH_COMMANDS[cmd])(args[0]))
+        raise UnsupportedCommand()
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line.decode('utf-8'))
+                reply = {'out': self.server.pkgserver.handle(request)}
+            except UnsupportedCommand:
+                reply = {'unsupported': True}
+            except roslib.exceptions.ROSLibException as e:
+                reply = {'error': str(e)}
+            except Exception as e:
+                reply = {'error': 'pkgserver: %s'%e}
+            self.wfile.write((json.dumps(reply) + '\n').encode('utf-8'))
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class PackageServer(object):
+    """
+    Server for rospack and rosstack queries. See the module
+    documentation for the protocol.
+    """
+
+    def __init__(self, socket_path=None, check_interval=CHECK_INTERVAL):
+        """
+        @param socket_path: path of the socket, defaults to
+          L{get_socket_path()}
+        @type  socket_path: str
+        @param check_interval: seconds between checks of the package
+          path for changes
+        @type  check_interval: float
+        """
+        self.socket_path = socket_path or get_socket_path()
+        self.check_interval = check_interval
+        self._workspaces = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _workspace(self, ros_root, ros_package_path):
+        key = (ros_root, ros_package_path)
+        with self._lock:
+            ws = self._workspaces.pop(key, None)
+            if ws is None:
+                ws = _Workspace(ros_root, ros_package_path, self.check_interval)
+            self._workspaces[key] = ws
+            while len(self._workspaces) > MAX_WORKSPACES:
+                self._workspaces.popitem(last=False)
+            return ws
+
+    def preload(self, ros_root, ros_package_path, workers=None):
+        """
+        Crawl a workspace and parse its manifests before serving, with
+        a pool of worker processes. Must be called before
+        L{serve_forever()} starts threads.
+        @param ros_root: resolved ROS_ROOT
+        @type  ros_root: str
+        @param ros_package_path: resolved ROS_PACKAGE_PATH
+        @type  ros_package_path: str
+        @param workers: number of worker processes, None uses the
+          number of CPUs
+        @type  workers: int
+        """
+        ws = self._workspace(ros_root, ros_package_path)
+        ws.refresh(force=True)
+        roslib.depgraph.preload_package_manifests(list(ws.locations.values()), workers)
+        rosstack = ws.get_rosstack()
+        roslib.depgraph.preload_stack_manifests([rosstack.get_path(s) for s in rosstack.list()], workers)
+
+    def handle(self, request):
+        """
+        @param request: decoded request
+        @type  request: dict
+        @return: output of the command
+        @rtype: str
+        @raise UnsupportedCommand: if the command cannot be answered
+        @raise ROSLibException: if the command fails
+        """
+        args = request.get('args') or []
+        if not args:
+            raise UnsupportedCommand()
+        ws = self._workspace(request.get('ros_root'), request.get('ros_package_path'))
+        tool = request.get('tool')
+        if tool == 'rospack':
+            return ws.run_rospack(args)
+        elif tool == 'rosstack':
+            return ws.run_rosstack(args)
+        raise UnsupportedCommand()
+
+    def bind(self):
+        """
+        Create the socket. A stale socket left by a server that did
+        not shut down cleanly is replaced.
+        @raise ROSLibException: if another server is already running
+        """
+        if os.path.exists(self.socket_path):
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                s.connect(self.socket_path)
+            except socket.error:
+                os.remove(self.socket_path)
+            else:
+                raise roslib.exceptions.ROSLibException("pkgserver is already running on %s"%self.socket_path)
+            finally:
+                s.close()
+        d = os.path.dirname(self.socket_path)
+        if d and not os.path.isdir(d):
+            os.makedirs(d)
+        self._server = _UnixServer(self.socket_path, _Handler)
+        self._server.pkgserver = self
+        os.chmod(self.socket_path, 0o600)
+
+    def serve_forever(self):
+        if self._server is None:
+            self.bind()
+        try:
+            self._server.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self):
+        """
+        Stop serve_forever(), from another thread.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+
+    def close(self):
+        if self._server is not None:
+            self._server.server_close()
+            self._server = None
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+
+_client_lock = threading.Lock()
+# (socket path, pid, socket, file), reused across queries
+_client = None
+
+def _close_client():
+    global _client
+    if _client is not None:
+        try:
+            _client[2].close()
+            _client[3].close()
+        except socket.error:
+            pass
+        _client = None
+
+def _connect(socket_path):
+    """
+    @return: connection to the server, or None if it is not running
+    @rtype: (str, int, socket, file)
+    """
+    global _client
+    if _client is not None and _client[0] == socket_path and _client[1] == os.getpid():
+        return _client
+    _close_client()
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.settimeout(CLIENT_TIMEOUT)
+    try:
+        s.connect(socket_path)
+    except socket.error:
+        s.close()
+        return None
+    _client = (socket_path, os.getpid(), s, s.makefile('rb'))
+    return _client
+
+def query(tool, args, ros_root=None, ros_package_path=None, socket_path=None):
+    """
+    Query the package server.
+    @param tool: 'rospack' or 'rosstack'
+    @type  tool: str
+    @param args: command line arguments of the tool
+    @type  args: [str]
+    @param ros_root: resolved ROS_ROOT
+    @type  ros_root: str
+    @param ros_package_path: resolved ROS_PACKAGE_PATH
+    @type  ros_package_path: str
+    @param socket_path: path of the socket, defaults to L{get_socket_path()}
+    @type  socket_path: str
+    @return: output of the command, or None if the server is not
+      running, does not reply within L{CLIENT_TIMEOUT} or cannot
+      answer the command
+    @rtype: str
+    @raise ROSLibException: if the command fails
+    """
+    if socket_path is None:
+        socket_path = get_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+    request = (json.dumps({'tool': tool, 'args': list(args), 'ros_root': ros_root, 'ros_package_path': ros_package_path}) + '\n').encode('utf-8')
+    with _client_lock:
+        # a reused connection may have been closed by a server
+        # restart, so retry once on a new connection
+        for _ in range(2):
+            client = _connect(socket_path)
+            if client is None:
+                return None
+            try:
+                client[2].sendall(request)
+                line = client[3].readline()
+            except socket.timeout:
+                # server is hung or busy. Don't wait for it again
+                _close_client()
+                return None
+            except (socket.error, OSError):
+                line = None
+            if line:
+                break
+            _close_client()
+        else:
+            return None
+    reply = json.loads(line.decode('utf-8'))
+    if 'error' in reply:
+        raise roslib.exceptions.ROSLibException(reply['error'])
+    return reply.get('out', None)
+
+def get_locations(ros_root, ros_package_path, socket_path=None):
+    """
+    @return: map of package name to package directory from the
+      server, or None if it is not running
+    @rtype: {str: str}
+    """
+    val = query('rospack', ['list'], ros_root, ros_package_path, socket_path=socket_path)
+    if val is None:
+        return None
+    return dict(line.split(' ', 1) for line in val.split('\n') if line)
+
+def main(argv=sys.argv):
+    from optparse import OptionParser
+    parser = OptionParser(usage="usage: %prog [options]", prog='pkgserver')
+    parser.add_option("--socket", dest="socket_path", default=None,
+                      help="path of the server socket (default: ROS_HOME/%s)"%SOCKET_FILE)
+    parser.add_option("--check-interval", dest="check_interval", type="float", default=CHECK_INTERVAL,
+                      help="seconds between checks of the package path for changes")
+    options, args = parser.parse_args(argv[1:])
+    if args:
+        parser.error("takes no arguments")
+    server = PackageServer(options.socket_path, options.check_interval)
+    try:
+        server.bind()
+    except roslib.exceptions.ROSLibException as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    def stop(signum, frame):
+        raise KeyboardInterrupt()
+    signal.signal(signal.SIGTERM, stop)
+    # parse the manifests of the server's own environment while it is
+    # still single-threaded, so that worker processes can be used
+    server.preload(os.environ.get(rospkg.environment.ROS_ROOT), os.environ.get(rospkg.environment.ROS_PACKAGE_PATH))
+    print("pkgserver listening on %s"%server.socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -53,11 +53,11 @@ def _get_manifest_by_dir(package_dir):
     """
     f = os.path.join(package_dir, roslib.manifest.MANIFEST_FILE)
     if f:
-        return roslib.manifest.parse_file(f)
+        return roslib.manifest.parse_file(f, lazy=True)
     else:
         return None
 
-def list_package_resources_by_dir(package_dir, include_depends, subdir, rfilter=os.path.isfile):
+def list_package_resources_by_dir(package_dir, include_depends, subdir, rfilter=os.path.isfile, session=None):
     """
     List resources in a package directory within a particular
     subdirectory. This is useful for listing messages, services, etc...
@@ -69,6 +69,8 @@ def list_package_resources_by_dir(package_dir, include_depends, subdir, rfilter=
     @type  include_depends: bool
     @param rfilter: resource filter function that returns true if filename is the desired resource type
     @type  rfilter: fn(filename)->bool
+    @param session: session to load the manifest and locate dependencies with
+    @type  session: L{roslib.session.Session}
     """
     package = os.path.basename(package_dir)
     resources = []
@@ -79,8 +81,11 @@ def list_package_resources_by_dir(package_dir, include_depends, subdir, rfilter=
     else:
         resources = []
     if include_depends:
-        depends = _get_manifest_by_dir(package_dir).depends
-        dirs = [roslib.packages.get_pkg_subdir(d.package, subdir, False) for d in depends]
+        if session is not None:
+            depends = session.get_manifest_by_dir(package_dir).depends
+        else:
+            depends = _get_manifest_by_dir(package_dir).depends
+        dirs = [roslib.packages.get_pkg_subdir(d.package, subdir, False, session=session) for d in depends]
         for (dep, dir_) in zip(depends, dirs): #py3k
             if not dir_ or not os.path.isdir(dir_):
                 continue
@@ -89,7 +94,7 @@ def list_package_resources_by_dir(package_dir, include_depends, subdir, rfilter=
                  for f in os.listdir(dir_) if rfilter(os.path.join(dir_, f))])
     return resources
 
-def list_package_resources(package, include_depends, subdir, rfilter=os.path.isfile):
+def list_package_resources(package, include_depends, subdir, rfilter=os.path.isfile, session=None):
     """
     List resources in a package within a particular subdirectory. This is useful for listing
     messages, services, etc...    
@@ -101,7 +106,9 @@ def list_package_resources(package, include_depends, subdir, rfilter=os.path.isf
     @type  include_depends: bool
     @param rfilter: resource filter function that returns true if filename is the desired resource type
     @type  rfilter: fn(filename)->bool
+    @param session: session to load the manifest and locate packages with
+    @type  session: L{roslib.session.Session}
     """    
-    package_dir = roslib.packages.get_pkg_dir(package)
-    return list_package_resources_by_dir(package_dir, include_depends, subdir, rfilter)
+    package_dir = roslib.packages.get_pkg_dir(package, session=session)
+    return list_package_resources_by_dir(package_dir, include_depends, subdir, rfilter, session)
 
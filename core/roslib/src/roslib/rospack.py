@@ -42,7 +42,14 @@ routines will likely be *deleted* in future releases.
 import os
 import sys
 import subprocess
+import threading
+import time
+
+import roslib.depgraph
 import roslib.exceptions
+import roslib.exports
+import roslib.packages
+import roslib.pkgserver
 import rospkg
 
 if sys.hexversion > 0x03000000: #Python3
@@ -53,12 +60,26 @@ else:
 import warnings
 warnings.warn("roslib.rospack is deprecated, please use rospkg", stacklevel=2)
 
+def _serve(tool, args):
+    """
+    @return: output of the command from roslib.pkgserver, or None if
+      the server is not running
+    @rtype: str
+    @raise roslib.exceptions.ROSLibException: if the command fails
+    """
+    ros_root, ros_package_path = roslib.packages._resolve_env(None, None)
+    return roslib.pkgserver.query(tool, args, ros_root, ros_package_path)
+
 def rospackexec(args):
     """
-    @return: result of executing rospack command (via subprocess). string will be strip()ed.
+    @return: result of executing rospack command (via roslib.pkgserver
+      if it is running, else via subprocess). string will be strip()ed.
     @rtype: str
     @raise roslib.exceptions.ROSLibException: if rospack command fails
     """
+    val = _serve('rospack', args)
+    if val is not None:
+        return val
     rospack_bin = 'rospack'
     if python3:
         val = subprocess.Popen([rospack_bin] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0]
@@ -69,14 +90,71 @@ def rospackexec(args):
         raise roslib.exceptions.ROSLibException(val)
     return val
 
+_graph_lock = threading.Lock()
+_package_graph = None
+_stack_graph = None
+_stack_graph_source = None
+
+def _graph_expired(graph):
+    return time.time() - graph.stamp > roslib.packages._cache_timeout()
+
+def _get_package_graph():
+    """
+    @return: dependency graph of the packages in the current
+      environment. The graph is rebuilt when the package index is, or
+      when it is older than ROS_CACHE_TIMEOUT.
+    @rtype: L{roslib.depgraph.DependencyGraph}
+    """
+    global _package_graph
+    ros_root, ros_package_path = roslib.packages._resolve_env(None, None)
+    locations = roslib.packages._pkg_dir_cache.get_locations(ros_root, ros_package_path)
+    with _graph_lock:
+        graph = _package_graph
+        if graph is None or graph.locations is not locations or _graph_expired(graph):
+            graph = _package_graph = roslib.depgraph.DependencyGraph(locations, roslib.depgraph.read_package_depends,
+                                                                     preload=roslib.depgraph.preload_package_manifests)
+        return graph
+
+def _get_stack_graph():
+    """
+    @return: dependency graph of the stacks in the current
+      environment. The graph is rebuilt when the environment changes,
+      or when it is older than ROS_CACHE_TIMEOUT.
+    @rtype: L{roslib.depgraph.DependencyGraph}
+    """
+    global _stack_graph, _stack_graph_source
+    import roslib.stacks
+    roslib.stacks._init_rosstack()
+    rosstack = roslib.stacks._rosstack
+    with _graph_lock:
+        graph = _stack_graph
+        if graph is None or _stack_graph_source is not rosstack or _graph_expired(graph):
+            locations = dict((s, rosstack.get_path(s)) for s in rosstack.list())
+            graph = _stack_graph = roslib.depgraph.DependencyGraph(locations, roslib.depgraph.read_stack_depends, kind='stack',
+                                                                   preload=roslib.depgraph.preload_stack_manifests)
+            _stack_graph_source = rosstack
+        return graph
+
+def _depends_query(tool, cmd, name):
+    """
+    Answer a dependency query with roslib.pkgserver if it is running,
+    else in-process.
+    """
+    val = _serve(tool, [cmd, name])
+    if val is not None:
+        return val.split()
+    graph = _get_package_graph() if tool == 'rospack' else _get_stack_graph()
+    return getattr(graph, roslib.pkgserver.GRAPH_COMMANDS[cmd])(name)
+
 def rospack_depends_on_1(pkg):
     """
     @param pkg: package name
     @type  pkg: str
     @return: A list of the names of the packages which depend directly on pkg
     @rtype: list
+    @raise roslib.exceptions.ROSLibException: if pkg cannot be found
     """
-    return rospackexec(['depends-on1', pkg]).split()
+    return _depends_query('rospack', 'depends-on1', pkg)
 
 def rospack_depends_on(pkg):
     """
@@ -84,8 +162,9 @@ def rospack_depends_on(pkg):
     @type  pkg: str
     @return: A list of the names of the packages which depend on pkg
     @rtype: list
+    @raise roslib.exceptions.ROSLibException: if pkg cannot be found
     """
-    return rospackexec(['depends-on', pkg]).split()
+    return _depends_query('rospack', 'depends-on', pkg)
 
 def rospack_depends_1(pkg):
     """
@@ -93,8 +172,9 @@ def rospack_depends_1(pkg):
     @type  pkg: str
     @return: A list of the names of the packages which pkg directly depends on
     @rtype: list    
+    @raise roslib.exceptions.ROSLibException: if pkg or its dependencies cannot be found
     """
-    return rospackexec(['deps1', pkg]).split()
+    return _depends_query('rospack', 'deps1', pkg)
 
 def rospack_depends(pkg):
     """
@@ -102,8 +182,9 @@ def rospack_depends(pkg):
     @type  pkg: str
     @return: A list of the names of the packages which pkg depends on
     @rtype: list    
+    @raise roslib.exceptions.ROSLibException: if pkg or its dependencies cannot be found
     """
-    return rospackexec(['deps', pkg]).split()
+    return _depends_query('rospack', 'deps', pkg)
 
 def rospack_plugins(pkg):
     """
@@ -112,7 +193,11 @@ def rospack_plugins(pkg):
     @return: A list of the names of the packages which provide a plugin for pkg
     @rtype: list    
     """
-    val = rospackexec(['plugins', '--attrib=plugin', pkg])
+    val = _serve('rospack', ['plugins', '--attrib=plugin', pkg])
+    if val is None:
+        plugins = roslib.exports.get_export_index().plugins(pkg, 'plugin', _get_package_graph().depends_on_1(pkg))
+        # split values as the output of rospack is split below
+        return [(p,) + tuple(v.split(' ')) for p, v in plugins]
     if val:
       return [tuple(x.split(' ')) for x in val.split('\n')]
     else:
@@ -120,10 +205,14 @@ def rospack_plugins(pkg):
 
 def rosstackexec(args):
     """
-    @return: result of executing rosstack command (via subprocess). string will be strip()ed.
+    @return: result of executing rosstack command (via roslib.pkgserver
+      if it is running, else via subprocess). string will be strip()ed.
     @rtype:  str
     @raise roslib.exceptions.ROSLibException: if rosstack command fails
     """
+    val = _serve('rosstack', args)
+    if val is not None:
+        return val
     rosstack_bin = 'rosstack'
     if python3:
         val = subprocess.Popen([rosstack_bin] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()[0]
@@ -140,8 +229,9 @@ def rosstack_depends_on(s):
     @type  s: str
     @return: A list of the names of the stacks which depend on s
     @rtype: list
+    @raise roslib.exceptions.ROSLibException: if s cannot be found
     """
-    return rosstackexec(['depends-on', s]).split()
+    return _depends_query('rosstack', 'depends-on', s)
 
 def rosstack_depends_on_1(s):
     """
@@ -149,8 +239,9 @@ def rosstack_depends_on_1(s):
     @type  s: str
     @return: A list of the names of the stacks which depend directly on s
     @rtype: list
+    @raise roslib.exceptions.ROSLibException: if s cannot be found
     """
-    return rosstackexec(['depends-on1', s]).split()
+    return _depends_query('rosstack', 'depends-on1', s)
 
 def rosstack_depends(s):
     """
@@ -158,8 +249,9 @@ def rosstack_depends(s):
     @type  s: str
     @return: A list of the names of the stacks which s depends on 
     @rtype: list
+    @raise roslib.exceptions.ROSLibException: if s or its dependencies cannot be found
     """
-    return rosstackexec(['depends', s]).split()
+    return _depends_query('rosstack', 'depends', s)
 
 def rosstack_depends_1(s):
     """
@@ -167,5 +259,6 @@ def rosstack_depends_1(s):
     @type  s: str
     @return: A list of the names of the stacks which s depends on directly
     @rtype: list
+    @raise roslib.exceptions.ROSLibException: if s or its dependencies cannot be found
     """
-    return rosstackexec(['depends1', s]).split()
+    return _depends_query('rosstack', 'depends1', s)
@@ -0,0 +1,220 @@
+#! /usr/bin/env python
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Session object that lets a tool run share package state between
+roslib calls. A L{Session} owns the package index of one environment,
+one rospkg.RosPack and RosStack (which cache parsed manifests), the
+manifests parsed by roslib and the dependency graphs. Helpers in
+roslib.packages, roslib.stacks, roslib.resources and roslib.launcher
+accept a session argument, so that a tool run that passes the same
+session to all of them crawls the package path at most once::
+
+  session = roslib.session.Session()
+  packages, not_found = roslib.stacks.expand_to_packages(names, session=session)
+  for p in packages:
+      roslib.stacks.stack_of(p, session=session)
+
+A session keeps the directory of a package once it has looked it up,
+and does not notice if the package is moved or removed afterwards;
+create a new session to pick up such changes.
+
+Warning: do not use this library.  It is unstable and most of the routines
+here have been superceded by other libraries (e.g. rospkg).  These
+routines will likely be *deleted* in future releases.
+"""
+
+import os
+import threading
+
+import rospkg
+
+import roslib.depgraph
+import roslib.exports
+import roslib.manifest
+import roslib.packages
+
+class _SessionRosPack(rospkg.RosPack):
+    """
+    RosPack that locates packages with a L{Session} instead of
+    crawling the package path itself.
+    """
+
+    def __init__(self, session):
+        super(_SessionRosPack, self).__init__(session.ros_paths)
+        self._session = session
+
+    def list(self):
+        return list(self._session.get_locations().keys())
+
+    def get_path(self, name):
+        d = self._session.get_pkg_dir(name)
+        if d is None:
+            raise rospkg.ResourceNotFound(name, ros_paths=self.get_ros_paths())
+        return d
+
+class Session(object):
+    """
+    Package state for one ROS_ROOT and ROS_PACKAGE_PATH. Everything is
+    loaded on first use. This class is thread-safe.
+    """
+
+    def __init__(self, env=None):
+        """
+        @param env: override os.environ dictionary. The environment
+          is read once, when the session is created.
+        @type  env: dict
+        """
+        # same keys into roslib.packages._pkg_dir_cache as get_pkg_dir()
+        if env is None:
+            self.ros_root, self.ros_package_path = roslib.packages._resolve_env(None, None)
+            env = os.environ
+        else:
+            self.ros_root, self.ros_package_path = roslib.packages._resolve_env(
+                env.get(roslib.packages.ROS_ROOT, None), env.get(roslib.packages.ROS_PACKAGE_PATH, None))
+        self.ros_paths = rospkg.get_ros_paths(env)
+        self._lock = threading.RLock()
+        self._locations = None
+        # {package: directory}, for packages that have been found
+        self._pkg_dirs = {}
+        self._rospack = None
+        self._rosstack = None
+        self._manifests = {}
+        self._package_graph = None
+        self._stack_graph = None
+        self._export_index = None
+
+    def get_locations(self):
+        """
+        @return: map of package name to package directory. Entries
+          have not been validated.
+        @rtype: {str: str}
+        """
+        with self._lock:
+            if self._locations is None:
+                self._locations = roslib.packages._pkg_dir_cache.get_locations(self.ros_root, self.ros_package_path)
+            return self._locations
+
+    def get_pkg_dir(self, package):
+        """
+        Locate a package. The directory is looked up with
+        L{roslib.packages.get_pkg_dir()} the first time, and is then
+        kept for the rest of the session.
+        @param package: package name
+        @type  package: str
+        @return: normalized package directory, or None if package
+          cannot be found
+        @rtype: str
+        """
+        with self._lock:
+            d = self._pkg_dirs.get(package, None)
+            if d is None:
+                d = roslib.packages._pkg_dir_cache.get(package, self.ros_root, self.ros_package_path)
+                if d is not None:
+                    d = self._pkg_dirs[package] = os.path.normpath(d)
+            return d
+
+    def get_rospack(self):
+        """
+        @return: RosPack instance for the session, which locates
+          packages with the session instead of crawling
+        @rtype: rospkg.RosPack
+        """
+        with self._lock:
+            if self._rospack is None:
+                self._rospack = _SessionRosPack(self)
+            return self._rospack
+    rospack = property(get_rospack)
+
+    def get_rosstack(self):
+        """
+        @rtype: rospkg.RosStack
+        """
+        with self._lock:
+            if self._rosstack is None:
+                self._rosstack = rospkg.RosStack(self.ros_paths)
+            return self._rosstack
+    rosstack = property(get_rosstack)
+
+    def get_manifest_by_dir(self, package_dir):
+        """
+        @param package_dir: package directory
+        @type  package_dir: str
+        @return: manifest of the package in package_dir
+        @rtype: L{roslib.manifest.Manifest}
+        """
+        with self._lock:
+            m = self._manifests.get(package_dir, None)
+            if m is None:
+                m = self._manifests[package_dir] = roslib.manifest.parse_file(os.path.join(package_dir, roslib.manifest.MANIFEST_FILE), lazy=True)
+            return m
+
+    def get_manifest(self, package):
+        """
+        @param package: package name
+        @type  package: str
+        @rtype: L{roslib.manifest.Manifest}
+        @raise InvalidROSPkgException: if package cannot be located
+        """
+        return self.get_manifest_by_dir(roslib.packages.get_pkg_dir(package, session=self))
+
+    def get_package_graph(self):
+        """
+        @rtype: L{roslib.depgraph.DependencyGraph}
+        """
+        with self._lock:
+            if self._package_graph is None:
+                self._package_graph = roslib.depgraph.DependencyGraph(self.get_locations(), roslib.depgraph.read_package_depends,
+                                                                      preload=roslib.depgraph.preload_package_manifests)
+            return self._package_graph
+
+    def get_stack_graph(self):
+        """
+        @rtype: L{roslib.depgraph.DependencyGraph}
+        """
+        with self._lock:
+            if self._stack_graph is None:
+                rosstack = self.get_rosstack()
+                locations = dict((s, rosstack.get_path(s)) for s in rosstack.list())
+                self._stack_graph = roslib.depgraph.DependencyGraph(locations, roslib.depgraph.read_stack_depends, kind='stack',
+                                                                    preload=roslib.depgraph.preload_stack_manifests)
+            return self._stack_graph
+
+    def get_export_index(self):
+        """
+        @rtype: L{roslib.exports.ExportIndex}
+        """
+        with self._lock:
+            if self._export_index is None:
+                self._export_index = roslib.exports.ExportIndex(self.get_locations())
+            return self._export_index
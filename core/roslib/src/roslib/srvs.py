@@ -46,6 +46,7 @@ try:
 except ImportError:
     from io import StringIO # Python 3.x
 
+import roslib.msgcache
 import roslib.msgs
 import roslib.names
 import roslib.packages
@@ -188,6 +189,8 @@ def load_from_string(text, package_context='', full_name='', short_name=''):
 def load_from_file(file_name, package_context=''):
     """
     Convert the .srv representation in the file to a SrvSpec instance.
+    Specs of unchanged files are loaded from the cache in ROS_HOME (see
+    L{roslib.msgcache}).
     @param file_name: name of file to load from
     @type  file_name: str
     @param package_context: context to use for type name, i.e. the package name,
@@ -213,10 +216,16 @@ def load_from_file(file_name, package_context=''):
     if not roslib.names.is_legal_resource_name(type_):
         raise SrvSpecException("%s: %s is not a legal service type name"%(file_name, type_))
     
+    return (type_, roslib.msgcache.load_file('srv', file_name, package_context, type_, base_type_, _load_file))
+
+def _load_file(file_name, package_context, full_name, short_name):
+    """
+    Read and parse a .srv file, see L{load_from_file()}.
+    @rtype: L{SrvSpec}
+    """
     f = open(file_name, 'r')
     try:
-        text = f.read()
-        return (type_, load_from_string(text, package_context, type_, base_type_))
+        return load_from_string(f.read(), package_context, full_name, short_name)
     finally:
         f.close()
 
@@ -46,6 +46,7 @@ import getopt
 
 STACK_FILE = 'stack.xml'
 
+import roslib.manifestcache
 import roslib.manifestlib
 # re-export symbols so that external code does not have to import manifestlib as well
 from roslib.manifestlib import ManifestException, StackDepend
@@ -99,13 +100,35 @@ def stack_file(stack, required=True):
         
 def parse_file(file):
     """
-    Parse stack.xml file
+    Parse stack.xml file. Parsed manifests are cached (see
+    L{roslib.manifestcache}), so the returned instance may be shared
+    and must not be modified.
     @param file: stack.xml file path
     @param file: str
     @return: StackManifest instance
     @rtype:  L{StackManifest}
     """
-    return roslib.manifestlib.parse_file(StackManifest(), file)
+    return roslib.manifestcache.parse_file(StackManifest, file)
+
+def parse_files(paths, workers=1, errors=None):
+    """
+    Parse many stack.xml files, optionally in parallel worker processes
+    if there are many that are not cached yet. Errors are collected
+    instead of raised.
+    @param paths: stack.xml file paths
+    @type  paths: [str]
+    @param workers: number of worker processes. 1 (the default)
+      parses in this process, None uses the number of CPUs. Only use
+      worker processes in a process that does not run threads.
+    @type  workers: int
+    @param errors: (optional) dictionary that is updated with the
+      exception raised for each file that cannot be parsed
+    @type  errors: {str: Exception}
+    @return: StackManifest instance for each path, in order, or None if the
+      file cannot be parsed
+    @rtype: [L{StackManifest}]
+    """
+    return roslib.manifestcache.parse_files(StackManifest, paths, workers, errors)
 
 def parse(string, filename='string'):
     """
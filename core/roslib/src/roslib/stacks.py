@@ -43,7 +43,9 @@ import os
 import sys
 import re
 
+import roslib.crawler
 import roslib.packages
+import roslib.session
 import roslib.stack_manifest
 
 import rospkg
@@ -57,27 +59,45 @@ ROS_STACK = 'ros'
 class ROSStackException(Exception): pass
 class InvalidROSStackException(ROSStackException): pass
 
-def stack_of(pkg, env=None):
+def stack_of(pkg, env=None, session=None):
     """
     @param env: override environment variables
     @type  env: {str: str}
+    @param session: session to locate pkg with. Overrides env.
+    @type  session: L{roslib.session.Session}
     @return: name of stack that pkg is in, or None if pkg is not part of a stack
     @rtype: str
     @raise roslib.packages.InvalidROSPkgException: if pkg cannot be located
     """
-    if env is None:
-        env = os.environ
-    pkg_dir = roslib.packages.get_pkg_dir(pkg, ros_root=env[ROS_ROOT], ros_package_path=env.get(ROS_PACKAGE_PATH, None))
-    d = pkg_dir
-    while d and os.path.dirname(d) != d:
-        stack_file = os.path.join(d, STACK_FILE)
-        if os.path.exists(stack_file):
-            #TODO: need to resolve issues regarding whether the
-            #stack.xml or the directory defines the stack name
-            return os.path.basename(d)
-        d = os.path.dirname(d)
+    return stacks_of([pkg], env=env, session=session)[0]
+
+def stacks_of(pkgs, env=None, session=None):
+    """
+    Bulk version of L{stack_of()}. Stacks are looked up in a table
+    that is built when the package path is crawled.
+    @param pkgs: package names
+    @type  pkgs: [str]
+    @param env: override environment variables
+    @type  env: {str: str}
+    @param session: session to locate pkgs with. Overrides env.
+    @type  session: L{roslib.session.Session}
+    @return: name of stack that each package is in, or None if the
+      package is not part of a stack
+    @rtype: [str]
+    @raise roslib.packages.InvalidROSPkgException: if a package cannot be located
+    """
+    if session is not None:
+        ros_root, ros_package_path = session.ros_root, session.ros_package_path
+    else:
+        if env is None:
+            env = os.environ
+        ros_root, ros_package_path = roslib.packages._resolve_env(env[ROS_ROOT], env.get(ROS_PACKAGE_PATH, None))
+    pkg_dirs = [roslib.packages.get_pkg_dir(pkg, ros_root=ros_root, ros_package_path=ros_package_path) for pkg in pkgs]
+    #TODO: need to resolve issues regarding whether the
+    #stack.xml or the directory defines the stack name
+    return roslib.packages._pkg_dir_cache.get_stacks(pkg_dirs, ros_root, ros_package_path)
         
-def get_stack_dir(stack, env=None):
+def get_stack_dir(stack, env=None, session=None):
     """
     Get the directory of a ROS stack. This will initialize an internal
     cache and return cached results if possible.
@@ -88,13 +108,14 @@ def get_stack_dir(stack, env=None):
     @type  env: {str: str}
     @param stack: name of ROS stack to locate on disk
     @type  stack: str
+    @param session: session to locate stack with. Overrides env.
+    @type  session: L{roslib.session.Session}
     @return: directory of stack.
     @rtype: str
     @raise InvalidROSStackException: if stack cannot be located.
     """
-    _init_rosstack(env=env)
     try:
-        return _rosstack.get_path(stack)
+        return _get_rosstack(env, session).get_path(stack)
     except rospkg.ResourceNotFound:
         # preserve old signature
         raise InvalidROSStackException(stack)
@@ -110,8 +131,19 @@ def _init_rosstack(env=None):
     if ros_paths != _ros_paths:
         _ros_paths = ros_paths
         _rosstack = rospkg.RosStack(ros_paths)
+
+def _get_rosstack(env=None, session=None):
+    """
+    @return: RosStack of session if specified, else the cached
+      RosStack for env
+    @rtype: rospkg.RosStack
+    """
+    if session is not None:
+        return session.rosstack
+    _init_rosstack(env=env)
+    return _rosstack
     
-def list_stacks(env=None):
+def list_stacks(env=None, session=None):
     """
     Get list of all ROS stacks. This uses an internal cache.
 
@@ -119,13 +151,32 @@ def list_stacks(env=None):
 
     @param env: override environment variables
     @type  env: {str: str}
+    @param session: session to list stacks of. Overrides env.
+    @type  session: L{roslib.session.Session}
     @return: complete list of stacks names in ROS environment
     @rtype: [str]
     """
-    _init_rosstack(env=env)
-    return _rosstack.list()
+    return _get_rosstack(env, session).list()
+
+def _list_stacks_visitor(d, dirs, files):
+    """
+    roslib.crawler.walk() visitor for list_stacks_by_path()
+    @return: stack name if d is a stack
+    @rtype: str
+    """
+    if STACK_FILE in files:
+        del dirs[:]
+        return os.path.basename(d)
+    elif rospkg.MANIFEST_FILE in files:
+        del dirs[:]
+        return None
+    elif 'rospack_nosubdirs' in files:
+        del dirs[:]
+        return None
+    # remove hidden dirs (esp. .svn/.git)
+    dirs[:] = [di for di in dirs if di[0] != '.']
 
-def list_stacks_by_path(path, stacks=None, cache=None):
+def list_stacks_by_path(path, stacks=None, cache=None, workers=None):
     """
     List ROS stacks within the specified path.
 
@@ -140,67 +191,59 @@ def list_stacks_by_path(path, stacks=None, cache=None):
     @type  stacks: [str]
     @param cache: (optional) stack path cache to update. Maps stack name to directory path.
     @type  cache: {str: str}
+    @param workers: (optional) number of threads used to crawl path
+    @type  workers: int
     @return: complete list of stack names in ROS environment. Same as stacks parameter.
     @rtype: [str]
     """
     if stacks is None:
         stacks = []
-    MANIFEST_FILE = rospkg.MANIFEST_FILE
-    basename = os.path.basename
-    for d, dirs, files in os.walk(path, topdown=True):
-        if STACK_FILE in files:
-            stack = basename(d)
-            if stack not in stacks:
-                stacks.append(stack)
-                if cache is not None:
-                    cache[stack] = d
-            del dirs[:]
-            continue #leaf
-        elif MANIFEST_FILE in files:
-            del dirs[:]
-            continue #leaf     
-        elif 'rospack_nosubdirs' in files:
-            del dirs[:]
-            continue  #leaf
-        # remove hidden dirs (esp. .svn/.git)
-        [dirs.remove(di) for di in dirs if di[0] == '.']
-        for sub_d in dirs:
-            # followlinks=True only available in Python 2.6, so we
-            # have to implement manually
-            sub_p = os.path.join(d, sub_d)
-            if os.path.islink(sub_p):
-                stacks.extend(list_stacks_by_path(sub_p, cache=cache))
+    found = set(stacks)
+    for d, stack in roslib.crawler.walk(path, _list_stacks_visitor, workers=workers):
+        if stack not in found:
+            found.add(stack)
+            stacks.append(stack)
+            if cache is not None:
+                cache[stack] = d
     return stacks
 
 # #2022
-def expand_to_packages(names, env=None):
+def expand_to_packages(names, env=None, session=None):
     """
     Expand names into a list of packages. Names can either be of packages or stacks.
 
     @param names: names of stacks or packages
     @type  names: [str]
+    @param env: override environment variables
+    @type  env: {str: str}
+    @param session: session to expand names with. Overrides env. Tools
+      that call expand_to_packages() repeatedly should pass a session.
+    @type  session: L{roslib.session.Session}
     @return: ([packages], [not_found]). expand_packages() returns two
     lists. The first is of packages names. The second is a list of
     names for which no matching stack or package was found. Lists may have duplicates.
     @rtype: ([str], [str])
     """
-    if env is None:
-        env = os.environ
-    ros_paths = rospkg.get_ros_paths(env)
-    rospack = rospkg.RosPack(ros_paths)
-    rosstack = rospkg.RosStack(ros_paths)
-    return rospkg.expand_to_packages(names, rospack, rosstack)
+    if session is None:
+        # still seeded from the package index of roslib.packages, so
+        # that rospkg does not crawl the package path on every call
+        session = roslib.session.Session(env)
+        rosstack = _get_rosstack(env)
+    else:
+        rosstack = session.rosstack
+    return rospkg.expand_to_packages(names, session.rospack, rosstack)
 
-def get_stack_version(stack, env=None):
+def get_stack_version(stack, env=None, session=None):
     """
     @param env: override environment variables
     @type  env: {str: str}
+    @param session: session to locate stack with. Overrides env.
+    @type  session: L{roslib.session.Session}
 
     @return: version number of stack, or None if stack is unversioned.
     @rtype: str
     """
-    _init_rosstack(env=env)
-    return _rosstack.get_stack_version(stack)
+    return _get_rosstack(env, session).get_stack_version(stack)
 
 def get_stack_version_by_dir(stack_dir):
     """
@@ -0,0 +1,133 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Benchmark for roslib.depgraph reverse-dependency queries against a
+synthetic DAG.
+
+Compares a walk of the reverse dependency edges for each query with
+the bitset ClosureIndex of DependencyGraph, for single-package
+queries and for the union over a set of changed packages, as asked
+by CI change detection.
+
+usage: bench_roslib_depgraph.py [num-nodes] [num-changed]
+"""
+
+from __future__ import print_function
+
+import random
+import sys
+import time
+
+import roslib.depgraph
+
+def make_graph(num_nodes, max_depends=8, seed=0):
+    """
+    Create a random DAG: each node depends on up to max_depends nodes
+    with lower numbers, biased towards nearby nodes so that there are
+    long dependency chains as well as widely used base packages.
+    @return: {name: [name]}
+    @rtype: dict
+    """
+    rand = random.Random(seed)
+    names = ['node_%05d'%i for i in range(num_nodes)]
+    depends = {}
+    for i, name in enumerate(names):
+        deps = set()
+        for _ in range(rand.randint(0, min(i, max_depends))):
+            if rand.random() < 0.5:
+                j = rand.randint(max(0, i - 50), i - 1)
+            else:
+                j = rand.randint(0, i - 1)
+            deps.add(names[j])
+        depends[name] = sorted(deps)
+    return depends
+
+def timed(fn):
+    start = time.time()
+    val = fn()
+    return val, time.time() - start
+
+def main(argv):
+    num_nodes = int(argv[1]) if len(argv) > 1 else 5000
+    num_changed = int(argv[2]) if len(argv) > 2 else 200
+    depends = make_graph(num_nodes)
+    locations = dict((name, name) for name in depends)
+    edges = sum(len(v) for v in depends.values())
+    print("graph: %d nodes, %d edges"%(num_nodes, edges))
+
+    graph = roslib.depgraph.DependencyGraph(locations, lambda d: (depends[d], False))
+    _, elapsed = timed(graph._load_reverse)
+    print("%-32s %10.3fms"%('load manifests', elapsed * 1e3))
+    reverse = graph._load_reverse()
+
+    def walk(name):
+        seen = set()
+        stack = [name]
+        while stack:
+            for d in reverse[stack.pop()]:
+                if d not in seen:
+                    seen.add(d)
+                    stack.append(d)
+        return seen
+
+    index, elapsed = timed(graph.closure_index)
+    print("%-32s %10.3fms"%('build closure index', elapsed * 1e3))
+
+    rand = random.Random(1)
+    names = sorted(depends)
+    changed = rand.sample(names, num_changed)
+
+    # single queries
+    _, walk_time = timed(lambda: [walk(n) for n in changed])
+    _, index_time = timed(lambda: [index.depends_on([n]) for n in changed])
+    print("%-32s %10.1fus/query"%('depends-on (reverse walk)', walk_time / num_changed * 1e6))
+    print("%-32s %10.1fus/query"%('depends-on (bitset)', index_time / num_changed * 1e6))
+
+    # union over the changed packages, and the number affected
+    def walk_union():
+        seen = set()
+        for n in changed:
+            seen.update(walk(n))
+        return len(seen - set(changed))
+    def index_union():
+        return index.count(index.depends_on(changed) & ~index.mask(changed))
+    walk_count, walk_time = timed(walk_union)
+    index_count, index_time = timed(index_union)
+    assert walk_count == index_count
+    print("%-32s %10.3fms (%d affected)"%('union of %d (reverse walk)'%num_changed, walk_time * 1e3, walk_count))
+    print("%-32s %10.3fms (%d affected)"%('union of %d (bitset)'%num_changed, index_time * 1e3, index_count))
+    print("speedup: %.0fx"%(walk_time / index_time))
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,158 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Benchmark for roslib.manifestlib.parse() against the minidom parser
+it replaced, over all manifest.xml and stack.xml files in a workspace.
+
+Files are read into memory first so that only parsing is timed. Each
+parser runs over the whole set repeat times and the best run is
+reported. Lazy manifests (roslib.manifestlib._LazyManifest) are timed
+reading only depends and exports, as most callers do, and the memory
+held by the parsed manifests of each kind is measured with tracemalloc.
+
+usage: bench_roslib_manifest.py [repeat] [path...]
+
+paths default to ROS_ROOT and ROS_PACKAGE_PATH.
+"""
+
+from __future__ import print_function
+
+import gc
+import os
+import sys
+import time
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None # Python 2
+
+import roslib.manifestlib
+
+def find_manifests(paths):
+    """
+    @return: (type, path) of each manifest under paths
+    @rtype: [(str, str)]
+    """
+    found = []
+    for path in paths:
+        for d, dirs, files in os.walk(path):
+            dirs[:] = [di for di in dirs if di[0] != '.']
+            if 'manifest.xml' in files:
+                found.append(('package', os.path.join(d, 'manifest.xml')))
+            if 'stack.xml' in files:
+                found.append(('stack', os.path.join(d, 'stack.xml')))
+    return found
+
+def parse_all(parse, manifests, factory=roslib.manifestlib._Manifest, keep=None):
+    errors = 0
+    for type_, text in manifests:
+        try:
+            m = parse(factory(type_), text)
+            # what most callers read
+            m.depends, m.exports
+            if keep is not None:
+                keep.append(m)
+        except roslib.manifestlib.ManifestException:
+            errors += 1
+    return errors
+
+def held_memory(factory, manifests):
+    """
+    @return: bytes allocated by the parsed manifests that are still
+      held after parsing
+    @rtype: int
+    """
+    # warm up, so that one-time allocations such as the table of
+    # interned strings are not counted
+    parse_all(roslib.manifestlib.parse, manifests, factory)
+    keep = []
+    tracemalloc.start()
+    try:
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        parse_all(roslib.manifestlib.parse, manifests, factory, keep)
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        val = fn()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return val, best
+
+def main(argv):
+    repeat = int(argv[1]) if len(argv) > 1 else 5
+    paths = argv[2:]
+    if not paths:
+        paths = [p for p in [os.environ.get('ROS_ROOT')] + os.environ.get('ROS_PACKAGE_PATH', '').split(os.pathsep) if p]
+    manifests = []
+    for type_, f in find_manifests(paths):
+        with open(f) as fh:
+            manifests.append((type_, fh.read()))
+    if not manifests:
+        print("no manifests found in %s"%paths)
+        return
+    size = sum(len(text) for _, text in manifests)
+    print("%d manifests, %d bytes"%(len(manifests), size))
+
+    for type_, text in manifests:
+        try:
+            dom_xml = roslib.manifestlib._parse_dom(roslib.manifestlib._Manifest(type_), text).xml()
+        except roslib.manifestlib.ManifestException:
+            continue
+        assert dom_xml == roslib.manifestlib.parse(roslib.manifestlib._Manifest(type_), text).xml()
+
+    dom_errors, dom_time = best_of(repeat, lambda: parse_all(roslib.manifestlib._parse_dom, manifests))
+    errors, parse_time = best_of(repeat, lambda: parse_all(roslib.manifestlib.parse, manifests))
+    assert errors == dom_errors
+    lazy = roslib.manifestlib._LazyManifest
+    errors, lazy_time = best_of(repeat, lambda: parse_all(roslib.manifestlib.parse, manifests, lazy))
+    assert errors == dom_errors
+    for name, elapsed in [('minidom', dom_time), ('expat, single pass', parse_time), ('expat, lazy', lazy_time)]:
+        print("%-24s %10.3fms %8.1fus/manifest"%(name, elapsed * 1e3, elapsed / len(manifests) * 1e6))
+    print("speedup: %.1fx, lazy %.1fx"%(dom_time / parse_time, dom_time / lazy_time))
+
+    if tracemalloc is not None:
+        for name, factory in [('held, eager', roslib.manifestlib._Manifest), ('held, lazy', lazy)]:
+            size = held_memory(factory, manifests)
+            print("%-24s %10dkB %8.0fB/manifest"%(name, size // 1024, float(size) / len(manifests)))
+
+if __name__ == '__main__':
+    main(sys.argv)
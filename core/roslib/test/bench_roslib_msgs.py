@@ -0,0 +1,119 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Benchmark for roslib.msgs.load_from_string() over all .msg files in a
+workspace, against loading every line with roslib.msgs._load_line(),
+the general line parser that the precompiled patterns bypass.
+
+Files are read into memory first so that only parsing is timed. Each
+loader runs over the whole set repeat times and the best run is
+reported.
+
+usage: bench_roslib_msgs.py [repeat] [path...]
+
+paths default to ROS_ROOT and ROS_PACKAGE_PATH.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import roslib.msgs
+
+def find_msgs(paths):
+    """
+    @return: (package, path) of each .msg file under paths
+    @rtype: [(str, str)]
+    """
+    found = []
+    for path in paths:
+        for d, dirs, files in os.walk(path):
+            dirs[:] = [di for di in dirs if di[0] != '.']
+            if os.path.basename(d) != 'msg':
+                continue
+            package = os.path.basename(os.path.dirname(d))
+            found.extend([(package, os.path.join(d, f)) for f in files if f.endswith(roslib.msgs.EXT)])
+    return found
+
+def load_by_line(text, package_context=''):
+    types, names, constants = [], [], []
+    for line in text.split('\n'):
+        roslib.msgs._load_line(line, package_context, types, names, constants)
+    return roslib.msgs.MsgSpec(types, names, constants, text, package=package_context)
+
+def load_all(load, msgs):
+    specs = []
+    for package, text in msgs:
+        try:
+            specs.append(load(text, package))
+        except roslib.msgs.MsgSpecException as e:
+            specs.append(str(e))
+    return specs
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        val = fn()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return val, best
+
+def main(argv):
+    repeat = int(argv[1]) if len(argv) > 1 else 5
+    paths = argv[2:]
+    if not paths:
+        paths = [p for p in [os.environ.get('ROS_ROOT')] + os.environ.get('ROS_PACKAGE_PATH', '').split(os.pathsep) if p]
+    msgs = []
+    for package, f in find_msgs(paths):
+        with open(f) as fh:
+            msgs.append((package, fh.read()))
+    if not msgs:
+        print("no .msg files found in %s"%paths)
+        return
+    lines = sum(text.count('\n') + 1 for _, text in msgs)
+    print("%d .msg files, %d lines"%(len(msgs), lines))
+
+    line_specs, line_time = best_of(repeat, lambda: load_all(load_by_line, msgs))
+    specs, load_time = best_of(repeat, lambda: load_all(roslib.msgs.load_from_string, msgs))
+    assert specs == line_specs
+    for name, elapsed in [('line by line', line_time), ('load_from_string', load_time)]:
+        print("%-24s %10.3fms %8.1fus/file"%(name, elapsed * 1e3, elapsed / len(msgs) * 1e6))
+    print("speedup: %.1fx"%(line_time / load_time))
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,166 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Benchmark for roslib.packages lookups against a synthetic workspace.
+
+Compares package lookups using 'rospack find' (one subprocess per
+lookup) with the in-process package index used by
+roslib.packages.get_pkg_dir(), cold crawls of the package path
+with warm (snapshot-based) crawls, and the startup cost of the text
+rospack_cache with the binary package cache for tools that only
+look up a couple of packages.
+
+usage: bench_roslib_packages.py [num-packages] [num-lookups]
+"""
+
+from __future__ import print_function
+
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import roslib.crawler
+import roslib.packages
+import roslib.pkgcache
+
+def make_workspace(root, num_packages, per_dir=50):
+    """
+    Create a synthetic rosbuild workspace with num_packages packages,
+    grouped into directories of per_dir packages.
+    @return: package names
+    @rtype: [str]
+    """
+    names = []
+    for i in range(num_packages):
+        name = 'bench_pkg_%05d'%i
+        d = os.path.join(root, 'group_%03d'%(i // per_dir), name)
+        os.makedirs(os.path.join(d, 'msg'))
+        with open(os.path.join(d, 'manifest.xml'), 'w') as f:
+            f.write('<package><description>%s</description><license>BSD</license></package>\n'%name)
+        names.append(name)
+    return names
+
+def age_workspace(root, seconds=3600):
+    """
+    Backdate mtimes in the workspace, as crawl snapshots do not trust
+    directories that were modified within the last few seconds.
+    """
+    t = time.time() - seconds
+    for d, dirs, files in os.walk(root):
+        os.utime(d, (t, t))
+
+def bench_crawl(root):
+    snapshots = {}
+    start = time.time()
+    locations = roslib.crawler.crawl_packages([root], snapshots=snapshots)
+    print("%-24s %6d packages %9.3fs"%('crawl (cold)', len(locations), time.time() - start))
+    snapshot_file = os.path.join(root, roslib.packages.CRAWL_SNAPSHOT_FILE)
+    roslib.crawler.save_snapshots(snapshot_file, snapshots)
+    # warm crawl includes loading the snapshot
+    start = time.time()
+    snapshots = roslib.crawler.load_snapshots(snapshot_file)
+    locations = roslib.crawler.crawl_packages([root], snapshots=snapshots)
+    print("%-24s %6d packages %9.3fs"%('crawl (warm)', len(locations), time.time() - start))
+
+def bench_cache_file(root, names, lookups=2, repeat=100):
+    locations = roslib.crawler.crawl_packages([root])
+    rospack_cache = os.path.join(root, 'rospack_cache')
+    with open(rospack_cache, 'w') as f:
+        f.write('#ROS_ROOT=\n#ROS_PACKAGE_PATH=%s\n'%root)
+        for d in locations.values():
+            f.write(d + '\n')
+    pkg_cache = os.path.join(root, roslib.packages.PKG_CACHE_FILE)
+    roslib.pkgcache.write_cache(pkg_cache, '', root, locations)
+
+    start = time.time()
+    for i in range(repeat):
+        cache = {}
+        roslib.packages._read_rospack_cache(cache, '', root)
+        [cache[n][0] for n in names[:lookups]]
+    print("%-24s %6d lookups %10.3fms/startup"%('rospack_cache (text)', lookups, (time.time() - start) / repeat * 1e3))
+    start = time.time()
+    for i in range(repeat):
+        cache = roslib.pkgcache.read_cache(pkg_cache, '', root)
+        [cache[n] for n in names[:lookups]]
+        cache.close()
+    print("%-24s %6d lookups %10.3fms/startup"%('pkg cache (binary)', lookups, (time.time() - start) / repeat * 1e3))
+
+def bench(label, fn, names):
+    start = time.time()
+    for name in names:
+        fn(name)
+    elapsed = time.time() - start
+    print("%-24s %6d lookups %10.3fs %10.1fus/lookup"%(label, len(names), elapsed, elapsed / len(names) * 1e6))
+    return elapsed
+
+def rospack_find(name, env=None):
+    out = subprocess.Popen(['rospack', 'find', name], stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env).communicate()[0]
+    return os.path.normpath(out.decode().strip())
+
+def main(argv):
+    num_packages = int(argv[1]) if len(argv) > 1 else 1800
+    num_lookups = int(argv[2]) if len(argv) > 2 else 1000
+    root = tempfile.mkdtemp(prefix='bench_roslib_packages')
+    # keep rospack_cache and the roslib cache files out of the user's
+    # ROS_HOME
+    os.environ['ROS_HOME'] = root
+    try:
+        names = make_workspace(root, num_packages)
+        age_workspace(root)
+        lookups = [random.choice(names) for _ in range(num_lookups)]
+        env = os.environ.copy()
+        env['ROS_PACKAGE_PATH'] = root
+
+        print("workspace: %d packages"%num_packages)
+        bench_crawl(root)
+        bench_cache_file(root, names)
+        try:
+            before = bench('rospack find', lambda n: rospack_find(n, env), lookups)
+        except OSError:
+            before = None
+            print("rospack find             (skipped: rospack is not installed)")
+        get_pkg_dir = roslib.packages.get_pkg_dir
+        # first lookup includes the crawl of the package path
+        bench('get_pkg_dir (cold)', lambda n: get_pkg_dir(n, ros_package_path=root), lookups[:1])
+        after = bench('get_pkg_dir (warm)', lambda n: get_pkg_dir(n, ros_package_path=root), lookups)
+        if before:
+            print("speedup: %.0fx"%(before / after))
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,178 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+class RoslibCrawlerTest(unittest.TestCase):
+
+  def test_list_packages_by_path(self):
+    from roslib.crawler import list_packages_by_path
+    d = os.path.join(get_test_path(), 'package_tests')
+    locations = list_packages_by_path(os.path.join(d, 'p1'), {})
+    self.assertEquals({'foo': os.path.join(d, 'p1', 'foo'), 'bar': os.path.join(d, 'p1', 'bar')}, locations)
+    # existing entries are not overwritten
+    locations = list_packages_by_path(os.path.join(d, 'p2'), locations)
+    self.assertEquals(os.path.join(d, 'p1', 'foo'), locations['foo'])
+
+  def test_crawl_packages(self):
+    from roslib.crawler import crawl_packages
+    d = os.path.join(get_test_path(), 'package_tests')
+    self.assertEquals({}, crawl_packages([]))
+    locations = crawl_packages([os.path.join(d, 'p2'), os.path.join(d, 'p1')])
+    self.assertEquals({'foo': os.path.join(d, 'p2', 'foo'), 'bar': os.path.join(d, 'p1', 'bar')}, locations)
+
+    # catkin packages are named by package.xml, stacks are not packages
+    locations = crawl_packages([get_roslib_path(), os.path.join(get_test_path(), 'stack_tests')])
+    self.assertEquals(get_roslib_path(), locations['roslib'])
+    self.assertEquals(set(['roslib', 'foo_pkg', 'foo_pkg_2']), set(locations.keys()))
+
+  def test_stack_table(self):
+    from roslib.crawler import crawl_packages, stack_table
+    d = os.path.join(get_test_path(), 'stack_tests')
+    stacks = {}
+    locations = crawl_packages([d], stacks=stacks)
+    self.assertTrue(stacks[os.path.join(d, 's1', 'foo')])
+    self.assertFalse(stacks[os.path.join(d, 's1')])
+    table = stack_table(locations.values(), stacks)
+    self.assertEquals({locations['foo_pkg']: 'foo', locations['foo_pkg_2']: 'foo'}, table)
+    # directories that were not crawled are checked on disk
+    self.assertEquals({os.path.join(d, 's2', 'foo'): 'foo'}, stack_table([os.path.join(d, 's2', 'foo')]))
+
+  def test_walk(self):
+    from roslib.crawler import walk
+    d = os.path.join(get_test_path(), 'stack_tests')
+    def visit(d, dirs, files):
+      dirs.sort()
+      if 'stack.xml' in files:
+        return os.path.basename(d)
+    expected = [(os.path.join(d, 's1', 'bar'), 'bar'),
+                (os.path.join(d, 's1', 'foo'), 'foo'),
+                (os.path.join(d, 's2', 'foo'), 'foo')]
+    # parallel walk returns results in os.walk() order
+    for workers in [1, 4]:
+      self.assertEquals(expected, walk(d, visit, workers=workers))
+    self.assertEquals([], walk(os.path.join(d, 'non_existent'), visit))
+
+    # errors in visit() are propagated
+    def bad_visit(d, dirs, files):
+      raise ValueError(d)
+    for workers in [1, 4]:
+      try:
+        walk(d, bad_visit, workers=workers)
+        self.fail("should have raised")
+      except ValueError: pass
+
+  def test_walk_symlink_loop(self):
+    from roslib.crawler import walk
+    if not hasattr(os, 'symlink'):
+      return
+    d = tempfile.mkdtemp()
+    try:
+      os.makedirs(os.path.join(d, 'a', 'pkg'))
+      open(os.path.join(d, 'a', 'pkg', 'manifest.xml'), 'w').close()
+      os.symlink(d, os.path.join(d, 'a', 'loop'))
+      os.symlink(os.path.join(d, 'a', 'pkg'), os.path.join(d, 'link'))
+      def visit(d, dirs, files):
+        dirs.sort()
+        if 'manifest.xml' in files:
+          return os.path.basename(d)
+      # symlinks are followed, but not when they loop back
+      expected = [(os.path.join(d, 'a', 'pkg'), 'pkg'), (os.path.join(d, 'link'), 'link')]
+      for workers in [1, 4]:
+        self.assertEquals(expected, walk(d, visit, workers=workers))
+    finally:
+      shutil.rmtree(d)
+
+  def test_walk_snapshot(self):
+    from roslib.crawler import walk, Snapshot, load_snapshots, save_snapshots
+    d = tempfile.mkdtemp()
+    tmp = tempfile.mkdtemp()
+    try:
+      for p in ['a/pkg1', 'b/pkg2', 'b/pkg3']:
+        os.makedirs(os.path.join(d, p))
+        open(os.path.join(d, p, 'manifest.xml'), 'w').close()
+      def age(paths, t):
+        # snapshots do not trust recent mtimes
+        for x in paths:
+          os.utime(x, (t, t))
+      now = time.time()
+      age([p for p, _, _ in os.walk(d)], now - 1000)
+      visited = []
+      def visit(d, dirs, files):
+        visited.append(d)
+        dirs.sort()
+        if 'manifest.xml' in files:
+          return os.path.basename(d)
+      snapshot = Snapshot()
+      expected = [(os.path.join(d, 'a', 'pkg1'), 'pkg1'), (os.path.join(d, 'b', 'pkg2'), 'pkg2'), (os.path.join(d, 'b', 'pkg3'), 'pkg3')]
+      self.assertEquals(expected, walk(d, visit, snapshot=snapshot))
+      self.assert_(snapshot.dirty)
+
+      # round-trip snapshot through file
+      filename = os.path.join(tmp, 'snapshot')
+      self.assertEquals({}, load_snapshots(filename))
+      self.assert_(save_snapshots(filename, {d: snapshot}))
+      self.failIf(save_snapshots(filename, {d: snapshot}))
+      snapshot = load_snapshots(filename)[d]
+
+      # unchanged tree is not re-visited
+      del visited[:]
+      for workers in [1, 4]:
+        self.assertEquals(expected, walk(d, visit, workers=workers, snapshot=snapshot))
+      self.assertEquals([], visited)
+      self.failIf(snapshot.dirty)
+
+      # only changed directories are re-visited
+      shutil.rmtree(os.path.join(d, 'b', 'pkg3'))
+      os.makedirs(os.path.join(d, 'b', 'pkg4'))
+      open(os.path.join(d, 'b', 'pkg4', 'manifest.xml'), 'w').close()
+      age([os.path.join(d, 'b'), os.path.join(d, 'b', 'pkg4')], now - 500)
+      del visited[:]
+      expected = expected[:2] + [(os.path.join(d, 'b', 'pkg4'), 'pkg4')]
+      self.assertEquals(expected, walk(d, visit, snapshot=snapshot))
+      self.assertEquals(set([os.path.join(d, 'b'), os.path.join(d, 'b', 'pkg4')]), set(visited))
+      self.assert_(snapshot.dirty)
+      self.failIf(os.path.join(d, 'b', 'pkg3') in snapshot.nodes)
+    finally:
+      shutil.rmtree(d)
+      shutil.rmtree(tmp)
+
+def get_roslib_path():
+    return os.path.realpath(os.path.abspath(os.path.join(get_test_path(), '..')))
+
+def get_test_path():
+    return os.path.abspath(os.path.dirname(__file__))
@@ -0,0 +1,202 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+class RoslibDepgraphTest(unittest.TestCase):
+
+  def setUp(self):
+    import roslib.manifestcache
+    # keep the crawl snapshot and cache files out of the user's ROS_HOME
+    self.ros_home = os.environ.get('ROS_HOME', None)
+    self.tmp_ros_home = os.environ['ROS_HOME'] = tempfile.mkdtemp()
+    roslib.manifestcache._manifest_cache.clear()
+
+  def tearDown(self):
+    import roslib.manifestcache
+    roslib.manifestcache._manifest_cache.clear()
+    shutil.rmtree(self.tmp_ros_home)
+    if self.ros_home is None:
+      del os.environ['ROS_HOME']
+    else:
+      os.environ['ROS_HOME'] = self.ros_home
+
+  def make_graph(self, depends, ignore_missing=False):
+    from roslib.depgraph import DependencyGraph
+    locations = dict((name, name) for name in depends)
+    return DependencyGraph(locations, lambda d: (depends[d], ignore_missing))
+
+  def test_depends(self):
+    from roslib.exceptions import ROSLibException
+    graph = self.make_graph({
+        'a': ['b', 'c', 'b'],
+        'b': ['d', 'e'],
+        'c': ['e', 'f'],
+        'd': [],
+        'e': ['d'],
+        'f': [],
+        'g': ['a'],
+        })
+    self.assertEquals(['b', 'c'], graph.depends_1('a'))
+    self.assertEquals([], graph.depends_1('d'))
+    # post-order, as rospack
+    self.assertEquals(['d', 'e', 'b', 'f', 'c'], graph.depends('a'))
+    self.assertEquals(['d', 'e', 'b', 'f', 'c', 'a'], graph.depends('g'))
+    self.assertEquals(['d', 'e'], graph.depends('b'))
+    # results are copies
+    graph.depends('a').append('x')
+    self.assertEquals(['d', 'e', 'b', 'f', 'c'], graph.depends('a'))
+
+    self.assertEquals(['b', 'e'], graph.depends_on_1('d'))
+    self.assertEquals(['a', 'b', 'c', 'e', 'g'], graph.depends_on('d'))
+    self.assertEquals([], graph.depends_on('g'))
+    for fn in [graph.depends, graph.depends_1, graph.depends_on, graph.depends_on_1]:
+      try:
+        fn('fake')
+        self.fail("should have raised")
+      except ROSLibException: pass
+
+  def test_closure_index(self):
+    from roslib.exceptions import ROSLibException
+    graph = self.make_graph({
+        'a': ['b', 'c'],
+        'b': ['d', 'e'],
+        'c': ['e', 'f'],
+        'd': [],
+        'e': ['d'],
+        'f': [],
+        'g': ['a'],
+        'h': ['missing'],
+        'i': ['h'],
+        })
+    index = graph.closure_index()
+    self.assert_(index is graph.closure_index())
+    self.assertEquals(9, len(index))
+    self.assertEquals(['a', 'd'], index.names(index.mask(['d', 'a'])))
+    self.assertEquals(['b', 'c', 'd', 'e', 'f'], index.names(index.depends(['a'])))
+    self.assertEquals(['d', 'e', 'f'], index.names(index.depends(['c', 'e'])))
+    self.assertEquals([], index.names(index.depends(['h'])))
+    self.assertEquals(['a', 'b', 'c', 'e', 'g'], index.names(index.depends_on(['d'])))
+    self.assertEquals(['a', 'c', 'g'], index.names(index.depends_on(['f'])))
+    # set operations
+    changed = ['e', 'f']
+    affected = index.depends_on(changed) & ~index.mask(changed)
+    self.assertEquals(['a', 'b', 'c', 'g'], index.names(affected))
+    self.assertEquals(4, index.count(affected))
+    self.assertEquals(['a', 'c', 'g'], index.names(index.depends_on(['e']) & index.depends_on(['f'])))
+    self.assertEquals(0, index.count(0))
+    # agrees with the list-based queries
+    for name in 'abcdefg':
+      self.assertEquals(sorted(graph.depends(name)), index.names(index.depends([name])))
+      self.assertEquals(graph.depends_on(name), index.names(index.depends_on([name])))
+    try:
+      index.depends_on(['fake'])
+      self.fail("should have raised")
+    except ROSLibException: pass
+
+  def test_depends_errors(self):
+    from roslib.exceptions import ROSLibException
+    graph = self.make_graph({
+        'a': ['b'],
+        'b': ['missing'],
+        'c': ['d'],
+        'd': ['c'],
+        'e': ['a'],
+        'f': [],
+        })
+    try:
+      graph.depends('a')
+      self.fail("should have raised")
+    except ROSLibException: pass
+    try:
+      graph.depends('c')
+      self.fail("should have raised")
+    except ROSLibException: pass
+    # packages with errors are left out of reverse queries
+    self.assertEquals([], graph.depends_on('b'))
+    self.assertEquals([], graph.depends_on('d'))
+    self.assertEquals([], graph.depends_on('f'))
+    self.assertEquals(['b'], graph.depends_1('a'))
+
+    graph = self.make_graph({'a': ['b', 'missing'], 'b': []}, ignore_missing=True)
+    self.assertEquals(['b'], graph.depends('a'))
+
+  def test_read_package_depends(self):
+    from roslib.depgraph import read_package_depends, read_stack_depends
+    d = tempfile.mkdtemp()
+    try:
+      with open(os.path.join(d, 'package.xml'), 'w') as f:
+        f.write("""<package format="2"><name>foo</name>
+<build_depend>build_only</build_depend>
+<depend>a</depend>
+<exec_depend>b</exec_depend>
+<build_export_depend>c</build_export_depend>
+</package>""")
+      self.assertEquals((['c', 'b', 'a'], True), read_package_depends(d))
+      with open(os.path.join(d, 'package.xml'), 'w') as f:
+        f.write("""<package><name>foo</name>
+<build_depend>build_only</build_depend>
+<run_depend>a</run_depend>
+</package>""")
+      self.assertEquals((['a'], True), read_package_depends(d))
+    finally:
+      shutil.rmtree(d)
+
+    self.assertEquals(([], False), read_package_depends(os.path.join(get_test_path(), 'package_tests', 'p1', 'foo')))
+    self.assertEquals(([], False), read_stack_depends(os.path.join(get_test_path(), 'stack_tests', 's1', 'foo')))
+
+  def test_rospack_depends(self):
+    import roslib.rospack
+    d = tempfile.mkdtemp()
+    env = dict(os.environ)
+    try:
+      for pkg, deps in [('a', ['b', 'c']), ('b', ['c']), ('c', [])]:
+        os.makedirs(os.path.join(d, pkg))
+        with open(os.path.join(d, pkg, 'manifest.xml'), 'w') as f:
+          f.write('<package>%s</package>'%''.join(['<depend package="%s"/>'%x for x in deps]))
+      os.environ['ROS_PACKAGE_PATH'] = d
+      self.assertEquals(['b', 'c'], roslib.rospack.rospack_depends_1('a'))
+      self.assertEquals(['c', 'b'], roslib.rospack.rospack_depends('a'))
+      self.assertEquals(['a', 'b'], roslib.rospack.rospack_depends_on('c'))
+      self.assertEquals(['a'], roslib.rospack.rospack_depends_on_1('b'))
+    finally:
+      os.environ.clear()
+      os.environ.update(env)
+      shutil.rmtree(d)
+
+def get_test_path():
+    return os.path.abspath(os.path.dirname(__file__))
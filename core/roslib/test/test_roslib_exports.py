@@ -0,0 +1,117 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+class RoslibExportsTest(unittest.TestCase):
+
+  def setUp(self):
+    import roslib.manifestcache
+    # keep the crawl snapshot and cache files out of the user's ROS_HOME
+    self.ros_home = os.environ.get('ROS_HOME', None)
+    self.tmp_ros_home = os.environ['ROS_HOME'] = tempfile.mkdtemp()
+    roslib.manifestcache._manifest_cache.clear()
+    self.d = tempfile.mkdtemp()
+    for name, text in [
+        ('a', '<depend package="b"/><export><b plugin="${prefix}/a.xml"/><python path="${prefix}/src"/></export>'),
+        ('b', '<export><python path="src"/><cpp cflags="-I"/><b plugin="b.xml"/></export>'),
+        ('c', '<export><b plugin="c.xml"/></export>'),
+        ('d', '<depend package="b"/><export><b plugin="d1.xml d2.xml"/></export>'),
+        ('bad', '<export>'),
+        ]:
+      os.makedirs(os.path.join(self.d, name))
+      with open(os.path.join(self.d, name, 'manifest.xml'), 'w') as f:
+        f.write('<package><author>a</author><license>BSD</license>%s</package>'%text)
+    self.locations = dict((name, os.path.join(self.d, name)) for name in ['a', 'b', 'c', 'd', 'bad'])
+
+  def tearDown(self):
+    import roslib.manifestcache
+    roslib.manifestcache._manifest_cache.clear()
+    shutil.rmtree(self.tmp_ros_home)
+    if self.ros_home is None:
+      del os.environ['ROS_HOME']
+    else:
+      os.environ['ROS_HOME'] = self.ros_home
+    shutil.rmtree(self.d)
+
+  def test_read_package_exports(self):
+    from roslib.exports import read_package_exports
+    from roslib.manifestlib import ManifestException
+    self.assertEquals([('python', {'path': 'src'}), ('cpp', {'cflags': '-I'}), ('b', {'plugin': 'b.xml'})], read_package_exports(self.locations['b']))
+    # shared with roslib.manifest
+    import roslib.manifest
+    m = roslib.manifest.parse_file(os.path.join(self.locations['b'], 'manifest.xml'), lazy=True)
+    self.assertEquals([(e.tag, dict(e.attrs)) for e in m.exports], read_package_exports(self.locations['b']))
+    self.assertRaises(ManifestException, read_package_exports, self.locations['bad'])
+    with open(os.path.join(self.d, 'b', 'package.xml'), 'w') as f:
+      f.write('<package format="2"><name>b</name><depend>roscpp</depend><export><python path="catkin"/></export></package>')
+    self.assertEquals([('python', {'path': 'catkin'})], read_package_exports(self.locations['b']))
+    with open(os.path.join(self.d, 'b', 'package.xml'), 'w') as f:
+      f.write('<package format="2" xmlns:x="http://x"><name>b</name><export><x:y/><python path="ns"/></export></package>')
+    self.assertEquals([('x:y', {}), ('python', {'path': 'ns'})], read_package_exports(self.locations['b']))
+    self.assertEquals([], read_package_exports(self.d))
+
+  def test_export_index(self):
+    from roslib.exports import ExportIndex
+    index = ExportIndex(self.locations)
+    a = self.locations['a']
+    self.assertEquals([('a', os.path.join(a, 'src')), ('b', 'src')], index.get('python', 'path'))
+    self.assertEquals([('a', '${prefix}/src'), ('b', 'src')], index.get('python', 'path', substitute=False))
+    self.assertEquals([('a', os.path.join(a, 'a.xml')), ('b', 'b.xml'), ('c', 'c.xml'), ('d', 'd1.xml d2.xml')], index.get('b', 'plugin'))
+    self.assertEquals([], index.get('python', 'plugin'))
+    # only the package itself and its direct dependents provide plugins
+    self.assertEquals([('a', os.path.join(a, 'a.xml')), ('b', 'b.xml')], index.plugins('b', 'plugin', ['a']))
+
+  def test_get_exports(self):
+    import roslib.exports
+    self.assertEquals([('a', os.path.join(self.locations['a'], 'src')), ('b', 'src')],
+                      roslib.exports.get_exports('python', 'path', ros_package_path=self.d))
+    index = roslib.exports.get_export_index(ros_package_path=self.d)
+    self.assert_(index is roslib.exports.get_export_index(ros_package_path=self.d))
+
+  def test_rospack_plugins(self):
+    import roslib.rospack
+    env = dict(os.environ)
+    try:
+      os.environ['ROS_PACKAGE_PATH'] = self.d
+      # multi-word values are split as in the output of rospack
+      self.assertEquals([('a', os.path.join(self.locations['a'], 'a.xml')), ('b', 'b.xml'), ('d', 'd1.xml', 'd2.xml')],
+                        roslib.rospack.rospack_plugins('b'))
+      self.assertEquals([], roslib.rospack.rospack_plugins('a'))
+    finally:
+      os.environ.clear()
+      os.environ.update(env)
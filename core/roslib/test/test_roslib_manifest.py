@@ -31,7 +31,9 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 
 import roslib
@@ -40,7 +42,23 @@ def get_test_path():
     return os.path.abspath(os.path.dirname(__file__))
 
 class RoslibManifestTest(unittest.TestCase):
-  
+
+  def setUp(self):
+    import roslib.manifestcache
+    # keep the manifest cache file out of the user's ROS_HOME
+    self.ros_home = os.environ.get('ROS_HOME', None)
+    self.tmp_ros_home = os.environ['ROS_HOME'] = tempfile.mkdtemp()
+    roslib.manifestcache._manifest_cache.clear()
+
+  def tearDown(self):
+    import roslib.manifestcache
+    roslib.manifestcache._manifest_cache.clear()
+    shutil.rmtree(self.tmp_ros_home)
+    if self.ros_home is None:
+      del os.environ['ROS_HOME']
+    else:
+      os.environ['ROS_HOME'] = self.ros_home
+
   def test_ManifestException(self):
     from roslib.manifest import ManifestException
     self.assert_(isinstance(ManifestException(), Exception))
@@ -110,11 +128,55 @@ class RoslibManifestTest(unittest.TestCase):
     rdpkgs = [d.name for d in m.rosdeps]
     self.assertEquals(set(['python', 'bar', 'baz']), set(rdpkgs))
     
+  def test_get_export(self):
+    from roslib.manifest import parse, Manifest, Export
+    m = Manifest()
+    self.assertEquals([], m.get_export('python', 'path'))
+    m.exports = [Export('python', {'path': 'a'}, ''), Export('cpp', {'cflags': '-I'}, ''), Export('python', {'path': 'b', 'x': 'y'}, '')]
+    self.assertEquals(['a', 'b'], m.get_export('python', 'path'))
+    self.assertEquals(['y'], m.get_export('python', 'x'))
+    self.assertEquals([], m.get_export('cpp', 'path'))
+    # follows changes to the exports list and its elements
+    m.exports.append(Export('python', {'path': 'c'}, ''))
+    self.assertEquals(['a', 'b', 'c'], m.get_export('python', 'path'))
+    m.exports[0] = Export('python', {'path': 'd'}, '')
+    m.exports[1].attrs['path'] = 'e'
+    m.exports[1].tag = 'python'
+    self.assertEquals(['d', 'e', 'b', 'c'], m.get_export('python', 'path'))
+    m.exports = []
+    self.assertEquals([], m.get_export('python', 'path'))
+
   def test_parse_example1_file(self):
     from roslib.manifest import parse_file, Manifest
     p = os.path.join(get_test_path(), 'manifest_tests', 'example1.xml')
     self._subtest_parse_example1(parse_file(p))
 
+  def test_LazyManifest(self):
+    import roslib.manifestlib
+    from roslib.manifest import parse_file, LazyManifest, Manifest
+    p = os.path.join(get_test_path(), 'manifest_tests', 'example1.xml')
+    m = roslib.manifestlib.parse_file(LazyManifest(), p)
+    self.assert_(isinstance(m, Manifest))
+    self._subtest_parse_example1(m)
+    self.assertEquals(parse_file(p).xml(), m.xml())
+
+    text = '<package><description>a &amp; <b>b</b></description><foo x="1">y</foo></package>'
+    m = roslib.manifestlib.parse(LazyManifest(), text)
+    self.assertEquals('a &amp; <b>b</b>', m.description)
+    self.assertEquals(['<foo x="1">y</foo>'], [t.toxml() for t in m.unknown_tags])
+    # assignment replaces values that have not been decoded
+    m = roslib.manifestlib.parse(LazyManifest(), text)
+    m.description = 'd'
+    m.unknown_tags = []
+    self.assertEquals('d', m.description)
+    self.assertEquals([], m.unknown_tags)
+    self.assertEquals('', LazyManifest().description)
+    # validation errors are raised when parsing
+    try:
+      roslib.manifestlib.parse(LazyManifest(), '<package><description/><description/></package>')
+      self.fail("should have raised")
+    except roslib.manifestlib.ManifestException: pass
+
   def test_parse_example1_string(self):
     from roslib.manifest import parse, Manifest
     self._subtest_parse_example1(parse(EXAMPLE1))
@@ -0,0 +1,265 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+MANIFEST = """<package>
+  <description brief="b">d <b>x</b></description>
+  <author>a</author>
+  <license url="u">BSD</license>
+  <depend package="p1"/>
+  <depend package="p2"/>
+  <rosdep name="r"/>
+  <platform os="ubuntu" version="10.04"/>
+  <export><python path="${prefix}/src"/><cpp cflags="-I"/></export>
+  <versioncontrol type="svn" url="v"/>
+</package>"""
+
+class RoslibManifestcacheTest(unittest.TestCase):
+
+  def setUp(self):
+    import roslib.manifestcache
+    self.d = tempfile.mkdtemp()
+    self.file = os.path.join(self.d, 'p', 'manifest.xml')
+    os.makedirs(os.path.dirname(self.file))
+    self.write(self.file, MANIFEST)
+    self.stack_file = os.path.join(self.d, 'stack.xml')
+    self.write(self.stack_file, '<stack><author>a</author><depend stack="s"/></stack>')
+    self.cache_file = os.path.join(self.d, 'home', 'cache')
+    # keep the process-wide cache file out of the user's ROS_HOME
+    self.ros_home = os.environ.get('ROS_HOME', None)
+    os.environ['ROS_HOME'] = os.path.join(self.d, 'ros_home')
+    roslib.manifestcache._manifest_cache.clear()
+
+  def tearDown(self):
+    import roslib.manifestcache
+    roslib.manifestcache._manifest_cache.clear()
+    if self.ros_home is None:
+      del os.environ['ROS_HOME']
+    else:
+      os.environ['ROS_HOME'] = self.ros_home
+    shutil.rmtree(self.d)
+
+  def write(self, path, text, racy=False):
+    with open(path, 'w') as f:
+      f.write(text)
+    if not racy:
+      # files modified within RACY_INTERVAL are not cached
+      self.mtime = getattr(self, 'mtime', time.time() - 100) + 1
+      os.utime(path, (self.mtime, self.mtime))
+
+  def assert_same_manifest(self, m1, m2):
+    self.assertEquals(type(m1), type(m2))
+    self.assertEquals(m1.xml(), m2.xml())
+    self.assertEquals([(e.tag, e.attrs, e.str) for e in m1.exports], [(e.tag, e.attrs, e.str) for e in m2.exports])
+
+  def test_parse_file(self):
+    import roslib.manifest
+    import roslib.manifestlib
+    import roslib.stack_manifest
+    from roslib.manifestcache import ManifestCache
+    cache = ManifestCache(self.cache_file)
+    m = cache.parse_file(roslib.manifest.Manifest, self.file)
+    self.assert_same_manifest(roslib.manifestlib.parse(roslib.manifest.Manifest(), MANIFEST), m)
+    # in-process layer returns the same instance
+    self.assert_(m is cache.parse_file(roslib.manifest.Manifest, self.file))
+    # a parsed manifest also serves lazy loads
+    self.assert_(m is cache.parse_file(roslib.manifest.LazyManifest, self.file))
+    s = cache.parse_file(roslib.stack_manifest.StackManifest, self.stack_file)
+    self.assertEquals(['s'], [d.stack for d in s.depends])
+
+    # changed file is parsed again
+    self.write(self.file, MANIFEST.replace('p2', 'p33'))
+    m2 = cache.parse_file(roslib.manifest.Manifest, self.file)
+    self.assertEquals(['p1', 'p33'], [d.package for d in m2.depends])
+
+    # errors are not cached
+    self.write(self.file, '<package>')
+    for _ in range(2):
+      try:
+        cache.parse_file(roslib.manifest.Manifest, self.file)
+        self.fail("should have raised")
+      except roslib.manifestlib.ManifestException: pass
+    try:
+      cache.parse_file(roslib.manifest.Manifest, os.path.join(self.d, 'fake.xml'))
+      self.fail("should have raised")
+    except ValueError: pass
+
+  def test_save(self):
+    import roslib.manifest
+    import roslib.manifestlib
+    import roslib.stack_manifest
+    from roslib.manifestcache import ManifestCache
+    cache = ManifestCache(self.cache_file)
+    self.failIf(cache.save())
+    m = cache.parse_file(roslib.manifest.Manifest, self.file)
+    s = cache.parse_file(roslib.stack_manifest.StackManifest, self.stack_file)
+    self.assert_(cache.save())
+    self.assert_(os.path.isfile(self.cache_file))
+    self.failIf(cache.save())
+
+    # warm load does not parse XML
+    parse = roslib.manifestlib.parse
+    def fail(*args):
+      raise AssertionError("parse() called")
+    roslib.manifestlib.parse = fail
+    try:
+      cache = ManifestCache(self.cache_file)
+      self.assert_same_manifest(m, cache.parse_file(roslib.manifest.Manifest, self.file))
+      self.assert_same_manifest(s, cache.parse_file(roslib.stack_manifest.StackManifest, self.stack_file))
+    finally:
+      roslib.manifestlib.parse = parse
+
+    # stale records are not used
+    self.write(self.file, MANIFEST.replace('BSD', 'LGPL'))
+    cache = ManifestCache(self.cache_file)
+    self.assertEquals('LGPL', cache.parse_file(roslib.manifest.Manifest, self.file).license)
+
+    # manifests with unknown tags are only cached in memory
+    self.write(self.file, '<package><foo/></package>')
+    cache = ManifestCache(self.cache_file)
+    m = cache.parse_file(roslib.manifest.Manifest, self.file)
+    self.assertEquals(['foo'], [t.tagName for t in m.unknown_tags])
+    self.assert_(m is cache.parse_file(roslib.manifest.Manifest, self.file))
+    self.failIf(cache.save())
+
+  def test_racy(self):
+    import roslib.manifest
+    from roslib.manifestcache import ManifestCache
+    # an edit in the same second that keeps the size must be seen
+    self.write(self.file, MANIFEST, racy=True)
+    cache = ManifestCache(self.cache_file)
+    m = cache.parse_file(roslib.manifest.Manifest, self.file)
+    self.failIf(m is cache.parse_file(roslib.manifest.Manifest, self.file))
+    st = os.stat(self.file)
+    self.write(self.file, MANIFEST.replace('p2', 'p3'), racy=True)
+    os.utime(self.file, (st.st_atime, st.st_mtime))
+    self.assertEquals(['p1', 'p3'], [d.package for d in cache.parse_file(roslib.manifest.Manifest, self.file).depends])
+    self.failIf(cache.save())
+    self.failIf(os.path.exists(self.cache_file))
+
+  def test_parse_files(self):
+    import roslib.depgraph
+    import roslib.manifest
+    import roslib.manifestcache
+    import roslib.manifestlib
+    from roslib.manifestcache import ManifestCache
+    files = []
+    for i in range(6):
+      f = os.path.join(self.d, 'p%d.xml'%i)
+      self.write(f, MANIFEST.replace('p1', 'dep%d'%i))
+      files.append(f)
+    bad = os.path.join(self.d, 'bad.xml')
+    self.write(bad, '<package>')
+    files[3:3] = [bad, os.path.join(self.d, 'fake.xml')]
+
+    # record the batches parsed by worker processes
+    pooled = []
+    executor = roslib.manifestcache.ProcessPoolExecutor
+    class Executor(executor):
+      def map(self, *args, **kwargs):
+        results = list(executor.map(self, *args, **kwargs))
+        pooled.append(len(results))
+        return results
+    threshold = roslib.manifestcache.PARALLEL_THRESHOLD
+    roslib.manifestcache.PARALLEL_THRESHOLD = 2
+    roslib.manifestcache.ProcessPoolExecutor = Executor
+    try:
+      for workers in [1, 2]:
+        del pooled[:]
+        cache = ManifestCache(self.cache_file)
+        errors = {}
+        results = cache.parse_files(roslib.manifest.Manifest, files, workers=workers, errors=errors)
+        self.assertEquals(len(files), len(results))
+        self.assertEquals([None, None], results[3:5])
+        self.assertEquals(['dep0', 'dep1', 'dep2', 'dep3', 'dep4', 'dep5'],
+                          [m.depends[0].package for m in results if m is not None])
+        self.assert_(all(type(m) is roslib.manifest.Manifest for m in results if m is not None))
+        self.assertEquals(set(files[3:5]), set(errors.keys()))
+        self.assert_(isinstance(errors[bad], roslib.manifestlib.ManifestException))
+        self.assert_(isinstance(errors[files[4]], ValueError))
+        # results are cached
+        self.assert_(results[0] is cache.parse_file(roslib.manifest.Manifest, files[0]))
+        self.assertEquals(results, cache.parse_files(roslib.manifest.Manifest, files, workers=workers))
+        # only uncached files go to the pool: files that cannot be
+        # loaded are parsed again
+        self.assertEquals([] if workers == 1 else [len(files), 2], pooled)
+      # preloading opts in to the pool
+      dirs = [os.path.join(self.d, 'pkg%d'%i) for i in range(3)]
+      for i, d in enumerate(dirs):
+        os.makedirs(d)
+        self.write(os.path.join(d, 'manifest.xml'), MANIFEST.replace('p1', 'pkg%d'%i))
+      del pooled[:]
+      roslib.depgraph.preload_package_manifests(dirs, workers=2)
+      self.assertEquals([3], pooled)
+      del pooled[:]
+      self.assertEquals(['pkg0', 'pkg1', 'pkg2'], [m.depends[0].package for m in roslib.manifest.parse_files([os.path.join(d, 'manifest.xml') for d in dirs])])
+      self.assertEquals([], pooled)
+    finally:
+      roslib.manifestcache.PARALLEL_THRESHOLD = threshold
+      roslib.manifestcache.ProcessPoolExecutor = executor
+
+    self.assertEquals(['p1', 'p2'], [d.package for d in roslib.manifest.parse_files([self.file])[0].depends])
+
+  def test_parse_files_serial(self):
+    import roslib.depgraph
+    import roslib.manifest
+    import roslib.manifestcache
+    from roslib.manifestcache import ManifestCache
+    dirs = []
+    for i in range(4):
+      d = os.path.join(self.d, 'pkg%d'%i)
+      os.makedirs(d)
+      self.write(os.path.join(d, 'manifest.xml'), MANIFEST.replace('p1', 'dep%d'%i))
+      dirs.append(d)
+    files = [os.path.join(d, 'manifest.xml') for d in dirs]
+    # worker processes are only used on request
+    def fail(*args):
+      raise AssertionError("process pool created")
+    threshold = roslib.manifestcache.PARALLEL_THRESHOLD
+    executor = roslib.manifestcache.ProcessPoolExecutor
+    roslib.manifestcache.PARALLEL_THRESHOLD = 2
+    roslib.manifestcache.ProcessPoolExecutor = fail
+    try:
+      results = ManifestCache(self.cache_file).parse_files(roslib.manifest.Manifest, files)
+      self.assertEquals(['dep0', 'dep1', 'dep2', 'dep3'], [m.depends[0].package for m in results])
+      roslib.depgraph.preload_package_manifests(dirs)
+      self.assertEquals(['dep0', 'dep1', 'dep2', 'dep3'], [m.depends[0].package for m in roslib.manifest.parse_files(files)])
+    finally:
+      roslib.manifestcache.PARALLEL_THRESHOLD = threshold
+      roslib.manifestcache.ProcessPoolExecutor = executor
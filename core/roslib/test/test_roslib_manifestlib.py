@@ -125,7 +125,39 @@ class RoslibManifestlibTest(unittest.TestCase):
     
     rd = ROSDep('python')
     self.assertEquals('<rosdep name="python" />',rd.xml())
-    
+
+  def test_Export(self):
+    from roslib.manifestlib import Export, parse, _Manifest
+    e = Export('cpp', {'cflags': '-Ifoo', 'lflags': '-lfoo'}, '')
+    self.assertEquals({'cflags': '-Ifoo', 'lflags': '-lfoo'}, e.attrs)
+    self.assertEquals('-Ifoo', e.attrs['cflags'])
+    self.assertEquals('-Ifoo', e.get('cflags'))
+    self.assertEquals(None, e.get('os'))
+    self.assertEquals('x', e.attrs.get('os', 'x'))
+    self.assert_('lflags' in e.attrs)
+    self.assert_('os' not in e.attrs)
+    self.assertEquals(2, len(e.attrs))
+    self.assertEquals([('cflags', '-Ifoo'), ('lflags', '-lfoo')], sorted(e.attrs.items()))
+    try:
+      e.attrs['os']
+      self.fail("should have raised KeyError")
+    except KeyError: pass
+    self.assertEquals('<cpp cflags="-Ifoo"  lflags="-lfoo" />', e.xml())
+    # attrs is a plain dictionary
+    e.attrs['os'] = 'linux'
+    self.assertEquals('linux', e.get('os'))
+
+    # parsed names are shared between manifests
+    m1 = parse(_Manifest('package'), EXAMPLE1)
+    m2 = parse(_Manifest('package'), EXAMPLE1)
+    for e1, e2 in zip(m1.exports, m2.exports):
+      self.assert_(e1.tag is e2.tag)
+      for (k1, v1), (k2, v2) in zip(sorted(e1.attrs.items()), sorted(e2.attrs.items())):
+        self.assert_(k1 is k2)
+        self.assert_(v1 is v2)
+    for d1, d2 in zip(m1.depends, m2.depends):
+      self.assert_(d1.package is d2.package)
+
   def test_VersionControl(self):
     from roslib.manifestlib import VersionControl, ManifestException
     ros_svn = 'https://ros.svn.sf.net/svnroot'
@@ -242,6 +274,33 @@ class RoslibManifestlibTest(unittest.TestCase):
       except ManifestException as e:
         print(str(e))
         self.assert_(b in str(e), "file name should be in error message [%s]"%(str(e)))
+
+  def test_parse_matches_dom(self):
+    # parse() must produce the same manifests and errors as the minidom parser
+    from roslib.manifestlib import parse, _parse_dom, _Manifest
+    def fields(fn, type_, text):
+      m = _Manifest(type_)
+      try:
+        fn(m, text)
+      except Exception as e:
+        return type(e), str(e)
+      return (m.description, m.brief, m.author, m.license, m.license_url, m.url, m.logo,
+              m.version, m.status, m.notes, [str(d) for d in m.depends], [r.name for r in m.rosdeps],
+              [(p.os, p.version, p.notes) for p in m.platforms], [e.xml() for e in m.exports],
+              m.versioncontrol and m.versioncontrol.xml(), [t.toxml() for t in m.unknown_tags])
+    for text in [EXAMPLE1, STACK_EXAMPLE1, STACK_INVALID1, STACK_INVALID2,
+                 '<package><description brief="b">x &amp; <b a="1">y</b><!--c--><![CDATA[z<]]> <br /></description></package>',
+                 '<package><author>a</author><author>b</author><license url="u">BSD</license><review status="ok"/></package>',
+                 '<package><export><a x="1">t<![CDATA[c]]>u<b/>v</a></export><export><c/></export></package>',
+                 '<package><foo a="1">x<bar/></foo><depend thirdparty="x"/><versioncontrol type="svn" url="u"/></package>',
+                 '<package><license>a</license><license>b</license></package>',
+                 '<package><url>a</url><url>b</url></package>',
+                 '<package><depend/></package>', '<package><platform os="x"/></package>',
+                 '<package><rosdep/></package>', '<stack><depend/></stack>',
+                 '<package xmlns:x="u"><x:foo/></package>', '<package><x:foo/></package>',
+                 '<package><author>a', '<stack/>', '']:
+      for type_ in ['package', 'stack']:
+        self.assertEquals(fields(_parse_dom, type_, text), fields(parse, type_, text))
     
 EXAMPLE1 = """<package>
   <description brief="a brief description">Line 1
@@ -0,0 +1,136 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+class RoslibMarshalcacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.d = tempfile.mkdtemp()
+    self.cache_file = os.path.join(self.d, 'home', 'cache')
+
+  def tearDown(self):
+    shutil.rmtree(self.d)
+
+  def source(self, name, age=100):
+    path = os.path.join(self.d, name)
+    with open(path, 'w') as f:
+      f.write(name)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    s = os.stat(path)
+    return path, (s.st_mtime, s.st_size)
+
+  def test_is_racy(self):
+    from roslib.marshalcache import is_racy, RACY_INTERVAL
+    now = time.time()
+    self.assert_(is_racy(now))
+    self.assert_(is_racy(now - RACY_INTERVAL / 2))
+    self.failIf(is_racy(now - RACY_INTERVAL - 1))
+    self.failIf(is_racy(now - 1, now + RACY_INTERVAL))
+
+  def test_save(self):
+    from roslib.marshalcache import MarshalCacheFile
+    a, stamp_a = self.source('a')
+    b, stamp_b = self.source('b')
+    c, stamp_c = self.source('c', age=0)
+    cache = MarshalCacheFile('unused', 1, self.cache_file)
+    self.assertEquals(None, cache.get(a, *stamp_a))
+    self.assert_(cache.save({a: stamp_a + ('A',), b: stamp_b + ('B',), c: stamp_c + ('C',)}))
+    self.assertEquals('A', cache.get(a, *stamp_a))
+    self.assertEquals(None, cache.get(a, stamp_a[0], stamp_a[1] + 1))
+    # nothing new: file is not rewritten
+    self.failIf(cache.save({a: stamp_a + ('A',)}))
+
+    cache = MarshalCacheFile('unused', 1, self.cache_file)
+    self.assertEquals('A', cache.get(a, *stamp_a))
+    self.assertEquals('B', cache.get(b, *stamp_b))
+    # racy files are not stored
+    self.assertEquals(None, cache.get(c, *stamp_c))
+
+    # records of deleted and changed files are dropped
+    os.remove(a)
+    with open(b, 'w') as f:
+      f.write('changed')
+    d, stamp_d = self.source('d')
+    self.assert_(cache.save({d: stamp_d + ('D',)}))
+    cache = MarshalCacheFile('unused', 1, self.cache_file)
+    self.assertEquals({d: stamp_d + ('D',)}, cache._read())
+    os.remove(d)
+    self.assert_(cache.save({}))
+    self.assertEquals({}, cache._read())
+
+    # other versions are ignored
+    d, stamp_d = self.source('d')
+    self.assert_(cache.save({d: stamp_d + ('D',)}))
+    self.assertEquals('D', MarshalCacheFile('unused', 1, self.cache_file).get(d, *stamp_d))
+    self.assertEquals(None, MarshalCacheFile('unused', 2, self.cache_file).get(d, *stamp_d))
+
+  def test_path_of(self):
+    from roslib.marshalcache import MarshalCacheFile
+    a, stamp_a = self.source('a')
+    cache = MarshalCacheFile('unused', 1, self.cache_file, path_of=lambda key: key[1])
+    self.assert_(cache.save({('msg', a): stamp_a + ('A',)}))
+    self.assertEquals('A', MarshalCacheFile('unused', 1, self.cache_file).get(('msg', a), *stamp_a))
+    os.remove(a)
+    self.assert_(cache.save({}))
+    self.assertEquals({}, cache._read())
+
+  def test_default_filename(self):
+    from roslib.marshalcache import MarshalCacheFile
+    ros_home = os.environ.get('ROS_HOME', None)
+    try:
+      os.environ['ROS_HOME'] = os.path.join(self.d, 'h1')
+      cache = MarshalCacheFile('name', 1)
+      self.assertEquals(os.path.join(self.d, 'h1', 'name'), cache._get_filename())
+      os.environ['ROS_HOME'] = os.path.join(self.d, 'h2')
+      self.assertEquals(os.path.join(self.d, 'h1', 'name'), cache._get_filename())
+      # clear() picks up the new ROS_HOME
+      cache.clear()
+      self.assertEquals(os.path.join(self.d, 'h2', 'name'), cache._get_filename())
+      # explicit filename is kept
+      cache = MarshalCacheFile('name', 1, self.cache_file)
+      cache.clear()
+      self.assertEquals(self.cache_file, cache._get_filename())
+    finally:
+      if ros_home is None:
+        del os.environ['ROS_HOME']
+      else:
+        os.environ['ROS_HOME'] = ros_home
+
+if __name__ == '__main__':
+  unittest.main()
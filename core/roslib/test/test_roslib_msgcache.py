@@ -0,0 +1,218 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+MSG = """# comment
+Header header
+int32 x
+float64[] y
+Point p
+int8 A=-1
+float32 F=1.5
+bool B=True
+string S=a # b
+"""
+
+SRV = """int32 a
+Point b
+---
+bool OK=1
+int32 sum
+"""
+
+class RoslibMsgcacheTest(unittest.TestCase):
+
+  def setUp(self):
+    import roslib.msgcache
+    self.d = tempfile.mkdtemp()
+    self.msg_file = os.path.join(self.d, 'Foo.msg')
+    self.write(self.msg_file, MSG)
+    self.srv_file = os.path.join(self.d, 'Bar.srv')
+    self.write(self.srv_file, SRV)
+    self.cache_file = os.path.join(self.d, 'home', 'cache')
+    # keep the process-wide cache file out of the user's ROS_HOME
+    self.ros_home = os.environ.get('ROS_HOME', None)
+    os.environ['ROS_HOME'] = os.path.join(self.d, 'ros_home')
+    roslib.msgcache._msg_spec_cache.clear()
+
+  def tearDown(self):
+    import roslib.msgcache
+    roslib.msgcache._msg_spec_cache.clear()
+    if self.ros_home is None:
+      del os.environ['ROS_HOME']
+    else:
+      os.environ['ROS_HOME'] = self.ros_home
+    shutil.rmtree(self.d)
+
+  def write(self, path, text, racy=False):
+    with open(path, 'w') as f:
+      f.write(text)
+    if not racy:
+      # files modified within RACY_INTERVAL are not cached
+      self.mtime = getattr(self, 'mtime', time.time() - 100) + 1
+      os.utime(path, (self.mtime, self.mtime))
+
+  def assert_same_msg(self, s1, s2):
+    self.assertEquals(s1, s2)
+    self.assertEquals((s1.full_name, s1.short_name, s1.package, s1.has_header()),
+                      (s2.full_name, s2.short_name, s2.package, s2.has_header()))
+    self.assertEquals([(c.type, c.name, c.val, type(c.val), c.val_text) for c in s1.constants],
+                      [(c.type, c.name, c.val, type(c.val), c.val_text) for c in s2.constants])
+    self.assertEquals(repr(s1.parsed_fields()), repr(s2.parsed_fields()))
+
+  def test_load_file(self):
+    import roslib.msgs
+    import roslib.srvs
+    from roslib.msgcache import MsgSpecCache
+    calls = []
+    def load_msg(*args):
+      calls.append(args)
+      return roslib.msgs._load_file(*args)
+    cache = MsgSpecCache(self.cache_file)
+    args = (self.msg_file, 'pkg', 'pkg/Foo', 'Foo')
+    s = cache.load_file('msg', self.msg_file, 'pkg', 'pkg/Foo', 'Foo', load_msg)
+    self.assert_same_msg(roslib.msgs.load_from_string(MSG, 'pkg', 'pkg/Foo', 'Foo'), s)
+    s2 = cache.load_file('msg', self.msg_file, 'pkg', 'pkg/Foo', 'Foo', load_msg)
+    self.assertEquals(1, len(calls))
+    # each load returns a new instance
+    self.failIf(s is s2)
+    self.failIf(s.types is s2.types)
+    self.assert_same_msg(s, s2)
+    # package context is part of the key
+    s3 = cache.load_file('msg', self.msg_file, '', 'Foo', 'Foo', load_msg)
+    self.assertEquals(2, len(calls))
+    self.assertEquals('Point', s3.types[3])
+
+    # changed file is loaded again
+    self.write(self.msg_file, MSG.replace('int32 x', 'int64 xx'))
+    s = cache.load_file('msg', self.msg_file, 'pkg', 'pkg/Foo', 'Foo', load_msg)
+    self.assertEquals(3, len(calls))
+    self.assertEquals('int64', s.types[1])
+
+    # errors are not cached
+    self.write(self.msg_file, 'int32 1x')
+    for i in range(2):
+      try:
+        cache.load_file('msg', self.msg_file, 'pkg', 'pkg/Foo', 'Foo', load_msg)
+        self.fail("should have raised")
+      except roslib.msgs.MsgSpecException: pass
+    self.assertEquals(5, len(calls))
+    self.assertRaises(IOError, cache.load_file, 'msg', os.path.join(self.d, 'Fake.msg'), 'pkg', 'pkg/Fake', 'Fake', load_msg)
+
+  def test_save(self):
+    import roslib.msgs
+    import roslib.srvs
+    from roslib.msgcache import MsgSpecCache
+    cache = MsgSpecCache(self.cache_file)
+    self.failIf(cache.save())
+    m = cache.load_file('msg', self.msg_file, 'pkg', 'pkg/Foo', 'Foo', roslib.msgs._load_file)
+    s = cache.load_file('srv', self.srv_file, 'pkg', 'pkg/Bar', 'Bar', roslib.srvs._load_file)
+    self.assert_(cache.save())
+    self.assert_(os.path.isfile(self.cache_file))
+    self.failIf(cache.save())
+
+    # warm load does not read the files
+    def fail(*args):
+      raise AssertionError("load() called")
+    cache = MsgSpecCache(self.cache_file)
+    m2 = cache.load_file('msg', self.msg_file, 'pkg', 'pkg/Foo', 'Foo', fail)
+    self.assert_same_msg(m, m2)
+    s2 = cache.load_file('srv', self.srv_file, 'pkg', 'pkg/Bar', 'Bar', fail)
+    self.assertEquals(s, s2)
+    self.assert_same_msg(s.request, s2.request)
+    self.assert_same_msg(s.response, s2.response)
+    self.assertEquals(['pkg/Point'], [t for t in s2.request.types if '/' in t])
+
+    # stale records are not used
+    self.write(self.msg_file, MSG + 'int32 z\n')
+    cache = MsgSpecCache(self.cache_file)
+    m = cache.load_file('msg', self.msg_file, 'pkg', 'pkg/Foo', 'Foo', roslib.msgs._load_file)
+    self.assertEquals('z', m.names[-1])
+
+  def test_racy(self):
+    import roslib.msgs
+    from roslib.msgcache import MsgSpecCache
+    # int32 -> int64 in the same second keeps mtime and size
+    self.write(self.msg_file, 'int32 x\n', racy=True)
+    st = os.stat(self.msg_file)
+    cache = MsgSpecCache(self.cache_file)
+    self.assertEquals(['int32'], cache.load_file('msg', self.msg_file, 'pkg', 'pkg/Foo', 'Foo', roslib.msgs._load_file).types)
+    self.write(self.msg_file, 'int64 x\n', racy=True)
+    os.utime(self.msg_file, (st.st_atime, st.st_mtime))
+    self.assertEquals(['int64'], cache.load_file('msg', self.msg_file, 'pkg', 'pkg/Foo', 'Foo', roslib.msgs._load_file).types)
+    self.failIf(cache.save())
+    self.failIf(os.path.exists(self.cache_file))
+
+  def test_prune(self):
+    import roslib.msgs
+    import roslib.srvs
+    from roslib.msgcache import MsgSpecCache
+    cache = MsgSpecCache(self.cache_file)
+    cache.load_file('msg', self.msg_file, 'pkg', 'pkg/Foo', 'Foo', roslib.msgs._load_file)
+    cache.load_file('srv', self.srv_file, 'pkg', 'pkg/Bar', 'Bar', roslib.srvs._load_file)
+    self.assert_(cache.save())
+    # records of deleted files are dropped when another process saves
+    os.remove(self.srv_file)
+    other = os.path.join(self.d, 'Other.msg')
+    self.write(other, 'int32 y\n')
+    cache = MsgSpecCache(self.cache_file)
+    cache.load_file('msg', other, 'pkg', 'pkg/Other', 'Other', roslib.msgs._load_file)
+    self.assert_(cache.save())
+    self.assertEquals(sorted([('msg', self.msg_file, 'pkg'), ('msg', other, 'pkg')]),
+                      sorted(cache._file._read().keys()))
+
+  def test_load_from_file(self):
+    import roslib.msgs
+    import roslib.srvs
+    for _ in range(2):
+      type_, spec = roslib.msgs.load_from_file(self.msg_file, 'pkg/')
+      self.assertEquals('pkg/Foo', type_)
+      self.assert_same_msg(roslib.msgs.load_from_string(MSG, 'pkg', 'pkg/Foo', 'Foo'), spec)
+      type_, spec = roslib.srvs.load_from_file(self.srv_file, 'pkg')
+      self.assertEquals('pkg/Bar', type_)
+      self.assertEquals(roslib.srvs.load_from_string(SRV, 'pkg', 'pkg/Bar', 'Bar'), spec)
+    self.write(self.msg_file, 'int32 1x')
+    try:
+      roslib.msgs.load_from_file(self.msg_file, 'pkg')
+      self.fail("should have raised")
+    except roslib.msgs.MsgSpecException as e:
+      self.assertEquals('Foo.msg: 1x is not a legal message field name', str(e))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,144 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import struct
+import sys
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None # optional dependency
+
+IMU = '''Quaternion orientation
+float64[9] orientation_covariance
+Vector3 angular_velocity
+time stamp
+duration age
+bool valid
+uint8[3] rgb
+int8 B=1
+'''
+
+class RoslibMsgdtypeTest(unittest.TestCase):
+
+  def setUp(self):
+    from roslib.msgs import MsgRegistry, load_from_string
+    self.registry = r = MsgRegistry()
+    r.register('g/Quaternion', load_from_string('float64 x\nfloat64 y\nfloat64 z\nfloat64 w', 'g'))
+    r.register('g/Vector3', load_from_string('float64 x\nfloat64 y\nfloat64 z', 'g'))
+    r.register('Header', load_from_string('uint32 seq\ntime stamp\nstring frame_id'))
+    self.imu = load_from_string(IMU, 'g', 'g/Imu', 'Imu')
+
+  def test_variable_size(self):
+    from roslib.msgs import MsgSpecException, load_from_string
+    from roslib.msgdtype import compile_dtype, decode
+    for text, msg in [('Header header\nint32 x', 'g/Foo is not fixed-size: field [header] has variable-size type [Header]'),
+                      ('int32 x\nstring s', 'g/Foo is not fixed-size: field [s] has variable-size type [string]'),
+                      ('float32[] ranges', 'g/Foo is not fixed-size: field [ranges] has variable-size type [float32[]]'),
+                      ('string[2] names', 'g/Foo is not fixed-size: field [names] has variable-size type [string[2]]')]:
+      spec = load_from_string(text, 'g', 'g/Foo', 'Foo')
+      for fn in [compile_dtype, decode]:
+        try:
+          if fn is decode:
+            if numpy is None:
+              continue
+            decode(spec, b'', registry=self.registry)
+          else:
+            compile_dtype(spec, self.registry)
+          self.fail("should have raised")
+        except MsgSpecException as e:
+          self.assertEquals(msg, str(e))
+    self.assertRaises(KeyError, compile_dtype, load_from_string('g/Missing m', 'g'), self.registry)
+
+  @unittest.skipIf(numpy is None, "NumPy is not installed")
+  def test_compile_dtype(self):
+    from roslib.msgdtype import compile_dtype
+    dtype = compile_dtype(self.imu, self.registry)
+    self.assertEquals(self.imu.get_layout(self.registry).min_size, dtype.itemsize)
+    self.assertEquals(['orientation', 'orientation_covariance', 'angular_velocity', 'stamp', 'age', 'valid', 'rgb'], list(dtype.names))
+    self.assertEquals(['x', 'y', 'z', 'w'], list(dtype['orientation'].names))
+    self.assertEquals((9,), dtype['orientation_covariance'].shape)
+    self.assertEquals(numpy.dtype('<u4'), dtype['stamp']['secs'])
+    self.assertEquals(numpy.dtype('<i4'), dtype['age']['nsecs'])
+
+  @unittest.skipIf(numpy is None, "NumPy is not installed")
+  def test_decode(self):
+    from roslib.msgdtype import compile_dtype, decode
+    fmt = self.imu.get_layout(self.registry).format
+    records = []
+    for i in range(5):
+      values = [float(i), 2.0, 3.0, 4.5] + [float(j * i) for j in range(9)] + [0.5, -1.0, i * 1e9] + \
+               [1000 + i, 999999999, -i, -5, i % 2, 1, 2, 255 - i]
+      records.append(values)
+    data = b'xyz' + b''.join([struct.pack(fmt, *v) for v in records])
+
+    a = decode(self.imu, data, offset=3, registry=self.registry)
+    self.assertEquals(5, len(a))
+    self.failIf(a.flags.owndata)
+    for i, values in enumerate(records):
+      self.assertEquals(values[:4], list(a[i]['orientation'].tolist()))
+      self.assertEquals(values[4:13], a['orientation_covariance'][i].tolist())
+      self.assertEquals(values[13:16], list(a[i]['angular_velocity'].tolist()))
+      self.assertEquals((values[16], values[17]), a[i]['stamp'].tolist())
+      self.assertEquals((values[18], values[19]), a[i]['age'].tolist())
+      self.assertEquals(bool(values[20]), bool(a[i]['valid']))
+      self.assertEquals(values[21:], a[i]['rgb'].tolist())
+
+    # shares memory with the buffer
+    buf = bytearray(data)
+    a = decode(compile_dtype(self.imu, self.registry), buf, count=2, offset=3)
+    self.assertEquals(2, len(a))
+    buf[3:11] = struct.pack('<d', 42.0)
+    self.assertEquals(42.0, a[0]['orientation']['x'])
+
+    self.assertRaises(ValueError, decode, self.imu, data, registry=self.registry)
+    self.assertRaises(ValueError, decode, self.imu, data, 6, 3, self.registry)
+
+  @unittest.skipIf(numpy is None, "NumPy is not installed")
+  def test_empty(self):
+    from roslib.msgs import load_from_string
+    from roslib.msgdtype import compile_dtype, decode
+    # e.g. std_msgs/Empty, which serializes to zero bytes
+    spec = load_from_string('', 'std_msgs', 'std_msgs/Empty', 'Empty')
+    self.assertEquals(0, compile_dtype(spec, self.registry).itemsize)
+    self.assertEquals(0, load_from_string('int8 A=1', 'g').get_layout(self.registry).min_size)
+    a = decode(spec, b'', count=3, registry=self.registry)
+    self.assertEquals((3,), a.shape)
+    self.assertEquals(0, a.nbytes)
+    self.assertEquals(0, len(decode(spec, b'xyz', count=0, offset=3, registry=self.registry)))
+    self.assertRaises(ValueError, decode, spec, b'', registry=self.registry)
+    self.assertRaises(ValueError, decode, spec, b'xyz', 1, 4, self.registry)
+
+if __name__ == '__main__':
+  unittest.main()
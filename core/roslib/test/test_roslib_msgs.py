@@ -0,0 +1,414 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import roslib
+
+def make_package(d, name, depends, msgs):
+  """
+  Create a package with a manifest.xml and msg files in directory d.
+  @param msgs: {type name: .msg text}
+  """
+  os.makedirs(os.path.join(d, name, 'msg'))
+  with open(os.path.join(d, name, 'manifest.xml'), 'w') as f:
+    f.write('<package>%s</package>'%''.join(['<depend package="%s"/>'%p for p in depends]))
+  for m, text in msgs.items():
+    with open(os.path.join(d, name, 'msg', m + '.msg'), 'w') as f:
+      f.write(text)
+
+class RoslibMsgsTest(unittest.TestCase):
+
+  def setUp(self):
+    import roslib.manifestcache
+    # keep the crawl snapshot and cache files out of the user's ROS_HOME
+    self.ros_home = os.environ.get('ROS_HOME', None)
+    self.tmp_ros_home = os.environ['ROS_HOME'] = tempfile.mkdtemp()
+    roslib.manifestcache._manifest_cache.clear()
+
+  def tearDown(self):
+    import roslib.manifestcache
+    roslib.manifestcache._manifest_cache.clear()
+    shutil.rmtree(self.tmp_ros_home)
+    if self.ros_home is None:
+      del os.environ['ROS_HOME']
+    else:
+      os.environ['ROS_HOME'] = self.ros_home
+
+  def test_is_valid_msg_type(self):
+    from roslib.msgs import is_valid_msg_type
+    for t in ['int32', 'std_msgs/String', 'String[]', 'String[10]', 'a/b/', 'a_1[][2]', 'Point32[4][]']:
+      self.assert_(is_valid_msg_type(t), t)
+    for t in [None, '', ' int32', 'int32 ', '1int', '/a', 'a//b', 'a[', 'a[]]', 'a[x]', 'a[ 1]', 'a]', 'a-b']:
+      self.failIf(is_valid_msg_type(t), t)
+
+  def test__convert_val(self):
+    from roslib.msgs import _convert_val, MsgSpecException
+    self.assertEquals(-128, _convert_val('int8', '-128'))
+    self.assertEquals(255, _convert_val('uint8', '255'))
+    self.assertEquals(255, _convert_val('char', '255'))
+    self.assertEquals(-128, _convert_val('byte', '-128'))
+    self.assertEquals(1.5, _convert_val('float32', '1.5'))
+    self.assertEquals('x', _convert_val('string', ' x '))
+    self.assertEquals(True, _convert_val('bool', 'True'))
+    self.assertEquals(False, _convert_val('bool', '0'))
+    self.assertEquals(True, _convert_val('bool', '2'))
+    for type_, val in [('int8', '128'), ('int8', '-129'), ('uint8', '256'), ('uint8', '-1'),
+                       ('char', '-1'), ('byte', '128'), ('uint32', '4294967296')]:
+      try:
+        _convert_val(type_, val)
+        self.fail("should have raised on %s %s"%(type_, val))
+      except MsgSpecException: pass
+    try:
+      _convert_val('time', '1')
+      self.fail("should have raised")
+    except MsgSpecException: pass
+    self.assertRaises(ValueError, _convert_val, 'int32', 'x')
+
+  def test_load_from_string(self):
+    from roslib.msgs import load_from_string, Constant
+    spec = load_from_string("""# comment
+Header header
+int32 x # the x
+  float64[] y\t
+geometry_msgs/Point p
+Point q
+int8 A=1
+int8  B = -2 # comment
+string S=a # b
+bool T=True
+""", 'pkg')
+    self.assertEquals(['Header', 'int32', 'float64[]', 'geometry_msgs/Point', 'pkg/Point'], spec.types)
+    self.assertEquals(['header', 'x', 'y', 'p', 'q'], spec.names)
+    self.assertEquals([Constant('int8', 'A', 1, '1'), Constant('int8', 'B', -2, '-2'),
+                       Constant('string', 'S', 'a # b', 'a # b'), Constant('bool', 'T', True, 'True')],
+                      spec.constants)
+    self.assertEquals(['a # b'], [c.val_text for c in spec.constants if c.type == 'string'])
+    self.assert_(spec.has_header())
+
+  def test_load_from_string_errors(self):
+    from roslib.msgs import load_from_string, MsgSpecException
+    for text, msg in [('in-t32 x', 'in-t32 is not a legal message type'),
+                      ('int32 1x', '1x is not a legal message field name'),
+                      ('int32 x y', 'Invalid declaration: int32 x y'),
+                      ('time T=1', 'time is not a legal constant type'),
+                      ('int8 A=1=2', 'Invalid declaration: int8 A=1=2'),
+                      ('int8 A=300', 'Invalid declaration: cannot coerce [300] to int8 (out of bounds)'),
+                      ('int32 x\nint32 x', "Duplicate field names in message: ['x', 'x']")]:
+      try:
+        load_from_string(text)
+        self.fail("should have raised on %s"%text)
+      except MsgSpecException as e:
+        self.assertEquals(msg, str(e))
+
+  def test_load_from_string_matches__load_line(self):
+    # the precompiled patterns must give the same result as the general line parser
+    from roslib.msgs import load_from_string, _load_line, MsgSpec, MsgSpecException
+    def by_line(text, package_context):
+      types, names, constants = [], [], []
+      try:
+        for line in text.split('\n'):
+          _load_line(line, package_context, types, names, constants)
+        spec = MsgSpec(types, names, constants, text)
+      except MsgSpecException as e:
+        return str(e)
+      return spec.types, spec.names, [(c.type, c.name, c.val, c.val_text) for c in spec.constants]
+    def loaded(text, package_context):
+      try:
+        spec = load_from_string(text, package_context)
+      except MsgSpecException as e:
+        return str(e)
+      return spec.types, spec.names, [(c.type, c.name, c.val, c.val_text) for c in spec.constants]
+    for line in ['', ' ', '#', '  # x', '\t\r', 'int32 x', ' int32  x  # c', 'int32\tx', 'int32 \tx', 'int32\t x',
+                 'Header header', 'std_msgs/Header h', 'Foo[] f', 'Foo[3][] f', 'Foo[a] f', 'a//b f', 'x', 'int32 x y',
+                 'int8 A=1', 'int8 A = 1 # c', 'int8 A=01', 'int8 A=1 2', 'int8 A=1   2', 'int8 A = x', 'int8 A=',
+                 'int8 =1', 'int8 1A=1', 'int8 A==1', 'float32 F=1e3', 'float64 F=nan2', 'bool B=False', 'bool B=1',
+                 'bool B=[]', 'bool B=x', 'uint64 U=18446744073709551616', 'int64 I=-9223372036854775809',
+                 'string S=a', 'string S = a b # c', ' string S=a', 'string  S=', 'string S', 'string S=a=b',
+                 'time T=1', 'string# S=a', 'int32 x\r']:
+      for package_context in ['', 'pkg']:
+        self.assertEquals(by_line(line, package_context), loaded(line, package_context), repr(line))
+
+  def test_load_package_dependencies(self):
+    import roslib.msgs
+    try:
+      from cStringIO import StringIO
+    except ImportError:
+      from io import StringIO
+    d = tempfile.mkdtemp()
+    env = dict(os.environ)
+    ros_root = os.path.join(d, 'ros_root')
+    os.makedirs(ros_root)
+    make_package(d, 'std_msgs', [], {'Header': 'uint32 seq\ntime stamp\nstring frame_id'})
+    make_package(d, 'a', ['b', 'c', 'd', 'b', 'a'], {'A': 'int32 x'})
+    make_package(d, 'b', [], {'B1': 'int32 b', 'Bad': 'int32 1x'})
+    make_package(d, 'c', [], {'C': 'b/B1 b'})
+    make_package(d, 'd', [], {'D1': 'int32 d', 'D2': 'bool BAD=['})
+    os.environ['ROS_ROOT'] = ros_root
+    os.environ['ROS_PACKAGE_PATH'] = d
+    stdout = sys.stdout
+    try:
+      for workers in [1, 4]:
+        roslib.msgs.reinit()
+        sys.stdout = StringIO()
+        roslib.msgs.load_package_dependencies('a', workers=workers)
+        output = sys.stdout.getvalue()
+        sys.stdout = stdout
+        self.assertEquals(set(['b', 'c', 'd']), roslib.msgs._loaded_packages)
+        for t in ['b/B1', 'c/C', 'd/D1']:
+          self.assert_(roslib.msgs.is_registered(t), t)
+        for t in ['a/A', 'b/Bad', 'd/D2']:
+          self.failIf(roslib.msgs.is_registered(t), t)
+        self.assertEquals(['b/B1'], roslib.msgs.get_registered('c/C').types)
+        # errors are reported in dependency order
+        lines = output.splitlines()
+        self.assertEquals(2, len(lines), output)
+        self.assert_(lines[0].startswith('ERROR: unable to load Bad, '), lines[0])
+        self.assert_(lines[1].startswith('ERROR: unable to load D2, '), lines[1])
+        # already loaded packages are skipped
+        sys.stdout = StringIO()
+        roslib.msgs.load_package_dependencies('a', workers=workers)
+        self.assertEquals('', sys.stdout.getvalue())
+        sys.stdout = stdout
+    finally:
+      sys.stdout = stdout
+      os.environ.clear()
+      os.environ.update(env)
+      roslib.msgs._registry._initialized = False
+      roslib.msgs._loaded_packages.clear()
+      roslib.msgs.REGISTERED_TYPES.clear()
+      shutil.rmtree(d)
+
+  def test_MsgRegistry(self):
+    import threading
+    import roslib.msgs
+    import roslib.session
+    from roslib.msgs import MsgRegistry, MsgSpec
+    d = tempfile.mkdtemp()
+    # ROS_ROOT must not contain either workspace
+    ros_root = os.path.join(d, 'ros_root')
+    os.makedirs(ros_root)
+    # two workspaces with different definitions of the same types
+    for ws, t in [('ws1', 'int32'), ('ws2', 'float64')]:
+      ws = os.path.join(d, ws)
+      make_package(ws, 'std_msgs', [], {'Header': 'uint32 seq\ntime stamp\nstring frame_id'})
+      make_package(ws, 'a', ['b', 'c'], {})
+      make_package(ws, 'b', [], {'B': '%s x'%t})
+      make_package(ws, 'c', ['b'], {'C': 'b/B b\n%s y'%t})
+    try:
+      registries = []
+      for ws in ['ws1', 'ws2']:
+        env = {'ROS_ROOT': ros_root, 'ROS_PACKAGE_PATH': os.path.join(d, ws)}
+        registries.append(MsgRegistry(roslib.session.Session(env)))
+      errors = []
+      def load(r):
+        try:
+          r.load_package_dependencies('a', workers=2)
+          r.load_package('a')
+        except Exception as e:
+          errors.append(e)
+      threads = [threading.Thread(target=load, args=(r,)) for r in registries + registries]
+      for t in threads:
+        t.start()
+      for t in threads:
+        t.join()
+      self.assertEquals([], errors)
+      for r, t in zip(registries, ['int32', 'float64']):
+        self.assertEquals(set(['a', 'b', 'c']), r.loaded_packages)
+        self.assertEquals([t], r.get_registered('b/B').types)
+        self.assertEquals(['b/B', t], r.get_registered('c/C').types)
+        self.assertEquals(['b/B', t], r.get_registered('C', 'c').types)
+        self.assert_(r.is_registered('std_msgs/Header'))
+        self.assert_(r.is_registered('time'))
+        self.failIf(r.is_registered('B'))
+        self.assertRaises(KeyError, r.get_registered, 'b/Fake')
+      # registries do not share state with each other or the module
+      self.failIf(roslib.msgs.is_registered('b/B'))
+      spec = MsgSpec(['int8'], ['z'], [], 'int8 z')
+      registries[0].register('b/B', spec)
+      self.assert_(spec is registries[0].get_registered('b/B'))
+      self.failIf(spec is registries[1].get_registered('b/B'))
+      registries[0].reinit()
+      self.failIf(registries[0].is_registered('b/B'))
+      self.assert_(registries[0].is_registered('Header'))
+      self.assertEquals(set(), registries[0].loaded_packages)
+    finally:
+      shutil.rmtree(d)
+
+  def test_get_registered_lazy(self):
+    import roslib.session
+    from roslib.msgs import MsgRegistry, MsgSpecException
+    d = tempfile.mkdtemp()
+    ros_root = os.path.join(d, 'ros_root')
+    os.makedirs(ros_root)
+    ws = os.path.join(d, 'ws')
+    make_package(ws, 'std_msgs', [], {'Header': 'uint32 seq\ntime stamp\nstring frame_id'})
+    make_package(ws, 'a', [], {'A': 'Header header\nb/B[] b\nA2 a2', 'A2': 'int32 x', 'Unused': 'int32 x', 'Bad': 'int32 1x'})
+    make_package(ws, 'b', [], {'B': 'C c\nc/Missing m', 'C': 'B b', 'Unused': 'int32 x'})
+    try:
+      env = {'ROS_ROOT': ros_root, 'ROS_PACKAGE_PATH': ws}
+      r = MsgRegistry(roslib.session.Session(env))
+      self.assertRaises(KeyError, r.get_registered, 'a/A')
+      spec = r.get_registered('a/A', lazy=True)
+      self.assertEquals(['Header', 'b/B[]', 'a/A2'], spec.types)
+      self.assert_(spec is r.get_registered('a/A'))
+      # embedded types are loaded recursively, and nothing else
+      self.assertEquals(['int32'], r.get_registered('a/A2').types)
+      self.assertEquals(['b/C', 'c/Missing'], r.get_registered('b/B').types)
+      self.assertEquals(['b/B'], r.get_registered('b/C').types)
+      for t in ['a/Unused', 'b/Unused', 'a/Bad', 'c/Missing']:
+        self.failIf(r.is_registered(t), t)
+      self.assertEquals(set(), r.loaded_packages)
+      # default package resolution
+      self.assertEquals(['int32'], r.get_registered('Unused', 'b', lazy=True).types)
+      self.assert_(r.is_registered('b/Unused'))
+      for t in ['c/Missing', 'a/Missing', 'Missing', 'a/b/C']:
+        self.assertRaises(KeyError, r.get_registered, t, None, True)
+      self.assertRaises(MsgSpecException, r.get_registered, 'a/Bad', None, True)
+
+      r = MsgRegistry(roslib.session.Session(env), lazy=True)
+      self.assertEquals(['int32'], r.get_registered('A2', 'a').types)
+      self.assertRaises(KeyError, r.get_registered, 'a/A', lazy=False)
+    finally:
+      shutil.rmtree(d)
+
+  def test_MsgLayout(self):
+    import struct
+    from roslib.msgs import MsgRegistry, MsgLayout, load_from_string
+    r = MsgRegistry()
+    r.register('p/Point', load_from_string('float64 x\nfloat64 y\nfloat64 z', 'p'))
+    r.register('p/Named', load_from_string('string name\nuint8 id', 'p'))
+    r.register('Header', load_from_string('uint32 seq\ntime stamp\nstring frame_id'))
+
+    l = r.get_registered('p/Point').get_layout(r)
+    self.assert_(l.fixed_size)
+    self.assertEquals('<ddd', l.format)
+    self.assertEquals([(0, 3, '<ddd')], l.runs)
+    self.assertEquals((24, 24, 24), (l.prefix_size, l.min_size, l.max_size))
+
+    spec = load_from_string('''int8 A=1
+Header header
+uint32 count
+p/Point[2] corners
+time t
+bool flag
+float32[] ranges
+p/Point p
+uint8[4] rgba
+p/Named named
+int16 tail
+''', 'p')
+    l = spec.get_layout(r)
+    self.assert_(l is spec.get_layout(r))
+    self.failIf(l.fixed_size)
+    self.assertEquals(None, l.format)
+    self.assertEquals([(1, 5, '<IddddddIIB'), (6, 8, '<ddd4B'), (9, 10, '<h')], l.runs)
+    self.assertEquals((0, '<'), (l.prefix_size, l.prefix_format))
+    self.assertEquals(4+8+4 + 4 + 48 + 8 + 1 + 4 + 24 + 4 + 4+1 + 2, l.min_size)
+    self.assertEquals(None, l.max_size)
+    for _, _, fmt in l.runs:
+      struct.calcsize(fmt)
+
+    l = load_from_string('uint32 a\ntime b\nuint8 c\nstring d\nduration e', 'p').get_layout(r)
+    self.assertEquals([(0, 3, '<IIIB'), (4, 5, '<ii')], l.runs)
+    self.assertEquals((13, '<IIIB'), (l.prefix_size, l.prefix_format))
+
+    l = load_from_string('p/Point[3] a\nint64[0] b\nchar c', 'p').get_layout(r)
+    self.assert_(l.fixed_size)
+    self.assertEquals('<ddddddddd0qB', l.format)
+    self.assertEquals(73, struct.calcsize(l.format))
+    self.assertEquals((73, 73, 73), (l.prefix_size, l.min_size, l.max_size))
+
+    l = load_from_string('', 'p').get_layout(r)
+    self.assert_(l.fixed_size)
+    self.assertEquals(([], '<', 0, 0), (l.runs, l.format, l.min_size, l.max_size))
+
+    self.assertRaises(KeyError, load_from_string('p/Missing m', 'p').get_layout, r)
+
+  def test_get_layout_registry(self):
+    import roslib.session
+    from roslib.msgs import MsgRegistry, load_from_string
+    d = tempfile.mkdtemp()
+    ros_root = os.path.join(d, 'ros_root')
+    os.makedirs(ros_root)
+    make_package(d, 'std_msgs', [], {'Header': 'uint32 seq\ntime stamp\nstring frame_id'})
+    env = {'ROS_ROOT': ros_root, 'ROS_PACKAGE_PATH': d}
+    try:
+      self._test_get_layout_registry(MsgRegistry(roslib.session.Session(env)), MsgRegistry())
+    finally:
+      shutil.rmtree(d)
+
+  def _test_get_layout_registry(self, r1, r2):
+    from roslib.msgs import load_from_string
+    r1.register('p/Point', load_from_string('float64 x\nfloat64 y', 'p'))
+    r2.register('p/Point', load_from_string('float32 x', 'p'))
+    spec = load_from_string('p/Point p\nint8 i', 'p')
+    self.assertEquals('<ddb', spec.get_layout(r1).format)
+    # layouts are cached per registry
+    self.assertEquals('<fb', spec.get_layout(r2).format)
+    l = spec.get_layout(r1)
+    self.assertEquals('<ddb', l.format)
+    self.assert_(l is spec.get_layout(r1))
+    # and recomputed once an embedded type is registered again
+    r1.register('p/Point', load_from_string('int32 x', 'p'))
+    self.assertEquals('<ib', spec.get_layout(r1).format)
+    self.assertEquals('<ib', spec.get_layout(r1).format)
+    r1.reinit()
+    self.assertRaises(KeyError, spec.get_layout, r1)
+
+  def test_get_layout_header(self):
+    import roslib.session
+    from roslib.msgs import MsgRegistry, load_from_string
+    d = tempfile.mkdtemp()
+    ros_root = os.path.join(d, 'ros_root')
+    os.makedirs(ros_root)
+    make_package(d, 'std_msgs', [], {'Header': 'uint32 seq\ntime stamp\nstring frame_id'})
+    env = {'ROS_ROOT': ros_root, 'ROS_PACKAGE_PATH': d}
+    try:
+      # Header is registered on demand
+      for header in ['Header', 'std_msgs/Header']:
+        r = MsgRegistry(roslib.session.Session(env))
+        l = load_from_string('%s header\nuint8 x'%header, 'p').get_layout(r)
+        # seq, stamp and an empty frame_id, then x
+        self.assertEquals([(1, 2, '<B')], l.runs)
+        self.assertEquals((0, 17, None), (l.prefix_size, l.min_size, l.max_size))
+        self.assert_(r.is_registered('std_msgs/Header'))
+    finally:
+      shutil.rmtree(d)
+
+if __name__ == '__main__':
+  unittest.main()
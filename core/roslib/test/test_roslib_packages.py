@@ -31,14 +31,32 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import os
+import shutil
 import struct
 import sys
+import tempfile
 import unittest
 
 import roslib.packages
 
 class RoslibPackagesTest(unittest.TestCase):
-  
+
+  def setUp(self):
+    import roslib.manifestcache
+    # keep the crawl snapshot and cache files out of the user's ROS_HOME
+    self.ros_home = os.environ.get('ROS_HOME', None)
+    self.tmp_ros_home = os.environ['ROS_HOME'] = tempfile.mkdtemp()
+    roslib.manifestcache._manifest_cache.clear()
+
+  def tearDown(self):
+    import roslib.manifestcache
+    roslib.manifestcache._manifest_cache.clear()
+    shutil.rmtree(self.tmp_ros_home)
+    if self.ros_home is None:
+      del os.environ['ROS_HOME']
+    else:
+      os.environ['ROS_HOME'] = self.ros_home
+
   def test_find_node(self):
     import roslib.packages
     d = roslib.packages.get_pkg_dir('roslib')
@@ -57,6 +75,147 @@ class RoslibPackagesTest(unittest.TestCase):
       self.fail("should have raised")
     except roslib.packages.InvalidROSPkgException: pass
 
+  def test_get_pkg_dir_ros_package_path(self):
+    import roslib.packages
+    d = os.path.join(get_test_path(), 'package_tests')
+    p1 = os.path.join(d, 'p1')
+    p2 = os.path.join(d, 'p2')
+    # first path on ROS_PACKAGE_PATH takes precedence
+    rpp = os.pathsep.join([p1, p2])
+    self.assertEquals(os.path.join(p1, 'foo'), roslib.packages.get_pkg_dir('foo', ros_package_path=rpp))
+    self.assertEquals(os.path.join(p1, 'bar'), roslib.packages.get_pkg_dir('bar', ros_package_path=rpp))
+    rpp = os.pathsep.join([p2, p1])
+    self.assertEquals(os.path.join(p2, 'foo'), roslib.packages.get_pkg_dir('foo', ros_package_path=rpp))
+    self.assertEquals(os.path.join(p1, 'bar'), roslib.packages.get_pkg_dir('bar', ros_package_path=rpp))
+
+    self.assertEquals(None, roslib.packages.get_pkg_dir('fake_roslib', required=False, ros_package_path=rpp))
+    try:
+      roslib.packages.get_pkg_dir('fake_roslib', ros_package_path=rpp)
+      self.fail("should have raised")
+    except roslib.packages.InvalidROSPkgException: pass
+
+  def test_pkg_dir_cache(self):
+    import shutil
+    import tempfile
+    import threading
+    from roslib.packages import _PkgDirCache
+    d = os.path.join(get_test_path(), 'package_tests')
+    p1 = os.path.join(d, 'p1')
+    p2 = os.path.join(d, 'p2')
+    cache = _PkgDirCache(max_size=2)
+    self.assertEquals(os.path.join(p1, 'foo'), cache.get('foo', None, p1))
+    self.assertEquals(os.path.join(p2, 'foo'), cache.get('foo', None, p2))
+    self.assertEquals(None, cache.get('bar', None, p2))
+    # least recently used environment is evicted
+    self.assertEquals(os.path.join(p1, 'bar'), cache.get('bar', None, os.pathsep.join([p2, p1])))
+    self.assertEquals([(None, p2), (None, os.pathsep.join([p2, p1]))], list(cache._indexes.keys()))
+
+    # relocated packages are found again
+    tmp = tempfile.mkdtemp()
+    try:
+      os.makedirs(os.path.join(tmp, 'a', 'pkg'))
+      open(os.path.join(tmp, 'a', 'pkg', 'manifest.xml'), 'w').close()
+      self.assertEquals(os.path.join(tmp, 'a', 'pkg'), cache.get('pkg', None, tmp))
+      os.rename(os.path.join(tmp, 'a'), os.path.join(tmp, 'b'))
+      self.assertEquals(os.path.join(tmp, 'b', 'pkg'), cache.get('pkg', None, tmp))
+      shutil.rmtree(os.path.join(tmp, 'b'))
+      self.assertEquals(None, cache.get('pkg', None, tmp))
+    finally:
+      shutil.rmtree(tmp)
+
+    # concurrent lookups
+    cache = _PkgDirCache(max_size=1)
+    errors = []
+    def lookup(rpp, expected):
+      try:
+        for i in range(5):
+          self.assertEquals(expected, cache.get('foo', None, rpp))
+      except Exception as e:
+        errors.append(e)
+    threads = [threading.Thread(target=lookup, args=(p, os.path.join(p, 'foo'))) for p in [p1, p2] * 4]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+    self.assertEquals([], errors)
+
+  def test_resource_file(self):
+    import roslib.packages
+    from roslib.session import Session
+    d = os.path.join(get_test_path(), 'package_tests')
+    session = Session({'ROS_ROOT': os.path.join(d, 'p1'), 'ROS_PACKAGE_PATH': ''})
+    foo = os.path.join(d, 'p1', 'foo')
+    self.assertEquals(os.path.join(foo, 'msg', 'Foo.msg'), roslib.packages.resource_file('foo', 'msg', 'Foo.msg', session=session))
+    self.assertEquals(os.path.join(foo, 'msg'), roslib.packages.get_pkg_subdir('foo', 'msg', required=False, session=session))
+    try:
+      roslib.packages.resource_file('fake_roslib', 'msg', 'Foo.msg', session=session)
+      self.fail("should have raised")
+    except roslib.packages.InvalidROSPkgException: pass
+
+  def test_list_pkgs_by_path(self):
+    import roslib.packages
+    d = os.path.join(get_test_path(), 'package_tests')
+    env = {'ROS_ROOT': d, 'ROS_PACKAGE_PATH': ''}
+    cache = {}
+    packages = roslib.packages.list_pkgs_by_path(os.path.join(d, 'p1'), cache=cache, env=env)
+    self.assertEquals(set(['foo', 'bar']), set(packages))
+    self.assertEquals((os.path.join(d, 'p1', 'foo'), d, ''), cache['foo'])
+    self.assertEquals(os.path.join(d, 'p1', 'bar'), cache['bar'][0])
+    # packages already listed are ignored
+    packages = roslib.packages.list_pkgs_by_path(os.path.join(d, 'p2'), packages=['foo'], cache=cache, env=env, workers=1)
+    self.assertEquals(['foo'], packages)
+    self.assertEquals(os.path.join(d, 'p1', 'foo'), cache['foo'][0])
+
+  def test_list_pkgs_by_path_hidden(self):
+    import shutil
+    import tempfile
+    import roslib.packages
+    d = tempfile.mkdtemp()
+    try:
+      for p in ['.git/a', '.svn/b', '.hidden/c', 'd']:
+        os.makedirs(os.path.join(d, p))
+        with open(os.path.join(d, p, 'manifest.xml'), 'w') as f:
+          f.write('<package/>')
+      env = {'ROS_ROOT': d, 'ROS_PACKAGE_PATH': ''}
+      # only version control directories are pruned
+      self.assertEquals(['c', 'd'], sorted(roslib.packages.list_pkgs_by_path(d, env=env)))
+    finally:
+      shutil.rmtree(d)
+
+  def test_resource_index(self):
+    import shutil
+    import stat
+    import tempfile
+    import roslib.packages
+    d = tempfile.mkdtemp()
+    try:
+      os.makedirs(os.path.join(d, 'a', 'b'))
+      os.makedirs(os.path.join(d, '.svn'))
+      for p in [os.path.join(d, 'node'), os.path.join(d, 'a', 'b', 'node'), os.path.join(d, '.svn', 'node')]:
+        with open(p, 'w') as f:
+          f.write('#!/bin/sh\n')
+      self.assertEquals([os.path.join(d, 'node'), os.path.join(d, 'a', 'b', 'node')], roslib.packages._find_resource(d, 'node'))
+      self.assertEquals([], roslib.packages._find_resource(d, 'node', filter_fn=roslib.packages._executable_filter))
+
+      # new files are picked up
+      p = os.path.join(d, 'a', 'node')
+      with open(p, 'w') as f:
+        f.write('#!/bin/sh\n')
+      os.chmod(p, stat.S_IRWXU)
+      os.utime(os.path.join(d, 'a'), (0, 0))
+      self.assertEquals([p], roslib.packages._find_resource(d, 'node', filter_fn=roslib.packages._executable_filter))
+      self.assertEquals([os.path.join(d, 'node'), p, os.path.join(d, 'a', 'b', 'node')], roslib.packages._find_resource(d, 'node'))
+
+      # chmod does not change the directory mtime, but is seen
+      st = os.stat(d)
+      os.chmod(os.path.join(d, 'node'), stat.S_IRWXU)
+      os.utime(d, (st.st_atime, st.st_mtime))
+      self.assertEquals([os.path.join(d, 'node'), p], roslib.packages._find_resource(d, 'node', filter_fn=roslib.packages._executable_filter))
+      os.chmod(p, stat.S_IRUSR)
+      self.assertEquals([os.path.join(d, 'node')], roslib.packages._find_resource(d, 'node', filter_fn=roslib.packages._executable_filter))
+    finally:
+      shutil.rmtree(d)
+
   def test_get_dir_pkg(self):
     import roslib.packages
     path = get_roslib_path()
@@ -71,6 +230,16 @@ class RoslibPackagesTest(unittest.TestCase):
     # must fail on parent of roslib
     self.assertEquals((None, None), roslib.packages.get_dir_pkg(os.path.dirname(path)))
     
+  def test_get_dir_pkgs(self):
+    import roslib.packages
+    d = os.path.join(get_test_path(), 'package_tests', 'p1')
+    foo = os.path.join(d, 'foo')
+    bar = os.path.join(d, 'bar')
+    paths = [foo, os.path.join(foo, 'src', 'foo.cpp'), os.path.join(bar, 'manifest.xml'), d, foo + 'x', '/']
+    self.assertEquals([(foo, 'foo'), (foo, 'foo'), (bar, 'bar'), (None, None), (None, None), (None, None)],
+                      roslib.packages.get_dir_pkgs(paths, ros_root=d, ros_package_path=''))
+    self.assertEquals([], roslib.packages.get_dir_pkgs([], ros_root=d, ros_package_path=''))
+
 def get_roslib_path():
     return os.path.realpath(os.path.abspath(os.path.join(get_test_path(), '..')))
 
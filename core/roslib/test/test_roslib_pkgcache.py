@@ -0,0 +1,129 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+class RoslibPkgcacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+
+  def test_cache(self):
+    from roslib.pkgcache import write_cache, read_cache, PackageCache
+    filename = os.path.join(self.tmp, 'cache')
+    locations = dict(('pkg%s'%i, '/ws/src/pkg%s'%i) for i in range(100))
+    locations[u'p\xe4ckage'] = u'/ws/src/p\xe4ckage'
+    write_cache(filename, '/opt/ros', '/ws/src:/ws2/src', locations)
+
+    cache = read_cache(filename, '/opt/ros', '/ws/src:/ws2/src')
+    self.assertEquals('/opt/ros', cache.ros_root)
+    self.assertEquals('/ws/src:/ws2/src', cache.ros_package_path)
+    self.assertEquals(len(locations), len(cache))
+    for k, v in locations.items():
+      self.assertEquals(v, cache[k])
+      self.assert_(k in cache)
+    for k in ['', 'pkg', 'pkg100', 'zzz']:
+      self.failIf(k in cache)
+      self.assertEquals(None, cache.get(k))
+    self.assertEquals(locations, dict(cache.items()))
+    self.assertEquals(sorted(locations.keys()), list(cache))
+    cache.close()
+
+    # environment must match
+    self.assertEquals(None, read_cache(filename, '/opt/ros', '/ws/src'))
+    self.assertEquals(None, read_cache(filename, None, '/ws/src:/ws2/src'))
+    write_cache(filename, None, None, {})
+    cache = read_cache(filename, None, None)
+    self.assertEquals(0, len(cache))
+    self.assertEquals(None, cache.get('pkg1'))
+    self.assertEquals(None, read_cache(filename, '', ''))
+
+  def test_read_cache_invalid(self):
+    from roslib.pkgcache import read_cache, PackageCache, PackageCacheException
+    filename = os.path.join(self.tmp, 'cache')
+    self.assertEquals(None, read_cache(filename, None, None))
+    for data in [b'', b'ROSPKGC', b'#ROS_ROOT=/opt/ros\n/opt/ros/roslib\n', b'ROSPKGC\0' + b'\xff' * 100]:
+      with open(filename, 'wb') as f:
+        f.write(data)
+      self.assertEquals(None, read_cache(filename, None, None))
+      try:
+        PackageCache(filename)
+        self.fail("should have raised")
+      except PackageCacheException: pass
+
+  def test_read_cache_corrupt(self):
+    from roslib.pkgcache import write_cache, read_cache, PackageCache, PackageCacheException, _HEADER, _ENTRY, MAGIC, VERSION
+    filename = os.path.join(self.tmp, 'cache')
+    locations = dict(('pkg%s'%i, '/ws/src/pkg%s'%i) for i in range(10))
+    write_cache(filename, '/opt/ros', '/ws/src', locations)
+    with open(filename, 'rb') as f:
+      data = f.read()
+    # truncated header or entry table
+    for size in [_HEADER.size - 1, _HEADER.size + _ENTRY.size * 9]:
+      with open(filename, 'wb') as f:
+        f.write(data[:size])
+      self.assertEquals(None, read_cache(filename, '/opt/ros', '/ws/src'))
+      try:
+        PackageCache(filename)
+        self.fail("should have raised")
+      except PackageCacheException: pass
+    # truncated string table: entries are only checked on lookup, and
+    # the last package's directory is gone
+    with open(filename, 'wb') as f:
+      f.write(data[:-1])
+    cache = read_cache(filename, '/opt/ros', '/ws/src')
+    self.assertEquals('/ws/src/pkg0', cache['pkg0'])
+    self.failIf('pkg9' in cache)
+    self.assertEquals(['pkg%s'%i for i in range(9)], list(cache))
+    cache.close()
+    # entry pointing past the end of the file is a miss
+    entry = _HEADER.size + _ENTRY.size * 3
+    bad = data[:entry] + _ENTRY.pack(len(data), 4, 0, 0) + data[entry+_ENTRY.size:]
+    with open(filename, 'wb') as f:
+      f.write(bad)
+    cache = read_cache(filename, '/opt/ros', '/ws/src')
+    self.failIf('pkg3' in cache)
+    self.assertEquals(9, len(cache.items()))
+    self.assertEquals('/ws/src/pkg8', cache['pkg8'])
+    cache.close()
+    # environment strings out of range
+    bad = _HEADER.pack(MAGIC, VERSION, 0, 10, len(data), 8, 0, 0) + data[_HEADER.size:]
+    with open(filename, 'wb') as f:
+      f.write(bad)
+    self.assertEquals(None, read_cache(filename, '/opt/ros', '/ws/src'))
@@ -0,0 +1,172 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+def make_package(d, name, depends=(), exports=''):
+  os.makedirs(os.path.join(d, name))
+  with open(os.path.join(d, name, 'manifest.xml'), 'w') as f:
+    f.write('<package>%s<export>%s</export></package>'%(''.join(['<depend package="%s"/>'%x for x in depends]), exports))
+
+class RoslibPkgserverTest(unittest.TestCase):
+
+  def setUp(self):
+    import roslib.manifestcache
+    import roslib.pkgserver
+    self.d = tempfile.mkdtemp()
+    # keep the crawl and manifest cache files out of the user's ROS_HOME
+    self.ros_home = os.environ.get('ROS_HOME', None)
+    os.environ['ROS_HOME'] = os.path.join(self.d, 'ros_home')
+    roslib.manifestcache._manifest_cache.clear()
+    self.ws = os.path.join(self.d, 'ws')
+    make_package(self.ws, 'a')
+    make_package(self.ws, 'b', ['a'], '<a plugin="${prefix}/b_plugins.xml"/>')
+    make_package(self.ws, 'c', ['b'])
+    self.socket_path = os.path.join(self.d, 'pkgserver.sock')
+    self.server = roslib.pkgserver.PackageServer(self.socket_path, check_interval=0.)
+    self.server.bind()
+    self.thread = threading.Thread(target=self.server.serve_forever)
+    self.thread.start()
+
+  def tearDown(self):
+    import roslib.manifestcache
+    import roslib.pkgserver
+    self.server.shutdown()
+    self.thread.join()
+    roslib.pkgserver._close_client()
+    roslib.manifestcache._manifest_cache.clear()
+    if self.ros_home is None:
+      del os.environ['ROS_HOME']
+    else:
+      os.environ['ROS_HOME'] = self.ros_home
+    shutil.rmtree(self.d)
+
+  def query(self, tool, args):
+    import roslib.pkgserver
+    return roslib.pkgserver.query(tool, args, None, self.ws, socket_path=self.socket_path)
+
+  def test_query(self):
+    import roslib.pkgserver
+    from roslib.exceptions import ROSLibException
+    self.assertEquals(os.path.join(self.ws, 'b'), self.query('rospack', ['find', 'b']))
+    self.assertEquals(['a', 'b', 'c'], self.query('rospack', ['list-names']).split())
+    self.assertEquals({'a': os.path.join(self.ws, 'a'), 'b': os.path.join(self.ws, 'b'), 'c': os.path.join(self.ws, 'c')},
+                      roslib.pkgserver.get_locations(None, self.ws, socket_path=self.socket_path))
+    self.assertEquals(['a', 'b'], self.query('rospack', ['deps', 'c']).split())
+    self.assertEquals(['b', 'c'], self.query('rospack', ['depends-on', 'a']).split())
+    self.assertEquals(['b'], self.query('rospack', ['depends-on1', 'a']).split())
+    self.assertEquals('b %s/b_plugins.xml'%os.path.join(self.ws, 'b'), self.query('rospack', ['plugins', '--attrib=plugin', 'a']))
+    try:
+      self.query('rospack', ['find', 'fake'])
+      self.fail("should have raised")
+    except ROSLibException: pass
+    # commands that the server does not answer
+    self.assertEquals(None, self.query('rospack', ['cflags-only-I', 'a']))
+    self.assertEquals(None, self.query('rospack', []))
+
+    # not running
+    self.assertEquals(None, roslib.pkgserver.query('rospack', ['find', 'a'], None, self.ws, socket_path=self.socket_path + '.fake'))
+
+  def test_query_timeout(self):
+    import socket
+    import roslib.pkgserver
+    # server that accepts connections but never replies
+    socket_path = os.path.join(self.d, 'hung.sock')
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.bind(socket_path)
+    s.listen(1)
+    conns = []
+    t = threading.Thread(target=lambda: conns.append(s.accept()[0]))
+    t.start()
+    timeout = roslib.pkgserver.CLIENT_TIMEOUT
+    try:
+      roslib.pkgserver.CLIENT_TIMEOUT = 0.1
+      self.assertEquals(None, roslib.pkgserver.query('rospack', ['find', 'a'], None, self.ws, socket_path=socket_path))
+      self.assertEquals(None, roslib.pkgserver._client)
+      # a working server is used again afterwards
+      self.assertEquals(os.path.join(self.ws, 'a'), self.query('rospack', ['find', 'a']))
+    finally:
+      roslib.pkgserver.CLIENT_TIMEOUT = timeout
+      t.join()
+      for c in conns:
+        c.close()
+      s.close()
+
+  def test_preload(self):
+    import roslib.manifest
+    import roslib.manifestcache
+    import time
+    files = [os.path.join(self.ws, name, 'manifest.xml') for name in ['a', 'b', 'c']]
+    # manifests modified within RACY_INTERVAL are not cached
+    mtime = time.time() - 100
+    for f in files:
+      os.utime(f, (mtime, mtime))
+    roslib.manifestcache._manifest_cache.clear()
+    self.server.preload(None, self.ws, workers=1)
+    # manifests were parsed before the first query
+    self.assertEquals(3, len([f for f in files if f in roslib.manifestcache._manifest_cache._manifests]))
+    self.assertEquals(['a', 'b'], self.query('rospack', ['deps', 'c']).split())
+
+  def test_invalidate(self):
+    self.assertEquals([], self.query('rospack', ['depends-on', 'c']).split())
+    make_package(self.ws, 'd', ['c'])
+    self.assertEquals(os.path.join(self.ws, 'd'), self.query('rospack', ['find', 'd']))
+    self.assertEquals(['d'], self.query('rospack', ['depends-on', 'c']).split())
+    shutil.rmtree(os.path.join(self.ws, 'd'))
+    self.assertEquals([], self.query('rospack', ['depends-on', 'c']).split())
+
+  def test_clients(self):
+    import roslib.packages
+    import roslib.rospack
+    import roslib.pkgserver
+    env = dict(os.environ)
+    try:
+      os.environ['ROS_HOME'] = self.d
+      os.environ['ROS_PACKAGE_PATH'] = self.ws
+      os.rename(self.socket_path, roslib.pkgserver.get_socket_path())
+      self.socket_path = roslib.pkgserver.get_socket_path()
+      self.server.socket_path = self.socket_path
+      cache = roslib.packages._PkgDirCache()
+      self.assertEquals(os.path.join(self.ws, 'b'), cache.get('b', None, self.ws))
+      # no crawl took place
+      self.failIf(os.path.exists(os.path.join(self.d, roslib.packages.PKG_CACHE_FILE)))
+      self.assertEquals(['a', 'b'], roslib.rospack.rospack_depends('c'))
+      self.assertEquals(os.path.join(self.ws, 'a'), roslib.rospack.rospackexec(['find', 'a']))
+    finally:
+      os.environ.clear()
+      os.environ.update(env)
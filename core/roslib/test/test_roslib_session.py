@@ -0,0 +1,135 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2009, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+class RoslibSessionTest(unittest.TestCase):
+
+  def setUp(self):
+    import roslib.manifestcache
+    # keep the crawl snapshot and cache files out of the user's ROS_HOME
+    self.ros_home = os.environ.get('ROS_HOME', None)
+    self.tmp_ros_home = os.environ['ROS_HOME'] = tempfile.mkdtemp()
+    roslib.manifestcache._manifest_cache.clear()
+    self.d = tempfile.mkdtemp()
+    for name, text in [
+        ('a', '<package><depend package="b"/></package>'),
+        ('b', '<package><export><python path="src"/></export></package>'),
+        ]:
+      os.makedirs(os.path.join(self.d, 'stack', name, 'msg'))
+      with open(os.path.join(self.d, 'stack', name, 'manifest.xml'), 'w') as f:
+        f.write(text)
+      with open(os.path.join(self.d, 'stack', name, 'msg', name.upper() + '.msg'), 'w') as f:
+        f.write('int32 x\n')
+    with open(os.path.join(self.d, 'stack', 'stack.xml'), 'w') as f:
+      f.write('<stack></stack>')
+    with open(os.path.join(self.d, 'stack', 'CMakeLists.txt'), 'w') as f:
+      f.write('rosbuild_make_distribution(1.2.3)\n')
+    self.env = os.environ.copy()
+    self.env['ROS_PACKAGE_PATH'] = self.d
+
+  def tearDown(self):
+    import roslib.manifestcache
+    roslib.manifestcache._manifest_cache.clear()
+    shutil.rmtree(self.tmp_ros_home)
+    if self.ros_home is None:
+      del os.environ['ROS_HOME']
+    else:
+      os.environ['ROS_HOME'] = self.ros_home
+    shutil.rmtree(self.d)
+
+  def test_session(self):
+    from roslib.session import Session
+    session = Session(self.env)
+    a = os.path.join(self.d, 'stack', 'a')
+    self.assertEquals(a, session.get_locations()['a'])
+    self.assert_(session.rospack is session.rospack)
+    self.assertEquals(a, session.rospack.get_path('a'))
+    self.assertEquals(['b'], session.rospack.get_depends('a', implicit=False))
+    m = session.get_manifest('a')
+    self.assert_(m is session.get_manifest_by_dir(a))
+    self.assertEquals(['b'], [d.package for d in m.depends])
+    self.assertEquals(['b'], session.get_package_graph().depends('a'))
+    self.assertEquals([('b', 'src')], session.get_export_index().get('python', 'path'))
+
+  def test_helpers(self):
+    import roslib.packages
+    import roslib.resources
+    import roslib.stacks
+    from roslib.session import Session
+    session = Session(self.env)
+    a = os.path.join(self.d, 'stack', 'a')
+    self.assertEquals(a, roslib.packages.get_pkg_dir('a', session=session))
+    self.assertEquals(os.path.join(a, 'msg'), roslib.packages.get_pkg_subdir('a', 'msg', session=session))
+    self.assertEquals(os.path.join(a, 'msg', 'A.msg'), roslib.packages.resource_file('a', 'msg', 'A.msg', session=session))
+    self.assertEquals([(a, 'a')], roslib.packages.get_dir_pkgs([os.path.join(a, 'msg')], session=session))
+    self.assertEquals(['A.msg', 'b/B.msg'], sorted(roslib.resources.list_package_resources('a', True, 'msg', session=session)))
+    self.assertEquals('stack', roslib.stacks.stack_of('a', session=session))
+    self.assertEquals(['stack', 'stack'], roslib.stacks.stacks_of(['a', 'b'], session=session))
+    self.assertEquals(os.path.join(self.d, 'stack'), roslib.stacks.get_stack_dir('stack', session=session))
+    self.assert_('stack' in roslib.stacks.list_stacks(session=session))
+    self.assertEquals('1.2.3', roslib.stacks.get_stack_version('stack', session=session))
+
+  def test_moved_package(self):
+    import rospkg
+    import roslib.packages
+    from roslib.session import Session
+    session = Session(self.env)
+    a = os.path.join(self.d, 'stack', 'a')
+    self.assertEquals(a, roslib.packages.get_pkg_dir('a', session=session))
+    self.assert_(set(['a', 'b']) <= set(session.rospack.list()))
+    self.assertRaises(rospkg.ResourceNotFound, session.rospack.get_path, 'fake')
+    self.assertEquals(None, roslib.packages.get_pkg_dir('fake', required=False, session=session))
+    # the session keeps its view of a package that has moved
+    moved = os.path.join(self.d, 'moved', 'a')
+    os.makedirs(os.path.dirname(moved))
+    os.rename(a, moved)
+    self.assertEquals(a, roslib.packages.get_pkg_dir('a', session=session))
+    self.assertEquals(a, session.rospack.get_path('a'))
+    self.assertEquals(moved, roslib.packages.get_pkg_dir('a', session=Session(self.env)))
+
+  def test_expand_to_packages(self):
+    from roslib.session import Session
+    from roslib.stacks import expand_to_packages
+    session = Session(self.env)
+    packages, not_found = expand_to_packages(['stack', 'b', 'fake'], session=session)
+    self.assertEquals(['a', 'b'], sorted(set(packages)))
+    self.assertEquals(['fake'], not_found)
+    # without a session, results match
+    packages, not_found = expand_to_packages(['stack', 'b', 'fake'], env=self.env)
+    self.assertEquals(['a', 'b'], sorted(set(packages)))
+    self.assertEquals(['fake'], not_found)
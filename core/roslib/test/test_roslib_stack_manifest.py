@@ -31,7 +31,9 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 
 import roslib
@@ -40,7 +42,23 @@ def get_test_path():
     return os.path.abspath(os.path.dirname(__file__))
 
 class RoslibStackManifestTest(unittest.TestCase):
-  
+
+  def setUp(self):
+    import roslib.manifestcache
+    # keep the manifest cache file out of the user's ROS_HOME
+    self.ros_home = os.environ.get('ROS_HOME', None)
+    self.tmp_ros_home = os.environ['ROS_HOME'] = tempfile.mkdtemp()
+    roslib.manifestcache._manifest_cache.clear()
+
+  def tearDown(self):
+    import roslib.manifestcache
+    roslib.manifestcache._manifest_cache.clear()
+    shutil.rmtree(self.tmp_ros_home)
+    if self.ros_home is None:
+      del os.environ['ROS_HOME']
+    else:
+      os.environ['ROS_HOME'] = self.ros_home
+
   def _subtest_parse_stack_example1(self, m):
     from roslib.manifestlib import _Manifest
     self.assert_(isinstance(m, _Manifest))
@@ -31,14 +31,32 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 
 import roslib
 import rospkg
 
 class RoslibStacksTest(unittest.TestCase):
-  
+
+    def setUp(self):
+        import roslib.manifestcache
+        # keep the crawl snapshot and cache files out of the user's ROS_HOME
+        self.ros_home = os.environ.get('ROS_HOME', None)
+        self.tmp_ros_home = os.environ['ROS_HOME'] = tempfile.mkdtemp()
+        roslib.manifestcache._manifest_cache.clear()
+
+    def tearDown(self):
+        import roslib.manifestcache
+        roslib.manifestcache._manifest_cache.clear()
+        shutil.rmtree(self.tmp_ros_home)
+        if self.ros_home is None:
+            del os.environ['ROS_HOME']
+        else:
+            os.environ['ROS_HOME'] = self.ros_home
+
     def test_list_stacks(self):
         from roslib.stacks import list_stacks
         l = list_stacks()
@@ -73,6 +91,35 @@ class RoslibStacksTest(unittest.TestCase):
         test_dir = os.path.join(roslib.packages.get_pkg_dir('roslib'), 'test', 'stack_tests2')
         self.assertEquals(set(['foo', 'bar']), set(list_stacks_by_path(test_dir)))
         
+    def test_stack_of(self):
+        import shutil
+        import tempfile
+        from roslib.stacks import stack_of, stacks_of
+        d = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'stack_tests')
+        ws = tempfile.mkdtemp()
+        try:
+            # a stack found by walking up from a nested package, and a
+            # package that is not in a stack
+            for p in [os.path.join(ws, 'mystack', 'sub', 'inner_pkg'), os.path.join(ws, 'loose_pkg')]:
+                os.makedirs(p)
+                with open(os.path.join(p, 'manifest.xml'), 'w') as f:
+                    f.write('<package/>')
+            with open(os.path.join(ws, 'mystack', 'stack.xml'), 'w') as f:
+                f.write('<stack/>')
+            env = {rospkg.environment.ROS_ROOT: d, rospkg.environment.ROS_PACKAGE_PATH: ws}
+
+            self.assertEquals('foo', stack_of('foo_pkg', env=env))
+            self.assertEquals('mystack', stack_of('inner_pkg', env=env))
+            self.assertEquals(None, stack_of('loose_pkg', env=env))
+            self.assertEquals(['foo', 'mystack', None, 'foo'], stacks_of(['foo_pkg_2', 'inner_pkg', 'loose_pkg', 'foo_pkg'], env=env))
+            self.assertEquals([], stacks_of([], env=env))
+            try:
+                stacks_of(['foo_pkg', 'fake_foo_pkg'], env=env)
+                self.fail("should have raised")
+            except roslib.packages.InvalidROSPkgException: pass
+        finally:
+            shutil.rmtree(ws)
+
     def test_list_stacks_by_path_unary(self):
         from roslib.stacks import list_stacks_by_path
         # test with synthetic stacks